@@ -0,0 +1,56 @@
+"""
+Process memory accounting
+Distinguishes memory a worker owns from pages it shares with its siblings.
+"""
+
+import os
+import resource
+from typing import Dict, Optional
+
+_MB = 1024  # smaps values are in kB
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, float]:
+    """
+    Resident memory of a process, split into unique and shared pages
+
+    Args:
+        pid: Process to inspect, defaults to the current one
+
+    Returns:
+        dict: rss_mb, pss_mb (shared pages divided among their users),
+            uss_mb (pages only this process maps) and shared_mb. On
+            platforms without /proc only rss_mb (peak) is reported.
+    """
+    pid = pid or os.getpid()
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        if pid != os.getpid():
+            raise
+        # ru_maxrss is kB on Linux, bytes on macOS; close enough for a fallback
+        return {'pid': pid, 'rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / _MB, 1)}
+
+    unique = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    shared = fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+    return {
+        'pid': pid,
+        'rss_mb': round(fields.get('Rss', 0) / _MB, 1),
+        'pss_mb': round(fields.get('Pss', 0) / _MB, 1),
+        'uss_mb': round(unique / _MB, 1),
+        'shared_mb': round(shared / _MB, 1),
+    }
+
+
+def child_pids(pid: int) -> list:
+    """Direct children of a process (Linux only)"""
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(int(child) for child in f.read().split())
+    return children
@@ -0,0 +1,158 @@
+"""
+Password hashing pool
+Runs bcrypt in dedicated worker processes, so a burst of logins waits in
+its own bounded queue instead of occupying FastAPI's threadpool (and the
+GIL) that every other sync route depends on.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .security import BCRYPT_ROUNDS, hash_password, verify_and_update_password
+from .telemetry import PASSWORD_HASH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Worker processes per server process; bounds the CPU that logins can take
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Hashes queued or running before login and register answer 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "256"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", "2"))
+# Scheduling priority of the workers relative to the server (0-19); when
+# cores are scarce, request handling wins and logins absorb the wait
+PASSWORD_HASH_NICE = int(os.getenv("PASSWORD_HASH_NICE", "10"))
+
+HASH = "hash"
+VERIFY = "verify"
+
+
+class PasswordHashQueueFullError(Exception):
+    """Raised when the password hashing queue cannot take another request"""
+
+    def __init__(self, retry_after: int = PASSWORD_HASH_RETRY_AFTER_SECONDS):
+        self.retry_after = retry_after
+        super().__init__("Too many sign-ins in progress, retry later")
+
+
+def _init_worker(nice: int):
+    if nice > 0 and hasattr(os, "nice"):
+        os.nice(nice)
+
+
+def _timed(fn: Callable[..., Any], *args) -> Tuple[Any, float]:
+    """Runs in the worker process; returns the result and its CPU-side duration"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordHashPool:
+    """
+    Bounded process pool for bcrypt with explicit backpressure.
+
+    Workers are forked from a forkserver that has only imported
+    app.core.security, so they start quickly and do not inherit the
+    server's models, threads or sockets. Like any multiprocessing pool,
+    scripts that use it directly need an `if __name__ == "__main__"` guard.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+        rounds: int = BCRYPT_ROUNDS,
+        nice: int = PASSWORD_HASH_NICE,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self.rounds = rounds
+        self.nice = nice
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._rejected = 0
+        self._completed = {HASH: 0, VERIFY: 0}
+        self._rehashed = 0
+
+    def start(self):
+        """Create the pool and start its workers ahead of the first login"""
+        if self._pool is not None:
+            return
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["app.core.security"])
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=context,
+            initializer=_init_worker, initargs=(self.nice,),
+        )
+        for _ in range(self.max_workers):
+            self._pool.submit(int)
+        logger.info(
+            f"PasswordHashPool started - workers={self.max_workers}, "
+            f"max_pending={self.max_pending}, bcrypt rounds={self.rounds}, nice={self.nice}"
+        )
+
+    async def _run(self, operation: str, fn: Callable[..., Any], *args) -> Any:
+        # Only touched from the event loop, so no lock is needed
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise PasswordHashQueueFullError()
+        self.start()
+        self._pending += 1
+        submitted = time.perf_counter()
+        try:
+            result, compute_seconds = await asyncio.wrap_future(self._pool.submit(_timed, fn, *args))
+        finally:
+            self._pending -= 1
+        total_seconds = time.perf_counter() - submitted
+        PASSWORD_HASH_SECONDS.labels(operation, "compute").observe(compute_seconds)
+        PASSWORD_HASH_SECONDS.labels(operation, "queue").observe(max(0.0, total_seconds - compute_seconds))
+        self._completed[operation] += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        """bcrypt hash of a new password at the configured cost"""
+        return await self._run(HASH, hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password against its stored hash
+
+        Returns:
+            tuple: (valid, replacement hash when the stored one uses another cost)
+        """
+        valid, new_hash = await self._run(VERIFY, verify_and_update_password, password, hashed_password, self.rounds)
+        if new_hash is not None:
+            self._rehashed += 1
+        return valid, new_hash
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.max_workers,
+            'bcrypt_rounds': self.rounds,
+            'in_flight': self._pending,
+            'max_pending': self.max_pending,
+            'rejected': self._rejected,
+            'hashed': self._completed[HASH],
+            'verified': self._completed[VERIFY],
+            'rehashed': self._rehashed,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Global pool instance
+_password_hash_pool = None
+
+def get_password_hash_pool() -> PasswordHashPool:
+    """Get singleton password hashing pool"""
+    global _password_hash_pool
+    if _password_hash_pool is None:
+        _password_hash_pool = PasswordHashPool()
+    return _password_hash_pool
@@ -0,0 +1,340 @@
+"""
+Authenticated-principal cache
+Lets get_current_user skip the users lookup for a token it resolved
+recently. Entries are dropped as soon as a commit changes the user's role
+or active flag, in this worker and, through the invalidation backend, in
+the others.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from ..models.principal_invalidation import PrincipalInvalidation
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Seconds a resolved token is trusted without reading the users table; 0 disables
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+# "database" shares invalidations between workers; "local" for a single process
+PRINCIPAL_CACHE_BACKEND = os.getenv("PRINCIPAL_CACHE_BACKEND", "database").lower()
+# How often each worker looks for invalidations published by the others
+PRINCIPAL_CACHE_SYNC_SECONDS = float(os.getenv("PRINCIPAL_CACHE_SYNC_SECONDS", "1"))
+# How long an id missing below the newest one seen is still expected to
+# commit; Postgres can commit a lower id after a higher one
+PRINCIPAL_CACHE_GAP_SECONDS = float(os.getenv("PRINCIPAL_CACHE_GAP_SECONDS", "30"))
+# Invalidations older than this are deleted; by then every principal
+# cached before them has expired
+PRINCIPAL_INVALIDATION_RETENTION_SECONDS = float(os.getenv(
+    "PRINCIPAL_INVALIDATION_RETENTION_SECONDS",
+    str(2 * PRINCIPAL_CACHE_TTL_SECONDS + PRINCIPAL_CACHE_GAP_SECONDS),
+))
+# Most missing ids tracked at once; beyond that the oldest are given up on
+_MAX_GAPS = 1000
+
+# Copied onto cached principals; the password hash is never cached
+_PRINCIPAL_FIELDS = ("id", "email", "full_name", "role", "is_active")
+# A change to any of these makes a cached principal wrong
+_WATCHED_FIELDS = ("role", "is_active")
+_PENDING_KEY = "principal_invalidations"
+
+
+class InvalidationBackend:
+    """
+    Carries invalidations between workers.
+
+    publish() runs inside the flush that changes the user, so the record
+    commits or rolls back together with the change. poll() returns the
+    user ids published by any worker since its previous call.
+    """
+
+    def publish(self, session: Session, user_ids: Set[int]):
+        pass
+
+    def poll(self, session: Session) -> Iterable[int]:
+        return ()
+
+
+class LocalInvalidations(InvalidationBackend):
+    """Invalidates only the committing process; other workers wait out the TTL"""
+
+
+class DatabaseInvalidations(InvalidationBackend):
+    """
+    Shares invalidations through the principal_invalidations table.
+
+    Each worker reads rows past the last id it has seen at most once per
+    sync interval, so staleness is bounded by that interval rather than
+    the TTL, at the cost of one indexed query per interval per worker.
+    Ids missing below the last one seen may belong to transactions that
+    commit later, so they are looked for again for gap_seconds. Rows
+    older than retention_seconds are deleted once per retention period.
+    """
+
+    def __init__(
+        self,
+        sync_seconds: float = PRINCIPAL_CACHE_SYNC_SECONDS,
+        gap_seconds: float = PRINCIPAL_CACHE_GAP_SECONDS,
+        retention_seconds: float = PRINCIPAL_INVALIDATION_RETENTION_SECONDS,
+    ):
+        self.sync_seconds = sync_seconds
+        self.gap_seconds = gap_seconds
+        self.retention_seconds = retention_seconds
+        self._last_id: Optional[int] = None
+        self._gaps: Dict[int, float] = {}  # missing id -> when first missed
+        self._next_sync = 0.0
+        self._next_prune = time.monotonic() + retention_seconds
+        self._lock = threading.Lock()
+
+    def publish(self, session: Session, user_ids: Set[int]):
+        session.connection().execute(insert(PrincipalInvalidation), [{'user_id': uid} for uid in user_ids])
+
+    def poll(self, session: Session) -> Iterable[int]:
+        if time.monotonic() < self._next_sync or not self._lock.acquire(blocking=False):
+            return ()
+        try:
+            now = time.monotonic()
+            self._next_sync = now + self.sync_seconds
+            if now >= self._next_prune:
+                self._next_prune = now + self.retention_seconds
+                self._prune(session)
+            if self._last_id is None:
+                # Nothing is cached before the first poll, so older rows do not matter
+                self._last_id = session.execute(
+                    select(func.coalesce(func.max(PrincipalInvalidation.id), 0))
+                ).scalar_one()
+                return ()
+
+            for gap_id in [gap_id for gap_id, since in self._gaps.items() if now - since > self.gap_seconds]:
+                del self._gaps[gap_id]  # rolled back, or deleted before we saw it
+            floor = min(self._gaps) - 1 if self._gaps else self._last_id
+            rows = session.execute(
+                select(PrincipalInvalidation.id, PrincipalInvalidation.user_id)
+                .where(PrincipalInvalidation.id > floor)
+            ).all()
+
+            user_ids = [
+                row.user_id for row in rows
+                if row.id > self._last_id or self._gaps.pop(row.id, None) is not None
+            ]
+            newest = max((row.id for row in rows), default=self._last_id)
+            if newest > self._last_id:
+                found = {row.id for row in rows}
+                for missing in range(max(self._last_id + 1, newest - _MAX_GAPS), newest):
+                    if missing not in found:
+                        self._gaps[missing] = now
+                while len(self._gaps) > _MAX_GAPS:
+                    del self._gaps[min(self._gaps)]
+                self._last_id = newest
+            return user_ids
+        finally:
+            self._lock.release()
+
+    def _prune(self, session: Session):
+        # Own session, so the request's transaction is left alone
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.retention_seconds)
+        try:
+            with Session(bind=session.get_bind()) as db:
+                db.execute(delete(PrincipalInvalidation).where(PrincipalInvalidation.created_at < cutoff))
+                db.commit()
+        except Exception as e:
+            logger.warning(f"Failed to prune principal invalidations: {e}")
+
+
+_BACKENDS = {
+    'local': LocalInvalidations,
+    'database': DatabaseInvalidations,
+}
+
+
+class PrincipalCache:
+    """
+    Thread-safe LRU of resolved principals keyed by user id and token.
+
+    Entries expire after the TTL or when the token does, whichever comes
+    first. Hits return a detached User carrying only _PRINCIPAL_FIELDS;
+    routes that modify a user must load it from their own session.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = PRINCIPAL_CACHE_TTL_SECONDS,
+        max_entries: int = PRINCIPAL_CACHE_SIZE,
+        backend: Optional[InvalidationBackend] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(0, max_entries)
+        self.backend = backend or LocalInvalidations()
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[Tuple[int, str]]] = {}
+        # Invalidations are numbered so a lookup that read the users table
+        # before an invalidation cannot store what it read afterwards
+        self._generation = 0
+        self._invalidated_at: Dict[int, int] = {}
+        self._oldest_safe_generation = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        logger.info(
+            f"PrincipalCache initialized - ttl={ttl_seconds:.0f}s, {max_entries} entries, "
+            f"backend: {type(self.backend).__name__}"
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    @property
+    def generation(self) -> int:
+        """Pass to put() for a principal read after this call"""
+        return self._generation
+
+    @staticmethod
+    def _key(user_id: int, token: str) -> Tuple[int, str]:
+        return user_id, hashlib.sha256(token.encode()).hexdigest()
+
+    def _remove(self, key: Tuple[int, str]):
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+    def get(self, session: Session, user_id: int, token: str) -> Optional[User]:
+        """
+        Cached principal for a token, after applying pending invalidations
+
+        Args:
+            session: Request session, used by the backend to poll
+            user_id: Subject of the decoded token
+            token: Raw bearer token
+
+        Returns:
+            User: Detached copy of the user, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        self.invalidate(self.backend.poll(session))
+
+        key = self._key(user_id, token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    self._remove(key)
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            fields = entry[1]
+        return User(**fields)
+
+    def put(self, user: User, token: str, token_expires_at: Optional[float] = None, generation: Optional[int] = None):
+        """
+        Cache an active user resolved from a token
+
+        Args:
+            user: Row just read from the users table
+            token: Raw bearer token
+            token_expires_at: The token's "exp" claim; entries never outlive it
+            generation: self.generation taken before the row was read
+        """
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, float(token_expires_at))
+        key = self._key(user.id, token)
+        fields = {name: getattr(user, name) for name in _PRINCIPAL_FIELDS}
+
+        with self._lock:
+            if generation is not None and (
+                generation < self._oldest_safe_generation
+                or self._invalidated_at.get(user.id, -1) > generation
+            ):
+                return  # invalidated while it was being read
+            self._entries[key] = (expires_at, fields)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(user.id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, user_ids: Iterable[int]):
+        """Drop every cached token of these users"""
+        with self._lock:
+            for user_id in user_ids:
+                self._generation += 1
+                self._invalidated_at[user_id] = self._generation
+                for key in list(self._keys_by_user.get(user_id, ())):
+                    self._remove(key)
+                self._stats['invalidations'] += 1
+            if len(self._invalidated_at) > self.max_entries:
+                # Forget old invalidations; fills that started before now are refused instead
+                self._invalidated_at.clear()
+                self._oldest_safe_generation = self._generation
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._stats['hits'] + self._stats['misses']
+        return {
+            'enabled': self.enabled,
+            'backend': type(self.backend).__name__,
+            'entries': len(self._entries),
+            'ttl_seconds': self.ttl_seconds,
+            **self._stats,
+            'hit_rate': round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+        }
+
+
+def _watched_fields_changed(user: User) -> bool:
+    state = inspect(user)
+    return any(state.attrs[name].history.has_changes() for name in _WATCHED_FIELDS)
+
+
+@event.listens_for(Session, "after_flush")
+def _publish_principal_changes(session: Session, flush_context):
+    # Pre-flush state and attribute history are still visible here
+    changed = {obj.id for obj in session.dirty if isinstance(obj, User) and _watched_fields_changed(obj)}
+    changed |= {obj.id for obj in session.deleted if isinstance(obj, User)}
+    if changed:
+        get_principal_cache().backend.publish(session, changed)
+        session.info.setdefault(_PENDING_KEY, set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_principal_changes(session: Session):
+    changed = session.info.pop(_PENDING_KEY, None)
+    if changed:
+        get_principal_cache().invalidate(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_principal_changes(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# Global cache instance
+_principal_cache = None
+
+def get_principal_cache() -> PrincipalCache:
+    """Get singleton principal cache"""
+    global _principal_cache
+    if _principal_cache is None:
+        if PRINCIPAL_CACHE_BACKEND not in _BACKENDS:
+            raise ValueError(f"Unknown PRINCIPAL_CACHE_BACKEND {PRINCIPAL_CACHE_BACKEND!r}, use one of {sorted(_BACKENDS)}")
+        _principal_cache = PrincipalCache(backend=_BACKENDS[PRINCIPAL_CACHE_BACKEND]())
+    return _principal_cache
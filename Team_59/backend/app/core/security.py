@@ -1,29 +1,49 @@
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 import os
-from typing import Any, Optional
+from typing import Any, Optional, Tuple
 
 # In production, set this via environment variable and keep it secret
 SECRET_KEY = os.getenv("JWT_SECRET", "change_me_in_production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor (log2 of the key-expansion rounds); each +1 doubles
+# the time per hash. Hashes made with any other cost are upgraded on login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
 
-def hash_password(password: str) -> str:
-    """
-    Hash a plaintext password using bcrypt.
-    Bcrypt only supports up to 72 bytes; truncate longer passwords.
-    """
+@lru_cache(maxsize=None)
+def password_context(rounds: int = BCRYPT_ROUNDS) -> CryptContext:
+    """CryptContext that hashes with `rounds` and flags any other cost as needing an update"""
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+pwd_context = password_context()
+
+
+def _truncate(password: str) -> str:
     # Ensure max 72 bytes when encoded
     password_bytes = password.encode("utf-8")
     if len(password_bytes) > 72:
-        password_bytes = password_bytes[:72]
-        password = password_bytes.decode("utf-8", errors="ignore")
+        password = password_bytes[:72].decode("utf-8", errors="ignore")
+    return password
 
-    return pwd_context.hash(password)
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    """
+    Hash a plaintext password using bcrypt.
+    Bcrypt only supports up to 72 bytes; truncate longer passwords.
+    """
+    return password_context(rounds).hash(_truncate(password))
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -33,6 +53,25 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str,
+    hashed_password: str,
+    rounds: int = BCRYPT_ROUNDS,
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and rehash it if the stored hash uses another cost.
+
+    Returns:
+        tuple: (valid, replacement hash to store or None)
+    """
+    context = password_context(rounds)
+    if not context.verify(plain_password, hashed_password):
+        return False, None
+    if context.needs_update(hashed_password):
+        return True, hash_password(plain_password, rounds)
+    return True, None
+
+
 def create_access_token(
     data: dict,
     expires_delta: Optional[timedelta] = None,
@@ -0,0 +1,178 @@
+"""
+Inference telemetry
+Per-stage latency histograms, per-route request metrics and a collector
+that exposes the serving layer's existing stats in Prometheus format.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Set for gunicorn so every worker's histograms are aggregated (see gunicorn.conf.py)
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Pipeline stages, in request order. Explanation stages are named after the
+# method (gradcam, attention_rollout); inline explanations include their
+# forward pass, since one pass yields both logits and heatmap.
+DECODE = "decode"
+VALIDATE = "validate"
+PREPROCESS = "preprocess"
+FORWARD = "forward"
+ENCODE = "encode"
+SERIALIZE = "serialize"
+
+_STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+_REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = Histogram(
+    "inference_stage_seconds",
+    "Time spent in each inference pipeline stage",
+    ["model_type", "stage"],
+    buckets=_STAGE_BUCKETS,
+)
+FORWARD_BATCH_SIZE = Histogram(
+    "inference_forward_batch_size",
+    "Images per forward pass",
+    ["model_type"],
+    buckets=(1, 2, 4, 8, 16, 32),
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=_REQUEST_BUCKETS,
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "Password hashing time, split into waiting for a worker and bcrypt itself",
+    ["operation", "phase"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS = Counter(
+    "http_requests",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"],
+)
+
+
+def observe_stage(model_type: str, stage: str, seconds: float):
+    STAGE_SECONDS.labels(model_type, stage).observe(seconds)
+
+
+@contextmanager
+def stage_timer(model_type: str, stage: str) -> Iterator[None]:
+    """Record the duration of the enclosed block as one pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(model_type, stage).observe(time.perf_counter() - start)
+
+
+def record_request(method: str, route: str, status: int, seconds: float):
+    REQUEST_SECONDS.labels(method, route).observe(seconds)
+    REQUESTS.labels(method, route, str(status)).inc()
+
+
+class ServingStatsCollector:
+    """
+    Reads the serving layer's own counters at scrape time.
+
+    Nothing is double-counted: queue depths, cache hit rates and model
+    memory come straight from the get_stats() of the executor, batchers,
+    prediction cache and model registry, so /metrics and the JSON stats
+    endpoints always agree.
+    """
+
+    def collect(self):
+        # Imported here: services import this module for their stage timers
+        from ..models.model_registry import get_model_registry
+        from ..services.explanation_jobs import get_explanation_jobs
+        from ..services.inference_executor import get_inference_executor
+        from ..services.prediction_cache import get_prediction_cache
+        from ..services.prediction_service import get_batching_stats
+        from .memory import process_memory
+        from .password_pool import get_password_hash_pool
+
+        executor = get_inference_executor().get_stats()
+        yield GaugeMetricFamily("inference_in_flight", "Admitted inference requests", value=executor['in_flight'])
+        yield GaugeMetricFamily("inference_max_pending", "Admission limit", value=executor['max_pending'])
+        yield CounterMetricFamily("inference_admitted", "Requests admitted for inference", value=executor['admitted'])
+        yield CounterMetricFamily("inference_rejected", "Requests rejected with 503", value=executor['rejected'])
+
+        queue_depth = GaugeMetricFamily("inference_batch_queue_depth", "Images waiting for a batch", labels=["model_type"])
+        batches = CounterMetricFamily("inference_batches", "Forward passes run by the batcher", labels=["model_type"])
+        for stats in get_batching_stats():
+            queue_depth.add_metric([stats['model_type']], stats['queue_depth'])
+            batches.add_metric([stats['model_type']], stats['batches'])
+        yield queue_depth
+        yield batches
+
+        cache = get_prediction_cache().get_stats()
+        lookups = CounterMetricFamily("prediction_cache_lookups", "Prediction cache lookups by result", labels=["result"])
+        lookups.add_metric(["memory_hit"], cache['hits'])
+        lookups.add_metric(["disk_hit"], cache['disk_hits'])
+        lookups.add_metric(["miss"], cache['misses'])
+        yield lookups
+        yield GaugeMetricFamily("prediction_cache_hit_ratio", "Cache hits over lookups since start", value=cache['hit_rate'])
+
+        registry = get_model_registry()
+        memory = GaugeMetricFamily("model_memory_bytes", "Weights and buffers of resident models", labels=["model_type"])
+        for model_type in registry.get_stats()['resident_models']:
+            loader = registry.peek(model_type)
+            if loader is not None:
+                memory.add_metric([model_type], loader.memory_bytes())
+        yield memory
+
+        passwords = get_password_hash_pool().get_stats()
+        yield GaugeMetricFamily("password_hash_in_flight", "Password hashes queued or running", value=passwords['in_flight'])
+        yield CounterMetricFamily("password_hash_rejected", "Logins and sign-ups rejected with 503", value=passwords['rejected'])
+        yield CounterMetricFamily("password_rehashed", "Stored hashes upgraded to the current bcrypt cost", value=passwords['rehashed'])
+
+        yield GaugeMetricFamily(
+            "explanation_jobs_pending", "Deferred explanations not yet computed",
+            value=get_explanation_jobs().get_stats()['pending'],
+        )
+
+        process = process_memory()
+        for key in ('rss_mb', 'pss_mb', 'uss_mb'):
+            if key in process:
+                yield GaugeMetricFamily(
+                    f"worker_{key[:-3]}_bytes", f"{key[:-3].upper()} of this worker process",
+                    value=process[key] * 1024 * 1024,
+                )
+
+
+_collector_registered = False
+
+def register_serving_collector(registry: CollectorRegistry = REGISTRY):
+    """Add ServingStatsCollector to the default registry once per process"""
+    global _collector_registered
+    if not _collector_registered:
+        registry.register(ServingStatsCollector())
+        _collector_registered = True
+
+
+def render_metrics() -> tuple:
+    """
+    Current metrics in the Prometheus text format
+
+    With PROMETHEUS_MULTIPROC_DIR set, histograms and counters are summed
+    across all gunicorn workers; gauges from ServingStatsCollector describe
+    the worker that served the scrape.
+
+    Returns:
+        tuple: (body bytes, content type)
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(ServingStatsCollector())
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,143 @@
+"""
+Bounded upload handling
+Rejects oversized request bodies before they are read and keeps large
+images on disk instead of copying them into memory.
+"""
+
+import json
+import os
+from typing import BinaryIO, Dict, Optional, Union
+
+from fastapi import HTTPException, UploadFile
+
+MAX_IMAGE_UPLOAD_MB = float(os.getenv("MAX_IMAGE_UPLOAD_MB", "10"))
+MAX_IMAGE_UPLOAD_BYTES = int(MAX_IMAGE_UPLOAD_MB * 1024 * 1024)
+# Images up to this size are read into memory; larger ones are decoded
+# straight from the temp file the multipart parser spooled them to
+UPLOAD_IN_MEMORY_BYTES = int(float(os.getenv("UPLOAD_IN_MEMORY_MB", "1")) * 1024 * 1024)
+# Allowance for multipart boundaries and part headers on top of the payload
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Raw bytes, or a readable, seekable binary file holding them
+ImageSource = Union[bytes, BinaryIO]
+
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": "jpeg",
+    b"\x89PNG\r\n\x1a\n": "png",
+}
+ZIP_SIGNATURES = (b"PK\x03\x04", b"PK\x05\x06")
+_SNIFF_BYTES = 8
+
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """Image format from the leading magic bytes, or None if unsupported"""
+    for signature, kind in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return kind
+    return None
+
+
+def _too_large(limit_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds the {limit_bytes / (1024 * 1024):.0f} MB limit")
+
+
+async def read_image_upload(
+    file: UploadFile,
+    max_bytes: int = MAX_IMAGE_UPLOAD_BYTES,
+    in_memory_bytes: int = UPLOAD_IN_MEMORY_BYTES,
+) -> ImageSource:
+    """
+    Validate an uploaded image and return it without unbounded reads
+
+    Args:
+        file: Multipart upload
+        max_bytes: Largest accepted image
+        in_memory_bytes: Images above this are returned as the spooled file
+
+    Returns:
+        bytes or file: Small images as bytes; large ones as the upload's own
+            temp file, rewound, valid until the request finishes
+
+    Raises:
+        HTTPException: 413 if the image is too large, 415 if its magic bytes
+            are not a supported image format
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    await file.seek(0)
+    if sniff_image_type(await file.read(_SNIFF_BYTES)) is None:
+        raise HTTPException(status_code=415, detail="File is not a JPEG or PNG image")
+    await file.seek(0)
+
+    if file.size is not None and file.size > in_memory_bytes:
+        return file.file
+
+    data = await file.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise _too_large(max_bytes)
+    return data
+
+
+class UploadLimitMiddleware:
+    """
+    Caps request body size per path prefix.
+
+    A Content-Length over the limit is answered with 413 before any of the
+    body is read. Bodies without one (chunked) are counted as they arrive
+    and the request fails with 413 as soon as the count passes the limit,
+    so the multipart parser never spools more than that to disk.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        # Longest prefix wins
+        self.limits = sorted(limits.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def limit_for(self, path: str) -> Optional[int]:
+        for prefix, limit in self.limits:
+            if path.startswith(prefix):
+                return limit
+        return None
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limit_for(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await self._reject(send, limit)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Re-raised by FastAPI's body parsing, so the app's
+                    # HTTPException handler formats the response
+                    raise _too_large(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    @staticmethod
+    async def _reject(send, limit: int):
+        exc = _too_large(limit)
+        body = json.dumps({"success": False, "error": exc.detail, "status_code": 413}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
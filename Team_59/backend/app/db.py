@@ -33,3 +33,15 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def create_missing_indexes(bind=engine):
+    """
+    Add indexes declared on the models to tables that already exist.
+
+    create_all() only creates indexes together with their table, so
+    databases created before an index was declared would never get it.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
@@ -1,17 +1,55 @@
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import List
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import List, Optional
 import logging
-import time
 from contextlib import asynccontextmanager
 import os
+import base64
 
 from .services.medical_image_service import get_medical_image_service
-from .services.prediction_service import get_prediction_service
-from .models.model_loader import get_model_loader
-from .db import Base, engine
+from .services.prediction_service import MAX_BATCH_FILES, get_prediction_service, get_batching_stats
+from .services.inference_executor import InferenceQueueFullError, get_inference_executor
+from .services.prediction_cache import get_prediction_cache
+from .services.cascade_service import (
+    CASCADE,
+    CASCADE_FIRST_STAGE,
+    CASCADE_SECOND_STAGE,
+    get_cascade_service,
+)
+from .services.explanation_jobs import READY, get_explanation_jobs
+from .services.prediction_jobs import PREDICTION_JOB_MAX_UPLOAD_MB, PredictionJobError, get_prediction_jobs
+from .services.gradcam_service import (
+    ATTENTION_ROLLOUT,
+    EXPLANATION_FORMATS,
+    EXPLANATION_METHODS,
+    GRADCAM,
+    DEFAULT_IMAGE_QUALITY,
+    DEFAULT_CAM_ARRAY_SIZE,
+    ExplanationOptions,
+)
+from .models.model_registry import get_model_registry
+from .models.checkpoint_watcher import get_checkpoint_watcher
+from .core.memory import process_memory
+from .core.password_pool import PasswordHashQueueFullError, get_password_hash_pool
+from .core.telemetry import SERIALIZE, record_request, register_serving_collector, render_metrics, stage_timer
+from .core.uploads import (
+    MAX_IMAGE_UPLOAD_BYTES,
+    MULTIPART_OVERHEAD_BYTES,
+    UploadLimitMiddleware,
+    read_image_upload,
+)
+from .db import Base, create_missing_indexes, engine
 from .routers import auth, courses,lessons
+from .routers.courses import NEXT_CURSOR_HEADER
+
+_IMPORTS_MS = (time.perf_counter() - _IMPORT_STARTED) * 1000
 
 
 
@@ -32,6 +70,12 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 DEFAULT_MODEL_TYPE = os.getenv("MODEL_TYPE", "mobilenetv2").lower()
+# Endpoints that serve a single model fall back to the cascade's first stage
+DEFAULT_SINGLE_MODEL_TYPE = CASCADE_FIRST_STAGE if DEFAULT_MODEL_TYPE == CASCADE else DEFAULT_MODEL_TYPE
+DEFER_EXPLANATIONS = os.getenv("DEFER_EXPLANATIONS", "0").lower() in ("1", "true", "yes")
+EXPLANATION_METHOD = os.getenv("EXPLANATION_METHOD", GRADCAM).lower()
+# Bulk requests default to the gradient-free method (see benchmarks/explanation_methods.py)
+BATCH_EXPLANATION_METHOD = os.getenv("BATCH_EXPLANATION_METHOD", ATTENTION_ROLLOUT).lower()
 
 
 @asynccontextmanager
@@ -39,20 +83,32 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Healthcare AR Platform...")
 
     try:
+        started = time.perf_counter()
         # Create DB tables on startup (for simple deployments).
         # For larger systems, consider Alembic migrations instead.
         Base.metadata.create_all(bind=engine)
-
-        model_loader = get_model_loader(
-            model_path=(
-                "trained_models/mobilenetv2_small_model.pth"
-                if DEFAULT_MODEL_TYPE == "mobilenetv2"
-                else "trained_models/enhanced_hybrid_model.pth"
-            ),
-            model_type=DEFAULT_MODEL_TYPE,
-        )
-        model_loader.load_model()
+        create_missing_indexes(engine)
+        database_ms = (time.perf_counter() - started) * 1000
+
+        # Warm the registry with the default model; others load on first use
+        if DEFAULT_MODEL_TYPE == CASCADE:
+            get_model_registry().get(CASCADE_SECOND_STAGE)
+            loader = get_model_registry().get(CASCADE_FIRST_STAGE)
+        else:
+            loader = get_model_registry().get(DEFAULT_MODEL_TYPE)
+        model_ms = (time.perf_counter() - started) * 1000 - database_ms
         logger.info("%s classifier loaded successfully", DEFAULT_MODEL_TYPE)
+        logger.info(
+            f"Startup ready in {_IMPORTS_MS + database_ms + model_ms:.0f} ms - "
+            f"imports {_IMPORTS_MS:.0f} ms, database {database_ms:.0f} ms, "
+            f"model {model_ms:.0f} ms {loader.load_timings_ms}"
+        )
+        # bcrypt workers, started now so the first logins do not pay for it
+        get_password_hash_pool().start()
+        # Picks up queued jobs and resumes ones interrupted by a restart
+        await get_prediction_jobs().start()
+        # Swaps in updated checkpoints (CHECKPOINT_WATCH_SECONDS > 0)
+        get_checkpoint_watcher().start()
         yield
 
     except Exception as e:
@@ -61,6 +117,11 @@ async def lifespan(app: FastAPI):
 
     finally:
         logger.info("Shutting down services...")
+        get_checkpoint_watcher().stop()
+        get_inference_executor().shutdown()
+        get_explanation_jobs().shutdown()
+        get_password_hash_pool().shutdown()
+        await get_prediction_jobs().stop()
 
 
 app = FastAPI(
@@ -70,6 +131,17 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# --- Upload limits ---
+# Added before CORS so 413 responses still carry CORS headers
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        "/api/medical/predict": MAX_IMAGE_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+        "/api/medical/batch-predict": MAX_BATCH_FILES * (MAX_IMAGE_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES),
+        "/api/medical/jobs": int(PREDICTION_JOB_MAX_UPLOAD_MB * 1024 * 1024) + MULTIPART_OVERHEAD_BYTES,
+    },
+)
+
 # --- CORS Middleware ---
 app.add_middleware(
     CORSMiddleware,
@@ -77,6 +149,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 # ----------------------
 
@@ -89,14 +162,27 @@ app.include_router(lessons.router, prefix="/api", tags=["lessons"])
 # ----------------
 
 
+register_serving_collector()
+
+
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     start = time.time()
     response = await call_next(request)
-    response.headers["X-Process-Time"] = f"{time.time() - start:.3f}"
+    elapsed = time.time() - start
+    response.headers["X-Process-Time"] = f"{elapsed:.3f}"
+    # Route template, not the raw path, so ids do not explode label cardinality
+    route = request.scope.get("route")
+    record_request(request.method, route.path if route is not None else "unmatched", response.status_code, elapsed)
     return response
 
 
+def _timed_json(content, model_type: str) -> JSONResponse:
+    """Serialize a prediction payload, recording it as the serialize stage"""
+    with stage_timer(model_type, SERIALIZE):
+        return JSONResponse(content=jsonable_encoder(content))
+
+
 @app.get("/")
 async def root():
     return {
@@ -136,63 +222,269 @@ async def health_check():
 async def predict_medical_image(
     file: UploadFile = File(...),
     generate_explanation: bool = True,
+    defer_explanation: bool = Query(
+        DEFER_EXPLANATIONS,
+        description="Return the classification now and poll /api/medical/explanations/{id} for the heatmap",
+    ),
+    explanation_format: str = Query("png", enum=list(EXPLANATION_FORMATS)),
+    explanation_method: str = Query(EXPLANATION_METHOD, enum=list(EXPLANATION_METHODS)),
+    image_quality: int = Query(DEFAULT_IMAGE_QUALITY, ge=1, le=100),
+    cam_size: int = Query(DEFAULT_CAM_ARRAY_SIZE, ge=8, le=224),
     model_type: str = Query(
         DEFAULT_MODEL_TYPE,
-        enum=["mobilenetv2", "hybrid_cnn_vit"],
+        enum=["mobilenetv2", "hybrid_cnn_vit", CASCADE],
+    ),
+    cascade_threshold: Optional[float] = Query(
+        None,
+        ge=0.0,
+        le=1.0,
+        description="With model_type=cascade, escalate to the hybrid below this MobileNetV2 confidence",
     ),
 ):
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
 
+    image_bytes = await read_image_upload(file)
+    explanation_options = ExplanationOptions(explanation_format, image_quality, cam_size, explanation_method)
+    if model_type == CASCADE:
+        result = await get_cascade_service().predict_from_bytes(
+            image_bytes,
+            generate_explanation,
+            defer_explanation=defer_explanation,
+            explanation_options=explanation_options,
+            threshold=cascade_threshold,
+        )
+        return _timed_json(result, CASCADE)
+
     prediction_service = get_prediction_service(model_type=model_type)
-    image_bytes = await file.read()
     result = await prediction_service.predict_from_bytes(
         image_bytes,
         generate_explanation,
+        defer_explanation=defer_explanation,
+        explanation_options=explanation_options,
+    )
+    return _timed_json(result, model_type)
+
+
+@app.get("/api/medical/explanations/{explanation_id}")
+async def get_explanation(explanation_id: str):
+    job = get_explanation_jobs().get(explanation_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Explanation not found or expired")
+
+    response = {"explanation_id": explanation_id, "status": job["status"]}
+    if job["result"] is not None:
+        response.update(job["result"])
+    if job["error"] is not None:
+        response["error"] = job["error"]
+    return response
+
+
+@app.get("/api/medical/explanations/{explanation_id}/cam")
+async def get_explanation_cam(explanation_id: str):
+    """Raw row-major uint8 CAM for explanations requested as cam_uint8"""
+    job = get_explanation_jobs().get(explanation_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Explanation not found or expired")
+    if job["status"] != READY:
+        raise HTTPException(status_code=409, detail=f"Explanation is {job['status']}")
+
+    cam = job["result"].get("cam")
+    if cam is None or cam.get("encoding") != "uint8":
+        raise HTTPException(
+            status_code=404,
+            detail="No raw CAM for this explanation; request explanation_format=cam_uint8",
+        )
+    return Response(
+        content=base64.b64decode(cam["data"]),
+        media_type="application/octet-stream",
+        headers={"X-Cam-Width": str(cam["width"]), "X-Cam-Height": str(cam["height"])},
     )
-    return result
 
 
 @app.post("/api/medical/batch-predict")
 async def batch_predict_medical_images(
     files: List[UploadFile] = File(...),
     generate_explanations: bool = False,
+    explain_indices: Optional[List[int]] = Query(
+        None,
+        description="Only generate explanations for these file positions",
+    ),
+    explanation_format: str = Query("png", enum=list(EXPLANATION_FORMATS)),
+    explanation_method: str = Query(BATCH_EXPLANATION_METHOD, enum=list(EXPLANATION_METHODS)),
+    image_quality: int = Query(DEFAULT_IMAGE_QUALITY, ge=1, le=100),
+    cam_size: int = Query(DEFAULT_CAM_ARRAY_SIZE, ge=8, le=224),
     model_type: str = Query(
-        DEFAULT_MODEL_TYPE,
+        DEFAULT_SINGLE_MODEL_TYPE,
         enum=["mobilenetv2", "hybrid_cnn_vit"],
     ),
 ):
-    if len(files) > 10:
-        raise HTTPException(
-            status_code=400,
-            detail="Maximum 10 files allowed per batch",
-        )
-
     prediction_service = get_prediction_service(model_type=model_type)
-    image_bytes_list = [await file.read() for file in files]
+
+    # Too many files or too much memory is a size limit, not malformed input
+    rejection = prediction_service.check_batch_budget(len(files), 0)
+    if rejection:
+        raise HTTPException(status_code=413, detail=rejection)
+
+    # Sizes are known from the spooled parts, so the budget is checked
+    # before any image is read into memory
+    rejection = prediction_service.check_batch_budget(len(files), sum(file.size or 0 for file in files))
+    if rejection:
+        raise HTTPException(status_code=413, detail=rejection)
+    image_bytes_list = []
+    for file in files:
+        try:
+            image_bytes_list.append(await read_image_upload(file))
+        except HTTPException as e:
+            if e.status_code != 415:
+                raise
+            # Size is already bounded; the decoder reports it inline like
+            # any other unreadable image in the batch
+            image_bytes_list.append(await file.read(MAX_IMAGE_UPLOAD_BYTES))
+
+    if explain_indices is not None:
+        wanted = set(explain_indices)
+        explain_flags = [i in wanted for i in range(len(files))]
+    else:
+        explain_flags = [generate_explanations] * len(files)
+
     results = await prediction_service.batch_predict(
         image_bytes_list,
-        generate_explanations,
+        explain_flags,
+        ExplanationOptions(explanation_format, image_quality, cam_size, explanation_method),
     )
-    return {"success": True, "total_files": len(files), "results": results}
+    return _timed_json({"success": True, "total_files": len(files), "results": results}, model_type)
+
+
+async def _spool_job_uploads(job_id: str, files: List[UploadFile]) -> int:
+    jobs = get_prediction_jobs()
+    added = 0
+    for file in files:
+        added += await run_in_threadpool(jobs.add_upload, job_id, file.filename, file.file)
+    return added
+
+
+@app.post("/api/medical/jobs", status_code=202)
+async def create_prediction_job(
+    files: List[UploadFile] = File(
+        ...,
+        description="Zip archives of images and/or individual images",
+    ),
+    start: bool = Query(
+        True,
+        description="Queue the job now; pass false to add more chunks via /files first",
+    ),
+    model_type: str = Query(
+        DEFAULT_SINGLE_MODEL_TYPE,
+        enum=["mobilenetv2", "hybrid_cnn_vit"],
+    ),
+):
+    jobs = get_prediction_jobs()
+    job = await run_in_threadpool(jobs.create_job, model_type)
+    try:
+        await _spool_job_uploads(job["job_id"], files)
+        if start:
+            return await run_in_threadpool(jobs.start_job, job["job_id"])
+        return await run_in_threadpool(jobs.get_job, job["job_id"])
+    except PredictionJobError:
+        await run_in_threadpool(jobs.cancel_job, job["job_id"])
+        raise
+
+
+@app.post("/api/medical/jobs/{job_id}/files", status_code=202)
+async def add_prediction_job_files(job_id: str, files: List[UploadFile] = File(...)):
+    await _spool_job_uploads(job_id, files)
+    return await run_in_threadpool(get_prediction_jobs().get_job, job_id)
+
+
+@app.post("/api/medical/jobs/{job_id}/start", status_code=202)
+async def start_prediction_job(job_id: str):
+    return await run_in_threadpool(get_prediction_jobs().start_job, job_id)
+
+
+@app.get("/api/medical/jobs/{job_id}")
+async def get_prediction_job(job_id: str):
+    job = await run_in_threadpool(get_prediction_jobs().get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Prediction job not found")
+    return job
+
+
+@app.get("/api/medical/jobs/{job_id}/results")
+async def stream_prediction_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0, description="Skip this many results, e.g. to resume a dropped stream"),
+    follow: bool = Query(True, description="Keep streaming until the job finishes"),
+):
+    """Results as NDJSON, one line per image in upload order, as they complete"""
+    if await run_in_threadpool(get_prediction_jobs().get_job, job_id) is None:
+        raise HTTPException(status_code=404, detail="Prediction job not found")
+    return StreamingResponse(
+        get_prediction_jobs().stream_results(job_id, offset, follow),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.delete("/api/medical/jobs/{job_id}")
+async def cancel_prediction_job(job_id: str):
+    return await run_in_threadpool(get_prediction_jobs().cancel_job, job_id)
 
 
 @app.get("/api/medical/model-info")
 async def get_model_information(
     model_type: str = Query(
-        DEFAULT_MODEL_TYPE,
+        DEFAULT_SINGLE_MODEL_TYPE,
         enum=["mobilenetv2", "hybrid_cnn_vit"],
     )
 ):
     try:
         prediction_service = get_prediction_service(model_type=model_type)
-        model_info = prediction_service.get_model_info()
+        # May load the model from disk, so keep it off the event loop
+        model_info = await get_inference_executor().run(prediction_service.get_model_info)
+        model_info["hot_reload"] = get_checkpoint_watcher().get_stats()
         return model_info
     except Exception as e:
         logger.error("Failed to get model info: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/medical/batching-stats")
+async def get_batching_statistics():
+    return {
+        "batchers": get_batching_stats(),
+        "executor": get_inference_executor().get_stats(),
+        "explanation_jobs": get_explanation_jobs().get_stats(),
+        "prediction_jobs": await run_in_threadpool(get_prediction_jobs().get_stats),
+    }
+
+
+@app.get("/api/medical/cache-stats")
+async def get_cache_statistics():
+    return get_prediction_cache().get_stats()
+
+
+@app.get("/api/medical/cascade-stats")
+async def get_cascade_statistics():
+    return get_cascade_service().get_stats()
+
+
+@app.get("/api/medical/memory-stats")
+async def get_memory_statistics():
+    """Memory of the worker that served this request, unique vs shared"""
+    return {
+        **process_memory(),
+        "parent_pid": os.getppid(),
+        "registry": get_model_registry().get_stats(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint: stage histograms, request metrics and serving stats"""
+    body, content_type = await run_in_threadpool(render_metrics)
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/api/medical/capabilities")
 async def get_medical_capabilities():
     try:
@@ -216,6 +508,41 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     )
 
 
+@app.exception_handler(PasswordHashQueueFullError)
+async def password_hash_queue_full_handler(request: Request, exc: PasswordHashQueueFullError):
+    # Same body shape as the auth routes' HTTPExceptions
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+        content={"detail": str(exc)},
+    )
+
+
+@app.exception_handler(InferenceQueueFullError)
+async def inference_queue_full_handler(request: Request, exc: InferenceQueueFullError):
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+        content={
+            "success": False,
+            "error": str(exc),
+            "status_code": 503,
+        },
+    )
+
+
+@app.exception_handler(PredictionJobError)
+async def prediction_job_error_handler(request: Request, exc: PredictionJobError):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "success": False,
+            "error": str(exc),
+            "status_code": exc.status_code,
+        },
+    )
+
+
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     logger.error("Unhandled exception: %s", exc)
@@ -6,20 +6,45 @@ Version 2.0.0
 __version__ = "2.0.0"
 __app_name__ = "Healthcare AR Platform"
 
+import importlib
+
 # Import key model components only
-from .hybrid_cnn_vit import ImprovedHybridCNNViT
-from .gradcam import GradCAM
-from .model_loader import ModelLoader
 from .user import User
 from .course import Course
 from .enrollment import Enrollment
+from .prediction_job import PredictionJob, PredictionJobResult
+from .principal_invalidation import PrincipalInvalidation
+from .catalog_change import CatalogChange
+
+# ML components pull in torch/timm/transformers, so they are imported on
+# first access; the LMS routes only need the ORM models above
+_LAZY_IMPORTS = {
+    'ImprovedHybridCNNViT': '.hybrid_cnn_vit',
+    'GradCAM': '.gradcam',
+    'ModelLoader': '.model_loader',
+    'ModelRegistry': '.model_registry',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     'ImprovedHybridCNNViT',
     'GradCAM',
     'ModelLoader',
+    'ModelRegistry',
     "User",
     "Course",
     "Enrollment",
+    "PredictionJob",
+    "PredictionJobResult",
+    "PrincipalInvalidation",
+    "CatalogChange",
     "Lesson",
 ]
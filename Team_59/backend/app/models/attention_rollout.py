@@ -0,0 +1,98 @@
+"""
+Attention Rollout for the hybrid CNN-Transformer
+Gradient-free explanation maps built from the attention weights of a
+single no-grad forward pass
+"""
+
+import torch
+import torch.nn.functional as F
+import numpy as np
+from typing import Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AttentionRollout:
+    """
+    Attention rollout (Abnar & Zuidema, 2020) combined with cross-attention
+
+    The ViT self-attentions are rolled out layer by layer to get how much
+    each image patch flows into the CLS token. The hybrid fuses that token
+    with pooled CNN features through cross-attention over three scales, so
+    the CNN side is mapped by weighting each scale's activation energy with
+    its cross-attention weight. The two maps are blended into one CAM.
+
+    Unlike GradCAM the map is class-agnostic and needs no backward pass.
+    """
+
+    def __init__(self, model: torch.nn.Module, vit_weight: float = 0.5, head_fusion: str = "mean"):
+        """
+        Initialize AttentionRollout
+
+        Args:
+            model: Hybrid model exposing forward_with_attentions()
+            vit_weight: Share of the ViT rollout in the blended map
+            head_fusion: How to combine attention heads, "mean" or "max"
+        """
+        self.model = model
+        self.model.eval()
+        self.vit_weight = vit_weight
+        self.head_fusion = head_fusion
+
+        logger.info("AttentionRollout initialized")
+
+    def generate_with_outputs(self, x: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, np.ndarray]:
+        """
+        Classify and build the rollout map in one no-grad forward pass
+
+        Args:
+            x: Input tensor [1, 3, 224, 224]
+
+        Returns:
+            tuple: (logits, cross-attention weights, map [224, 224] in [0, 1])
+        """
+        with torch.no_grad():
+            logits, attention_weights, vit_attentions, cnn_features = self.model.forward_with_attentions(x)
+
+            vit_map = self._normalize(self._rollout(vit_attentions))
+            cnn_map = self._normalize(self._cnn_map(cnn_features, attention_weights))
+            cam = self.vit_weight * vit_map + (1 - self.vit_weight) * cnn_map
+
+        return logits, attention_weights, self._normalize(cam).squeeze().cpu().numpy()
+
+    def _rollout(self, attentions: Sequence[torch.Tensor]) -> torch.Tensor:
+        """Roll out per-layer attentions [1, heads, T, T] into a [1, 1, 224, 224] patch map"""
+        result = None
+        for attention in attentions:
+            attention = attention.float()
+            fused = attention.max(dim=1).values if self.head_fusion == "max" else attention.mean(dim=1)
+
+            # Account for the residual connection, then re-normalise rows
+            identity = torch.eye(fused.size(-1), device=fused.device)
+            fused = 0.5 * fused + 0.5 * identity
+            fused = fused / fused.sum(dim=-1, keepdim=True)
+
+            result = fused if result is None else torch.bmm(fused, result)
+
+        # Attention flowing from each patch (token 0 is CLS) into CLS
+        patch_scores = result[:, 0, 1:]
+        side = int(patch_scores.size(-1) ** 0.5)
+        patch_map = patch_scores.reshape(-1, 1, side, side)
+        return F.interpolate(patch_map, size=(224, 224), mode='bilinear', align_corners=False)
+
+    def _cnn_map(self, cnn_features: Sequence[torch.Tensor], attention_weights: torch.Tensor) -> torch.Tensor:
+        """Activation energy of each CNN scale weighted by its cross-attention weight"""
+        scale_weights = attention_weights.float().reshape(attention_weights.size(0), -1)  # [1, scales]
+        cam = None
+        for i, features in enumerate(cnn_features):
+            energy = features.float().abs().mean(dim=1, keepdim=True)
+            energy = F.interpolate(energy, size=(224, 224), mode='bilinear', align_corners=False)
+            weighted = scale_weights[:, i].view(-1, 1, 1, 1) * self._normalize(energy)
+            cam = weighted if cam is None else cam + weighted
+        return cam
+
+    @staticmethod
+    def _normalize(cam: torch.Tensor) -> torch.Tensor:
+        cam = cam - cam.min()
+        peak = cam.max()
+        return cam / peak if peak > 0 else cam
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, DateTime, Index
+from sqlalchemy.sql import func
+from ..db import Base
+
+
+class CatalogChange(Base):
+    """
+    Latest write to each course in the catalog. The count and sum of the
+    ids form the catalog version, and those of a course's rows its
+    version; both feed the catalog ETags. A write inserts a new row and
+    deletes the course's old one, so writers to different courses never
+    contend the way bumping a shared counter row would.
+    """
+    __tablename__ = "catalog_changes"
+    __table_args__ = (
+        Index("ix_catalog_changes_course_id_id", "course_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    course_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,147 @@
+"""
+Checkpoint reading for fast model startup
+Memory-maps .pth checkpoints and reads .safetensors files, so weights are
+paged in from the file instead of being unpickled into fresh buffers.
+
+Convert a checkpoint once (e.g. at image build time) with:
+    python -m app.models.checkpoint_io trained_models/enhanced_hybrid_model.pth
+"""
+
+import argparse
+import json
+import logging
+import os
+import pickle
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+STATE_DICT_KEY = 'model_state_dict'
+# Memory-mapped weights are read from the checkpoint for as long as the model
+# lives, so rewriting the file in place (e.g. cp onto a mounted volume)
+# corrupts the serving model. With hot reload enabled weights are copied
+# into memory instead, unless CHECKPOINT_MMAP says otherwise.
+_HOT_RELOAD = float(os.getenv("CHECKPOINT_WATCH_SECONDS", "0")) > 0
+CHECKPOINT_MMAP = os.getenv("CHECKPOINT_MMAP", "0" if _HOT_RELOAD else "1").lower() in ("1", "true", "yes")
+
+
+def resolve_checkpoint_path(model_path: Path) -> Path:
+    """Prefer a converted .safetensors file sitting next to the checkpoint"""
+    converted = model_path.with_suffix('.safetensors')
+    try:
+        # A checkpoint replaced after conversion makes the converted copy stale
+        if converted.stat().st_mtime_ns >= model_path.stat().st_mtime_ns:
+            return converted
+    except FileNotFoundError:
+        pass
+    return model_path
+
+
+def checkpoint_signature(model_path: Path) -> Optional[Tuple[str, int, int]]:
+    """(resolved path, size, mtime) of the file a load would read, None if missing"""
+    path = resolve_checkpoint_path(Path(model_path))
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return str(path), stat.st_size, stat.st_mtime_ns
+
+
+def _torch_load(path: Path, device: str, mmap: bool = True) -> Any:
+    weights_only = True
+    while True:
+        try:
+            return torch.load(path, map_location=device, mmap=mmap, weights_only=weights_only)
+        except pickle.UnpicklingError:
+            if not weights_only:
+                raise
+            # Training metadata (e.g. numpy scalars) is outside the safe allowlist;
+            # checkpoints are trusted local files shipped with the image
+            logger.info(f"{path.name} has non-tensor metadata, loading with full unpickling")
+            weights_only = False
+        except RuntimeError as e:
+            if not mmap:
+                raise
+            # Legacy (pre-zipfile) serialization cannot be memory-mapped
+            logger.info(f"{path.name} cannot be memory-mapped ({e}), reading it into memory")
+            mmap = False
+
+
+def load_checkpoint(
+    path: Path,
+    device: str = "cpu",
+    mmap: bool = CHECKPOINT_MMAP,
+) -> Tuple[Dict[str, torch.Tensor], Dict[str, Any]]:
+    """
+    Read weights and training metadata from a checkpoint
+
+    Args:
+        path: .pth file (a state dict, or a dict holding 'model_state_dict')
+            or a .safetensors file written by convert_to_safetensors
+        device: Device to map tensors to
+        mmap: Page weights in from the file instead of copying them
+
+    Returns:
+        tuple: (state_dict, metadata such as epoch / val_acc / val_f1)
+    """
+    if path.suffix == '.safetensors':
+        from safetensors import safe_open
+        from safetensors.torch import load, load_file
+
+        with safe_open(str(path), framework="pt") as f:
+            metadata = f.metadata() or {}
+        metadata = {k: json.loads(v) for k, v in metadata.items()}
+        if mmap:
+            return load_file(str(path), device=device), metadata
+        state_dict = {k: v.to(device) for k, v in load(path.read_bytes()).items()}
+        return state_dict, metadata
+
+    checkpoint = _torch_load(path, device, mmap)
+    if isinstance(checkpoint, dict) and STATE_DICT_KEY in checkpoint:
+        metadata = {k: v for k, v in checkpoint.items() if k != STATE_DICT_KEY}
+        return checkpoint[STATE_DICT_KEY], metadata
+    return checkpoint, {}
+
+
+def convert_to_safetensors(path: Path, output_path: Optional[Path] = None) -> Path:
+    """
+    Write a .safetensors copy of a .pth checkpoint
+
+    JSON-serialisable metadata is kept in the safetensors header; anything
+    else is stored as its string form.
+    """
+    from safetensors.torch import save_file
+
+    state_dict, metadata = load_checkpoint(path)
+    output_path = output_path or path.with_suffix('.safetensors')
+    header = {}
+    for key, value in metadata.items():
+        if hasattr(value, 'item'):  # numpy / torch scalars
+            value = value.item()
+        try:
+            header[key] = json.dumps(value)
+        except TypeError:
+            header[key] = json.dumps(str(value))
+
+    save_file({k: v.contiguous() for k, v in state_dict.items()}, str(output_path), metadata=header)
+    return output_path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Convert a .pth checkpoint to .safetensors")
+    parser.add_argument("checkpoint")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    output = convert_to_safetensors(Path(args.checkpoint), Path(args.output) if args.output else None)
+    print(f"Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+Checkpoint hot-reload
+Watches the checkpoints of resident models and swaps in updated weights
+without a restart or a cold first request
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+
+from .checkpoint_io import checkpoint_signature
+from .model_loader import ModelLoader
+from .model_registry import ModelRegistry, get_model_registry
+
+logger = logging.getLogger(__name__)
+
+# Poll interval in seconds; 0 disables the watcher
+CHECKPOINT_WATCH_SECONDS = float(os.getenv("CHECKPOINT_WATCH_SECONDS", "0"))
+RELOAD_PROBE_BATCH = int(os.getenv("RELOAD_PROBE_BATCH", "4"))
+# Largest logit difference tolerated between an exported graph and its eager model
+RELOAD_EXPORT_TOLERANCE = float(os.getenv("RELOAD_EXPORT_TOLERANCE", "1e-3"))
+
+
+def _logits(outputs) -> torch.Tensor:
+    return (outputs[0] if isinstance(outputs, (tuple, list)) else outputs).float()
+
+
+def smoke_check(current: ModelLoader, candidate: ModelLoader, batch_size: int = RELOAD_PROBE_BATCH) -> Dict[str, Any]:
+    """
+    Warm up a freshly loaded model and check it can replace the current one
+
+    The candidate must produce finite logits with the same shape as the
+    serving model, and an exported graph must match its own eager model.
+    Top-1 agreement with the serving model on the probe batch is reported
+    but not enforced, since retrained weights are expected to differ.
+
+    Args:
+        current: Loader serving traffic now
+        candidate: Newly loaded loader
+
+    Returns:
+        dict: warmup_ms, top1_agreement_with_previous and, for graph
+            backends, export_max_abs_diff
+
+    Raises:
+        ValueError: If the candidate fails a check
+    """
+    probe = torch.randn(batch_size, 3, 224, 224, generator=torch.Generator().manual_seed(0))
+
+    # First calls pay for graph optimisation and allocator growth; do them
+    # here rather than on the first request after the swap
+    start = time.perf_counter()
+    candidate.forward(candidate.prepare_input(probe[:1]))
+    new_logits = _logits(candidate.forward(candidate.prepare_input(probe)))
+    warmup_ms = (time.perf_counter() - start) * 1000
+    old_logits = _logits(current.forward(current.prepare_input(probe)))
+
+    if new_logits.shape != old_logits.shape:
+        raise ValueError(f"Output shape changed from {tuple(old_logits.shape)} to {tuple(new_logits.shape)}")
+    if not torch.isfinite(new_logits).all():
+        raise ValueError("New checkpoint produces non-finite logits")
+
+    report = {
+        'warmup_ms': round(warmup_ms, 1),
+        'top1_agreement_with_previous': round(
+            (new_logits.argmax(dim=1) == old_logits.argmax(dim=1)).float().mean().item(), 4
+        ),
+    }
+    if candidate.exported is not None:
+        with torch.no_grad():
+            eager_logits = _logits(candidate.model(candidate.prepare_input(probe)))
+        diff = (new_logits - eager_logits).abs().max().item()
+        if diff > RELOAD_EXPORT_TOLERANCE:
+            raise ValueError(f"{candidate.backend} graph differs from eager model by {diff:.2e}")
+        report['export_max_abs_diff'] = diff
+    return report
+
+
+class CheckpointWatcher:
+    """
+    Background thread that reloads resident models whose checkpoint changed.
+
+    A change is acted on once the file's size and mtime have been stable
+    for one poll interval, so a checkpoint that is still being copied is
+    not loaded half-written. A checkpoint that fails to load or to pass
+    smoke_check() is skipped until the file changes again.
+    """
+
+    def __init__(self, registry: Optional[ModelRegistry] = None, interval: float = CHECKPOINT_WATCH_SECONDS):
+        self.registry = registry or get_model_registry()
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pending: Dict[str, Tuple] = {}  # signature seen on the previous poll
+        self._rejected: Dict[str, Tuple] = {}
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._reloads = 0
+        self._failures = 0
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="checkpoint-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"CheckpointWatcher started - polling every {self.interval:.0f}s")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Checkpoint watcher poll failed: {e}")
+
+    def poll(self) -> List[str]:
+        """
+        Check every resident model once
+
+        Returns:
+            list: Model types that were swapped
+        """
+        swapped = []
+        for model_type in self.registry.get_stats()['resident_models']:
+            loader = self.registry.peek(model_type)
+            if loader is None:
+                continue
+            signature = checkpoint_signature(loader.model_path)
+            if signature is None or signature == loader.checkpoint_signature or signature == self._rejected.get(model_type):
+                self._pending.pop(model_type, None)
+                continue
+            if self._pending.get(model_type) != signature:
+                self._pending[model_type] = signature
+                continue
+
+            del self._pending[model_type]
+            logger.info(f"Checkpoint for {model_type} changed, reloading in the background")
+            try:
+                report = self.registry.reload(model_type, check=smoke_check)
+            except Exception as e:
+                self._failures += 1
+                self._rejected[model_type] = signature
+                self._last[model_type] = {'status': 'rejected', 'error': str(e), 'at': time.time()}
+                logger.error(f"Reload of {model_type} rejected, keeping the current model: {e}")
+                continue
+            if report is None:
+                continue
+
+            self._rejected.pop(model_type, None)
+            self._last[model_type] = {'status': 'swapped' if report['swapped'] else 'unchanged', **report, 'at': time.time()}
+            if report['swapped']:
+                self._reloads += 1
+                swapped.append(model_type)
+        return swapped
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self._thread is not None,
+            'interval_seconds': self.interval,
+            'reloads': self._reloads,
+            'failures': self._failures,
+            'last_reload': dict(self._last),
+        }
+
+
+# Global watcher instance
+_checkpoint_watcher = None
+
+def get_checkpoint_watcher() -> CheckpointWatcher:
+    """Get singleton checkpoint watcher"""
+    global _checkpoint_watcher
+    if _checkpoint_watcher is None:
+        _checkpoint_watcher = CheckpointWatcher()
+    return _checkpoint_watcher
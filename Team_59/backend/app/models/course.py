@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..db import Base
@@ -6,6 +6,15 @@ from ..db import Base
 
 class Course(Base):
     __tablename__ = "courses"
+    # Catalog pages are keyset-paginated on id, so every filter index ends
+    # with id: a filtered page is one index range scan in id order
+    __table_args__ = (
+        Index("ix_courses_category_level_id", "category", "level", "id"),
+        Index("ix_courses_level_id", "level", "id"),
+        Index("ix_courses_has_ar_id", "has_ar", "id"),
+        Index("ix_courses_price_id", "price", "id"),
+        Index("ix_courses_instructor_id_id", "instructor_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
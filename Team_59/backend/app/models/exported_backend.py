@@ -0,0 +1,200 @@
+"""
+Exported-graph inference backends
+Serves the classifiers from a TorchScript module or an ONNX Runtime session
+instead of eager PyTorch. Artifacts are exported once and cached next to
+the checkpoint, keyed by the checkpoint hash.
+
+Compare the backends against eager with:
+    python -m benchmarks.export_backends --model-type hybrid_cnn_vit
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_BACKENDS = ("eager", "torchscript", "onnx")
+ONNX_OPSET = int(os.getenv("ONNX_OPSET", "17"))
+
+# Outputs in the order the eager forward() returns them
+OUTPUT_NAMES = {
+    'hybrid_cnn_vit': ("logits", "attention_weights", "cnn_features"),
+    'mobilenetv2': ("logits",),
+}
+_ARTIFACT_SUFFIX = {'torchscript': ".ts.pt", 'onnx': ".onnx"}
+
+
+def resolve_backend(model_type: str) -> str:
+    """
+    Inference backend for a model type from the environment
+
+    INFERENCE_BACKEND_<MODEL_TYPE> overrides INFERENCE_BACKEND, which
+    defaults to eager.
+    """
+    backend = os.getenv(
+        f"INFERENCE_BACKEND_{model_type.upper()}",
+        os.getenv("INFERENCE_BACKEND", "eager"),
+    ).lower()
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unsupported inference backend '{backend}', expected one of {INFERENCE_BACKENDS}")
+    return backend
+
+
+def artifact_path(model_path: Path, checkpoint_hash: str, backend: str, precision: str = "fp32") -> Path:
+    """Cache location of an exported graph, next to its checkpoint"""
+    tag = checkpoint_hash[:16] if precision == "fp32" else f"{checkpoint_hash[:16]}.{precision}"
+    return model_path.parent / f"{model_path.stem}.{tag}{_ARTIFACT_SUFFIX[backend]}"
+
+
+class _TupleOutputs(nn.Module):
+    """Wraps a model so tracing/export always sees a tuple of tensors"""
+
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x: torch.Tensor):
+        outputs = self.model(x)
+        return tuple(outputs) if isinstance(outputs, (tuple, list)) else (outputs,)
+
+
+def _export(model: nn.Module, model_type: str, backend: str, path: Path, example: torch.Tensor):
+    wrapped = _TupleOutputs(model).eval()
+    # Write-then-rename so concurrent workers never load a partial artifact
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=path.suffix + '.tmp')
+    os.close(fd)
+    try:
+        with torch.no_grad():
+            if backend == "torchscript":
+                traced = torch.jit.trace(wrapped, example, check_trace=False, strict=False)
+                torch.jit.save(torch.jit.freeze(traced), tmp_path)
+            else:
+                names = OUTPUT_NAMES[model_type]
+                torch.onnx.export(
+                    wrapped,
+                    (example,),
+                    tmp_path,
+                    input_names=["image"],
+                    output_names=list(names),
+                    dynamic_axes={name: {0: "batch"} for name in ("image",) + names},
+                    opset_version=ONNX_OPSET,
+                    dynamo=False,
+                )
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+class ExportedModel:
+    """
+    Callable with the same outputs as the eager model's forward()
+
+    Hybrid models return (logits, attention_weights, cnn_features);
+    MobileNetV2 returns logits. No autograd, so GradCAM keeps using the
+    eager model.
+    """
+
+    def __init__(self, backend: str, path: Path, run: Callable[[torch.Tensor], Tuple[torch.Tensor, ...]]):
+        self.backend = backend
+        self.path = path
+        self._run = run
+
+    def __call__(self, x: torch.Tensor):
+        outputs = self._run(x)
+        return outputs if len(outputs) > 1 else outputs[0]
+
+
+def _load_torchscript(path: Path, device: str) -> ExportedModel:
+    module = torch.jit.load(str(path), map_location=device).eval()
+
+    def run(x: torch.Tensor):
+        with torch.no_grad():
+            return tuple(module(x))
+
+    return ExportedModel("torchscript", path, run)
+
+
+def _load_onnx(path: Path) -> ExportedModel:
+    import onnxruntime as ort
+
+    def create_session():
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = torch.get_num_threads()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+
+    # ORT thread pools do not survive fork(), so a worker forked from a
+    # preloading master builds its own session on first use. The inherited
+    # session is left alone: tearing it down would join threads that no
+    # longer exist in the child.
+    sessions = {os.getpid(): create_session()}
+    lock = threading.Lock()
+
+    def run(x: torch.Tensor):
+        pid = os.getpid()
+        session = sessions.get(pid)
+        if session is None:
+            with lock:
+                session = sessions.get(pid)
+                if session is None:
+                    session = sessions[pid] = create_session()
+        outputs = session.run(None, {"image": x.detach().cpu().numpy()})
+        return tuple(torch.from_numpy(output) for output in outputs)
+
+    return ExportedModel("onnx", path, run)
+
+
+def load_exported_model(
+    model: nn.Module,
+    model_type: str,
+    backend: str,
+    model_path: Path,
+    checkpoint_hash: str,
+    precision: str = "fp32",
+    device: str = "cpu",
+) -> Optional[ExportedModel]:
+    """
+    Export (if not cached) and load a model for the requested backend
+
+    Args:
+        model: Eager model in eval mode, already converted to `precision`
+        model_type: "mobilenetv2" or "hybrid_cnn_vit"
+        backend: "torchscript" or "onnx"
+        model_path: Checkpoint path; the artifact is stored beside it
+        checkpoint_hash: SHA-256 of the checkpoint
+        precision: Precision mode the model was converted to
+        device: Device the artifact should run on
+
+    Returns:
+        ExportedModel, or None if the backend is unavailable and eager
+        inference should be used instead
+    """
+    if backend == "onnx" and (precision != "fp32" or device != "cpu"):
+        logger.warning(f"ONNX backend only serves fp32 on CPU; using eager for {model_type} ({precision}, {device})")
+        return None
+
+    path = artifact_path(model_path, checkpoint_hash, backend, precision)
+    try:
+        if not path.exists():
+            start = time.perf_counter()
+            example = torch.randn(2, 3, 224, 224, device=device)
+            if precision == "bf16":
+                example = example.to(dtype=torch.bfloat16, memory_format=torch.channels_last)
+            _export(model, model_type, backend, path, example)
+            logger.info(f"Exported {model_type} to {path} in {time.perf_counter() - start:.1f}s")
+
+        exported = _load_torchscript(path, device) if backend == "torchscript" else _load_onnx(path)
+        logger.info(f"Serving {model_type} through {backend} ({path.name})")
+        return exported
+    except Exception as e:
+        logger.warning(f"{backend} backend unavailable for {model_type}, falling back to eager: {e}")
+        return None
@@ -74,24 +74,56 @@ class GradCAM:
         Returns:
             cam: Normalized CAM heatmap [H, W]
         """
-        # Forward pass
-        logits = self.forward_pass(x)
+        _, _, cam = self.generate_cam_with_outputs(x, target_class)
+        return cam
+    
+    def generate_cam_with_outputs(
+        self,
+        x: torch.Tensor,
+        target_class: Optional[int] = None,
+        cnn_only: bool = True
+    ) -> Tuple[torch.Tensor, torch.Tensor, np.ndarray]:
+        """
+        Predict and generate the CAM from a single grad-enabled forward pass
         
-        # Get target class
-        if target_class is None:
-            target_class = torch.argmax(logits, dim=1).item()
+        Gradients are taken only with respect to the CAM activations, so no
+        parameter gradients are computed or accumulated.
         
-        # Zero gradients
-        self.model.zero_grad()
+        Args:
+            x: Input image tensor [1, 3, 224, 224]
+            target_class: Target class index (if None, uses predicted class)
+            cnn_only: Track only the CNN branch in autograd (the ViT branch
+                does not feed the CAM target, so the CAM is unchanged)
+            
+        Returns:
+            tuple: (logits, attention_weights, cam) with logits and attention
+                detached and cam a normalized [H, W] heatmap
+        """
+        with torch.enable_grad():
+            if cnn_only and hasattr(self.model, 'forward_for_cam'):
+                logits, attention_weights, cnn_features = self.model.forward_for_cam(x)
+            else:
+                logits, attention_weights, cnn_features = self.model(x)
+            
+            # Get target class
+            if target_class is None:
+                target_class = torch.argmax(logits, dim=1).item()
+            
+            # Gradient of the class score w.r.t. the last CNN feature map only
+            class_score = logits[0, target_class]
+            gradients, = torch.autograd.grad(class_score, cnn_features)
         
-        # Backward pass
-        class_loss = logits[0, target_class]
-        class_loss.backward()
+        self.activations = cnn_features.detach()
+        self.gradients = gradients
+        cam = self._compute_cam(self.activations, gradients)
         
-        # Get gradients and activations
-        gradients = self.gradients  # [1, C, H, W]
-        activations = self.activations  # [1, C, H, W]
+        logger.info(f"Generated CAM for class {target_class}")
         
+        return logits.detach(), attention_weights.detach(), cam
+    
+    def _compute_cam(self, activations: torch.Tensor, gradients: torch.Tensor) -> np.ndarray:
+        """Combine activations [1, C, H, W] and their gradients into a [224, 224] CAM"""
+        activations, gradients = activations.float(), gradients.float()
         # Calculate weights (global average pooling of gradients)
         weights = torch.mean(gradients, dim=[2, 3], keepdim=True)  # [1, C, 1, 1]
         
@@ -115,8 +147,6 @@ class GradCAM:
         if cam.max() > 0:
             cam = cam / cam.max()
         
-        logger.info(f"Generated CAM for class {target_class}")
-        
         return cam
     
     def generate_guided_gradcam(
@@ -24,7 +24,14 @@ class ImprovedHybridCNNViT(nn.Module):
     - Multi-layer classifier with dropout regularization
     """
     
-    def __init__(self, num_classes: int = 2):
+    def __init__(self, num_classes: int = 2, pretrained: bool = False):
+        """
+        Args:
+            num_classes: Number of output classes
+            pretrained: Download ImageNet weights for the CNN backbone. Only
+                useful for training; serving overwrites every weight from the
+                checkpoint, so the default builds offline.
+        """
         super().__init__()
         
         logger.info("Initializing Hybrid CNN-Transformer model...")
@@ -32,7 +39,7 @@ class ImprovedHybridCNNViT(nn.Module):
         # Enhanced CNN Backbone - EfficientNet-B0
         self.cnn_backbone = timm.create_model(
             'efficientnet_b0',
-            pretrained=True,
+            pretrained=pretrained,
             features_only=True,
             out_indices=[2, 3, 4]  # Multi-scale features
         )
@@ -109,15 +116,66 @@ class ImprovedHybridCNNViT(nn.Module):
         Returns:
             tuple: (logits, attention_weights, cnn_features_for_gradcam)
         """
-        B = x.shape[0]
-        
         # Multi-scale CNN features
         cnn_features = self.cnn_backbone(x)
         
         # ViT features
+        vit_proj = self._vit_branch(x)
+        
+        logits, attention_weights = self._fuse(cnn_features, vit_proj)
+        
+        # Return logits, attention weights, and last CNN features for GradCAM
+        return logits, attention_weights, cnn_features[-1]
+    
+    def forward_for_cam(self, x: torch.Tensor) -> tuple:
+        """
+        Forward pass for GradCAM that only tracks the CNN branch in autograd
+        
+        The CAM target is cnn_features[-1], which the ViT branch does not
+        feed, so the ViT runs without building a graph. Outputs are
+        identical to forward().
+        
+        Args:
+            x: Input tensor of shape [B, 3, 224, 224]
+            
+        Returns:
+            tuple: (logits, attention_weights, cnn_features_for_gradcam)
+        """
+        with torch.no_grad():
+            vit_proj = self._vit_branch(x)
+        
+        cnn_features = self.cnn_backbone(x)
+        logits, attention_weights = self._fuse(cnn_features, vit_proj)
+        return logits, attention_weights, cnn_features[-1]
+    
+    def forward_with_attentions(self, x: torch.Tensor) -> tuple:
+        """
+        Forward pass that also returns every attention map, for attention rollout
+        
+        Args:
+            x: Input tensor of shape [B, 3, 224, 224]
+            
+        Returns:
+            tuple: (logits, cross_attention_weights [B, 1, 3],
+                vit_attentions (one [B, heads, tokens, tokens] per layer),
+                multi-scale cnn_features)
+        """
+        vit_output = self.vit_backbone(pixel_values=x, output_attentions=True)
+        vit_proj = self.vit_proj(vit_output.last_hidden_state[:, 0, :])
+        
+        cnn_features = self.cnn_backbone(x)
+        logits, attention_weights = self._fuse(cnn_features, vit_proj)
+        return logits, attention_weights, vit_output.attentions, cnn_features
+    
+    def _vit_branch(self, x: torch.Tensor) -> torch.Tensor:
+        """ViT CLS token projected to the fusion dimension"""
         vit_output = self.vit_backbone(pixel_values=x)
         vit_features = vit_output.last_hidden_state[:, 0, :]  # CLS token
-        vit_proj = self.vit_proj(vit_features)
+        return self.vit_proj(vit_features)
+    
+    def _fuse(self, cnn_features: list, vit_proj: torch.Tensor) -> tuple:
+        """Cross-attention fusion of multi-scale CNN features with the ViT token"""
+        B = vit_proj.shape[0]
         
         # Process multi-scale CNN features
         processed_cnn_features = []
@@ -147,9 +205,7 @@ class ImprovedHybridCNNViT(nn.Module):
         
         # Classification
         logits = self.classifier(refined_features)
-        
-        # Return logits, attention weights, and last CNN features for GradCAM
-        return logits, attention_weights, cnn_features[-1]
+        return logits, attention_weights
     
     def get_attention_weights(self, x: torch.Tensor) -> torch.Tensor:
         """Get attention weights for visualization"""
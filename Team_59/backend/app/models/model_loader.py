@@ -1,14 +1,22 @@
 import torch
 import logging
+import os
+import time
 from pathlib import Path
 from typing import Optional, Dict, Any
 import json
+import hashlib
 
-from .hybrid_cnn_vit import ImprovedHybridCNNViT
-from .mobilenetv2_model import SmallMedNet  # Your new MobileNetV2 model class
+from .checkpoint_io import checkpoint_signature, load_checkpoint, resolve_checkpoint_path
+from .precision import apply_precision, prepare_input, resolve_precision
+from .exported_backend import load_exported_model, resolve_backend
 
 logger = logging.getLogger(__name__)
 
+# Build the architecture on the meta device and adopt the checkpoint tensors
+# directly, skipping random initialisation of weights that are overwritten anyway
+FAST_MODEL_INIT = os.getenv("FAST_MODEL_INIT", "1").lower() in ("1", "true", "yes")
+
 class ModelLoader:
     """Manages model loading and caching"""
 
@@ -17,56 +25,184 @@ class ModelLoader:
         model_path: str,
         device: Optional[str] = None,
         model_type: str = "mobilenetv2",  # 'mobilenetv2' or 'hybrid_cnn_vit'
+        precision: Optional[str] = None,  # 'fp32', 'bf16' or 'int8-dynamic'; env default
+        backend: Optional[str] = None,  # 'eager', 'torchscript' or 'onnx'; env default
     ):
         self.model_path = Path(model_path)
         self.device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
         self.model = None
         self.model_info = {}
+        self.explainer = None  # GradCAMService attached lazily by the serving layer
+        self.checkpoint_hash = None
+        self.checkpoint_path = None  # file actually read (.safetensors or .pth)
+        self.checkpoint_signature = None  # (path, size, mtime) at load, for change detection
+        self.loaded_at = None
+        self.load_timings_ms = {}
         self.model_type = model_type.lower()
-        logger.info(f"ModelLoader initialized - Device: {self.device}, Model type: {self.model_type}")
+        self.precision = precision or resolve_precision(self.model_type)
+        self.requested_backend = backend or resolve_backend(self.model_type)
+        self.exported = None  # ExportedModel when a graph backend is active
+        logger.info(
+            f"ModelLoader initialized - Device: {self.device}, Model type: {self.model_type}, "
+            f"Precision: {self.precision}, Backend: {self.requested_backend}"
+        )
+
+    def _model_class(self) -> type:
+        # Imported here so transformers is only loaded for the hybrid
+        if self.model_type == "hybrid_cnn_vit":
+            from .hybrid_cnn_vit import ImprovedHybridCNNViT
+            return ImprovedHybridCNNViT
+        if self.model_type == "mobilenetv2":
+            from .mobilenetv2_model import SmallMedNet  # Your new MobileNetV2 model class
+            return SmallMedNet
+        raise ValueError(f"Unsupported model type: {self.model_type}")
 
     def load_model(self, num_classes: int = 2):
         logger.info(f"Loading model from {self.model_path} of type {self.model_type}")
+        timings = {}
+        phase_start = start = time.perf_counter()
 
-        if self.model_type == "hybrid_cnn_vit":
-            model = ImprovedHybridCNNViT(num_classes=num_classes)
-        elif self.model_type == "mobilenetv2":
-            model = SmallMedNet(num_classes=num_classes)
-        else:
-            raise ValueError(f"Unsupported model type: {self.model_type}")
+        def phase(name: str):
+            nonlocal phase_start
+            now = time.perf_counter()
+            timings[name] = round((now - phase_start) * 1000, 1)
+            phase_start = now
+
+        model_class = self._model_class()
+        phase('import')
 
         if not self.model_path.exists():
             raise FileNotFoundError(f"Model checkpoint not found: {self.model_path}")
 
-        checkpoint = torch.load(self.model_path, map_location=self.device)
+        # Signature first: a file replaced mid-load then looks changed to the watcher
+        self.checkpoint_signature = checkpoint_signature(self.model_path)
+        checkpoint_path = self.checkpoint_path = resolve_checkpoint_path(self.model_path)
+        self.checkpoint_hash = self._hash_checkpoint(checkpoint_path)
+        phase('hash')
 
+        if FAST_MODEL_INIT:
+            with torch.device('meta'):
+                model = model_class(num_classes=num_classes)
+        else:
+            model = model_class(num_classes=num_classes)
+        phase('construct')
+
+        state_dict, metadata = load_checkpoint(checkpoint_path, device=self.device)
+        phase('read_checkpoint')
+
+        # Hybrid checkpoints hold 'model_state_dict' plus training metadata;
+        # MobileNetV2 checkpoints are typically the state_dict itself
+        model.load_state_dict(state_dict, assign=FAST_MODEL_INIT)
+        if any(t.is_meta for t in list(model.parameters()) + list(model.buffers())):
+            raise RuntimeError(
+                f"{self.model_type} has tensors missing from {checkpoint_path}; set FAST_MODEL_INIT=0"
+            )
         if self.model_type == "hybrid_cnn_vit":
-            # Expected to be a dict with 'model_state_dict'
-            model.load_state_dict(checkpoint['model_state_dict'])
             self.model_info = {
-                'epoch': checkpoint.get('epoch', 'unknown'),
-                'val_acc': checkpoint.get('val_acc', 'unknown'),
-                'val_f1': checkpoint.get('val_f1', 'unknown'),
+                'epoch': metadata.get('epoch', 'unknown'),
+                'val_acc': metadata.get('val_acc', 'unknown'),
+                'val_f1': metadata.get('val_f1', 'unknown'),
             }
         else:
-            # For MobileNetV2, checkpoint is typically the model state_dict itself
-            model.load_state_dict(checkpoint)
             self.model_info = {}
 
         model.to(self.device)
         model.eval()
+        phase('load_state')
+
+        model = apply_precision(model, self.model_type, self.precision)
+        phase('precision')
+
+        if self.requested_backend != "eager":
+            self.exported = load_exported_model(
+                model, self.model_type, self.requested_backend, self.model_path,
+                self.checkpoint_hash, precision=self.precision, device=str(self.device),
+            )
+            phase('export')
 
         self.model = model
-        logger.info("Model loaded successfully")
+        self.loaded_at = time.time()
+        self.load_timings_ms = {**timings, 'total': round((time.perf_counter() - start) * 1000, 1)}
+        logger.info(
+            f"Model {self.model_type} loaded from {checkpoint_path.name} in "
+            f"{self.load_timings_ms['total']:.0f} ms ({self.load_timings_ms})"
+        )
         return model
 
+    def _hash_checkpoint(self, path: Optional[Path] = None) -> str:
+        """SHA-256 of the checkpoint file, used to fingerprint cached results"""
+        digest = hashlib.sha256()
+        with open(path or self.model_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
     def get_model(self):
         if self.model is None:
             self.load_model()
         return self.model
 
     def get_model_info(self) -> Dict[str, Any]:
-        return self.model_info
+        return {
+            **self.model_info,
+            'checkpoint_hash': self.checkpoint_hash,
+            'checkpoint_file': self.checkpoint_path.name if self.checkpoint_path else None,
+            'precision': self.precision,
+            'backend': self.backend,
+            'load_ms': self.load_timings_ms.get('total'),
+            'loaded_at': self.loaded_at,
+        }
+
+    @property
+    def backend(self) -> str:
+        """Backend actually serving forward passes (eager if export failed)"""
+        return self.exported.backend if self.exported is not None else "eager"
+
+    def forward(self, x: torch.Tensor):
+        """
+        No-grad forward pass through the active backend
+
+        Returns the same outputs as the eager model. GradCAM needs autograd
+        and always uses self.model directly.
+        """
+        if self.exported is not None:
+            return self.exported(x)
+        with torch.no_grad():
+            return self.get_model()(x)
+
+    def share_memory(self):
+        """
+        Move weights and buffers into shared memory
+
+        Processes forked afterwards map the same physical pages instead of
+        relying on copy-on-write staying untouched.
+        """
+        self.get_model().share_memory()
+
+    def prepare_input(self, x: torch.Tensor) -> torch.Tensor:
+        """Cast a float32 input batch to the model's serving precision"""
+        return prepare_input(x, self.precision)
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the weights and numerics that produced a result"""
+        checkpoint = (self.checkpoint_hash or 'unknown')[:16]
+        return checkpoint if self.precision == "fp32" else f"{checkpoint}-{self.precision}"
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the loaded model's weights and buffers"""
+        if self.model is None:
+            return 0
+
+        def tensor_bytes(value) -> int:
+            # Dynamically quantized layers keep packed weights outside parameters()
+            if isinstance(value, torch.Tensor):
+                return value.numel() * value.element_size()
+            if isinstance(value, (tuple, list)):
+                return sum(tensor_bytes(v) for v in value)
+            return 0
+
+        return sum(tensor_bytes(v) for v in self.model.state_dict().values())
 
     def save_model_metadata(self, output_path: str = "trained_models/model_metadata.json"):
         metadata = {
@@ -90,29 +226,11 @@ class ModelLoader:
         logger.info(f"Model metadata saved to {output_path}")
 
 
-# Singleton instance - You may want to support multiple loaders separately if needed
-_model_loader = None
-
 def get_model_loader(
     model_path="trained_models/mobilenetv2_small_model.pth",
     device=None,
     model_type="mobilenetv2"
 ) -> ModelLoader:
-    global _model_loader
-    if _model_loader is None or _model_loader.model_type != model_type or str(_model_loader.model_path) != model_path:
-        _model_loader = ModelLoader(model_path=model_path, device=device, model_type=model_type)
-    return _model_loader
-
-# # Load Hybrid CNN-ViT
-# loader_hybrid = get_model_loader(
-#     model_path="trained_models/enhanced_hybrid_model.pth",
-#     model_type="hybrid_cnn_vit"
-# )
-# hybrid_model = loader_hybrid.get_model()
-
-# # Load MobileNetV2
-# loader_mobilenet = get_model_loader(
-#     model_path="trained_models/mobilenetv2_small_model.pth",
-#     model_type="mobilenetv2"
-# )
-# mobilenet_model = loader_mobilenet.get_model()
+    """Get the resident loader for a model type, loading it if needed"""
+    from .model_registry import get_model_registry
+    return get_model_registry(device=device).get(model_type, model_path=model_path)
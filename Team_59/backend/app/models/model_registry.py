@@ -0,0 +1,237 @@
+"""
+Resident model registry
+Keeps several classifiers loaded at once under a memory budget with LRU eviction
+"""
+
+import gc
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from .model_loader import ModelLoader
+
+logger = logging.getLogger(__name__)
+
+MODEL_CHECKPOINTS = {
+    'mobilenetv2': "trained_models/mobilenetv2_small_model.pth",
+    'hybrid_cnn_vit': "trained_models/enhanced_hybrid_model.pth",
+}
+
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "1024"))
+# Comma-separated model types to load in the parent before workers fork
+PRELOAD_MODELS = [m.strip().lower() for m in os.getenv("PRELOAD_MODELS", "").split(",") if m.strip()]
+# "cow": rely on copy-on-write after fork; "shm": move weights to shared memory first
+MODEL_SHARE_MODE = os.getenv("MODEL_SHARE_MODE", "cow").lower()
+
+
+class ModelRegistry:
+    """
+    Thread-safe registry of loaded models keyed by model type.
+
+    Models stay resident until the combined parameter memory would exceed
+    the budget, at which point the least recently used ones are evicted.
+    Requests that already hold a loader keep using it after eviction; the
+    memory is released once they finish.
+    """
+
+    def __init__(self, memory_budget_mb: float = MODEL_MEMORY_BUDGET_MB, device: Optional[str] = None):
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self.device = device
+        self._loaders: "OrderedDict[str, ModelLoader]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._hits = 0
+        self._loads = 0
+        self._evictions = 0
+        self._reloads = 0
+        self._preloaded_by: Optional[int] = None
+        self._share_mode: Optional[str] = None
+        logger.info(f"ModelRegistry initialized - budget {memory_budget_mb:.0f} MB")
+
+    def _load_lock(self, model_type: str) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(model_type, threading.Lock())
+
+    def _lookup(self, model_type: str, model_path: str) -> Optional[ModelLoader]:
+        with self._lock:
+            loader = self._loaders.get(model_type)
+            if loader is not None and str(loader.model_path) == model_path:
+                self._loaders.move_to_end(model_type)
+                self._hits += 1
+                return loader
+        return None
+
+    def get(self, model_type: str, model_path: Optional[str] = None) -> ModelLoader:
+        """
+        Get a loaded model, loading (and evicting others) if needed
+
+        Args:
+            model_type: "mobilenetv2" or "hybrid_cnn_vit"
+            model_path: Checkpoint path, defaults to MODEL_CHECKPOINTS
+
+        Returns:
+            ModelLoader: Loader whose model is ready for inference
+        """
+        model_type = model_type.lower()
+        if model_path is None:
+            if model_type not in MODEL_CHECKPOINTS:
+                raise ValueError(f"Unsupported model type: {model_type}")
+            model_path = MODEL_CHECKPOINTS[model_type]
+        model_path = str(model_path)
+
+        loader = self._lookup(model_type, model_path)
+        if loader is not None:
+            return loader
+
+        # Only one thread loads a given model type; the rest wait and reuse it
+        with self._load_lock(model_type):
+            loader = self._lookup(model_type, model_path)
+            if loader is not None:
+                return loader
+
+            start = time.time()
+            loader = ModelLoader(model_path=model_path, device=self.device, model_type=model_type)
+            loader.load_model()
+            self._install(model_type, loader)
+            logger.info(
+                f"Registry loaded {model_type} ({loader.memory_bytes() / 1e6:.1f} MB) "
+                f"in {(time.time() - start) * 1000:.0f} ms"
+            )
+            return loader
+
+    def reload(
+        self,
+        model_type: str,
+        check: Optional[Callable[[ModelLoader, ModelLoader], Dict[str, Any]]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Load a resident model again from disk and swap it in
+
+        The new copy is loaded and checked on the calling thread while the
+        old one keeps serving. The swap is a single dict assignment under
+        the registry lock; requests that already hold the old loader finish
+        on it. Cached results are keyed by checkpoint hash, so they turn
+        over with the weights.
+
+        Args:
+            model_type: Resident model to reload
+            check: Called as check(old, new) before the swap; raising
+                aborts the reload and keeps the old model
+
+        Returns:
+            dict: Old and new hash, load time and the check's report, or
+                None if the model is not resident
+        """
+        model_type = model_type.lower()
+        with self._load_lock(model_type):
+            current = self.peek(model_type)
+            if current is None:
+                return None
+
+            loader = ModelLoader(model_path=str(current.model_path), device=self.device, model_type=model_type)
+            loader.load_model()
+            report = {
+                'model_type': model_type,
+                'previous_hash': current.checkpoint_hash,
+                'checkpoint_hash': loader.checkpoint_hash,
+                'load_ms': loader.load_timings_ms.get('total'),
+                'swapped': False,
+            }
+            if loader.checkpoint_hash == current.checkpoint_hash:
+                # Touched or re-copied but identical: keep the warm model
+                current.checkpoint_signature = loader.checkpoint_signature
+                return report
+
+            if check is not None:
+                report.update(check(current, loader))
+            self._install(model_type, loader)
+            self._reloads += 1
+            report['swapped'] = True
+            logger.info(
+                f"Registry swapped {model_type}: {current.checkpoint_hash[:12]} -> "
+                f"{loader.checkpoint_hash[:12]} (loaded in {report['load_ms']:.0f} ms)"
+            )
+            return report
+
+    def _install(self, model_type: str, loader: ModelLoader):
+        with self._lock:
+            self._loaders.pop(model_type, None)
+            needed = loader.memory_bytes()
+            if needed > self.memory_budget_bytes:
+                logger.warning(
+                    f"{model_type} needs {needed / 1e6:.1f} MB, above the whole registry budget"
+                )
+            while self._loaders and self._resident_bytes() + needed > self.memory_budget_bytes:
+                evicted_type, _ = self._loaders.popitem(last=False)
+                self._evictions += 1
+                logger.info(f"Evicted {evicted_type} from model registry (LRU)")
+            self._loaders[model_type] = loader
+            self._loads += 1
+
+    def _resident_bytes(self) -> int:
+        return sum(loader.memory_bytes() for loader in self._loaders.values())
+
+    def preload(self, model_types=None, share_mode: str = MODEL_SHARE_MODE):
+        """
+        Load models in a parent process so forked workers share one copy
+
+        Call before forking (e.g. from a gunicorn master hook). Loading runs
+        no forward pass, so no intra-op thread pools exist at fork time;
+        export artifacts for graph backends should already be cached.
+
+        Args:
+            model_types: Types to load, defaults to PRELOAD_MODELS
+            share_mode: "cow" or "shm", see MODEL_SHARE_MODE
+        """
+        if share_mode not in ("cow", "shm"):
+            raise ValueError(f"Unsupported share mode '{share_mode}', expected 'cow' or 'shm'")
+
+        for model_type in model_types or PRELOAD_MODELS:
+            loader = self.get(model_type)
+            if share_mode == "shm":
+                loader.share_memory()
+            logger.info(f"Preloaded {model_type} in pid {os.getpid()} ({share_mode})")
+
+        self._preloaded_by = os.getpid()
+        self._share_mode = share_mode
+        # Reference counting still writes to object headers, but a frozen
+        # heap keeps the cyclic collector from dirtying every pre-fork page
+        gc.collect()
+        gc.freeze()
+
+    def peek(self, model_type: str) -> Optional[ModelLoader]:
+        """Return the resident loader without loading or touching LRU order"""
+        with self._lock:
+            return self._loaders.get(model_type.lower())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Resident models, memory use and hit/eviction counters"""
+        with self._lock:
+            return {
+                'resident_models': list(self._loaders.keys()),
+                'resident_mb': round(self._resident_bytes() / (1024 * 1024), 1),
+                'budget_mb': round(self.memory_budget_bytes / (1024 * 1024), 1),
+                'hits': self._hits,
+                'loads': self._loads,
+                'evictions': self._evictions,
+                'reloads': self._reloads,
+                'preloaded_by_pid': self._preloaded_by,
+                'share_mode': self._share_mode,
+            }
+
+
+# Global registry instance
+_model_registry = None
+_model_registry_lock = threading.Lock()
+
+def get_model_registry(device: Optional[str] = None) -> ModelRegistry:
+    """Get singleton model registry"""
+    global _model_registry
+    if _model_registry is None:
+        with _model_registry_lock:
+            if _model_registry is None:
+                _model_registry = ModelRegistry(device=device)
+    return _model_registry
@@ -0,0 +1,164 @@
+"""
+Reduced-precision inference modes for CPU serving
+fp32 (default), bf16 + channels_last, and dynamic int8 quantization
+
+Run a parity check against the fp32 checkpoint with:
+    python -m app.models.precision --model-type hybrid_cnn_vit --precision int8-dynamic --calibration-dir data/calib
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("fp32", "bf16", "int8-dynamic")
+
+
+def resolve_precision(model_type: str) -> str:
+    """
+    Precision for a model type from the environment
+
+    MODEL_PRECISION_<MODEL_TYPE> (e.g. MODEL_PRECISION_HYBRID_CNN_VIT)
+    overrides MODEL_PRECISION, which defaults to fp32.
+    """
+    precision = os.getenv(
+        f"MODEL_PRECISION_{model_type.upper()}",
+        os.getenv("MODEL_PRECISION", "fp32"),
+    ).lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unsupported precision '{precision}', expected one of {PRECISIONS}")
+    return precision
+
+
+def apply_precision(model: nn.Module, model_type: str, precision: str) -> nn.Module:
+    """
+    Convert an fp32 eval-mode model to the requested precision
+
+    int8-dynamic quantizes the Linear-heavy ViT branch of the hybrid (its
+    encoder blocks and projection). The fusion and classifier head stay
+    fp32 because GradCAM backpropagates through them; the ViT branch is
+    never differentiated (see ImprovedHybridCNNViT.forward_for_cam). For
+    MobileNetV2 only the final Linear classifier is quantized.
+    """
+    if precision == "fp32":
+        return model
+
+    if precision == "bf16":
+        # channels_last lets oneDNN pick its fast convolution kernels
+        return model.to(dtype=torch.bfloat16, memory_format=torch.channels_last)
+
+    if precision == "int8-dynamic":
+        quantize = torch.ao.quantization.quantize_dynamic
+        if model_type == "hybrid_cnn_vit":
+            model.vit_backbone = quantize(model.vit_backbone, {nn.Linear}, dtype=torch.qint8)
+            model.vit_proj = quantize(nn.Sequential(model.vit_proj), {nn.Linear}, dtype=torch.qint8)[0]
+        else:
+            model.classifier = quantize(nn.Sequential(model.classifier), {nn.Linear}, dtype=torch.qint8)[0]
+        return model
+
+    raise ValueError(f"Unsupported precision: {precision}")
+
+
+def prepare_input(x: torch.Tensor, precision: str) -> torch.Tensor:
+    """Cast a float32 input batch to what the converted model expects"""
+    if precision == "bf16":
+        return x.to(dtype=torch.bfloat16, memory_format=torch.channels_last)
+    return x
+
+
+def check_precision_parity(
+    model_type: str,
+    precision: str,
+    calibration_dir: str,
+    model_path: str = None,
+    batch_size: int = 8,
+) -> Dict[str, Any]:
+    """
+    Compare a reduced-precision model with fp32 on a folder of images
+
+    Args:
+        model_type: "mobilenetv2" or "hybrid_cnn_vit"
+        precision: Mode to check against fp32
+        calibration_dir: Folder of JPEG/PNG images
+        model_path: Checkpoint, defaults to the registry path for model_type
+        batch_size: Images per forward pass
+
+    Returns:
+        dict: Agreement rate, probability deltas and per-image latency
+    """
+    from .model_loader import ModelLoader
+    from .model_registry import MODEL_CHECKPOINTS
+    from ..services.preprocessing_service import get_preprocessing_service
+
+    model_path = model_path or MODEL_CHECKPOINTS[model_type]
+    preprocessing = get_preprocessing_service()
+
+    paths = sorted(
+        p for p in Path(calibration_dir).rglob("*")
+        if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+    )
+    if not paths:
+        raise ValueError(f"No JPEG/PNG images found in {calibration_dir}")
+    inputs = torch.cat([preprocessing.prepare(p.read_bytes())[0] for p in paths], dim=0)
+
+    def run(loader: ModelLoader):
+        probabilities, elapsed = [], 0.0
+        with torch.no_grad():
+            for start in range(0, len(inputs), batch_size):
+                batch = loader.prepare_input(inputs[start:start + batch_size])
+                tick = time.perf_counter()
+                output = loader.model(batch)
+                elapsed += time.perf_counter() - tick
+                logits = output[0] if isinstance(output, tuple) else output
+                probabilities.append(torch.softmax(logits.float(), dim=1))
+        return torch.cat(probabilities), elapsed * 1000 / len(inputs)
+
+    reference = ModelLoader(model_path, device="cpu", model_type=model_type, precision="fp32")
+    reference.load_model()
+    candidate = ModelLoader(model_path, device="cpu", model_type=model_type, precision=precision)
+    candidate.load_model()
+
+    ref_probs, ref_ms = run(reference)
+    cand_probs, cand_ms = run(candidate)
+    delta = (ref_probs - cand_probs).abs()
+
+    return {
+        'model_type': model_type,
+        'precision': precision,
+        'images': len(paths),
+        'top1_agreement': float((ref_probs.argmax(1) == cand_probs.argmax(1)).float().mean()),
+        'max_abs_prob_diff': float(delta.max()),
+        'mean_abs_prob_diff': float(delta.mean()),
+        'fp32_ms_per_image': round(ref_ms, 2),
+        f'{precision}_ms_per_image': round(cand_ms, 2),
+        'fp32_model_mb': round(reference.memory_bytes() / 1e6, 1),
+        f'{precision}_model_mb': round(candidate.memory_bytes() / 1e6, 1),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Accuracy parity of a precision mode against fp32")
+    parser.add_argument("--model-type", required=True, choices=["mobilenetv2", "hybrid_cnn_vit"])
+    parser.add_argument("--precision", required=True, choices=[p for p in PRECISIONS if p != "fp32"])
+    parser.add_argument("--calibration-dir", required=True)
+    parser.add_argument("--model-path", default=None)
+    parser.add_argument("--min-agreement", type=float, default=0.99)
+    args = parser.parse_args(argv)
+
+    report = check_precision_parity(args.model_type, args.precision, args.calibration_dir, args.model_path)
+    print(json.dumps(report, indent=2))
+    return 0 if report['top1_agreement'] >= args.min_agreement else 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,46 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float, UniqueConstraint
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from ..db import Base
+
+
+class PredictionJob(Base):
+    __tablename__ = "prediction_jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    status = Column(String, nullable=False, default="uploading", index=True)
+    model_type = Column(String, nullable=False)
+    spool_dir = Column(String, nullable=False)
+
+    total_items = Column(Integer, default=0, nullable=False)
+    next_item = Column(Integer, default=0, nullable=False)  # resume cursor; items before it have results
+    failed_items = Column(Integer, default=0, nullable=False)
+    upload_bytes = Column(Integer, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+
+    # Which process is running the job and when it last made progress (epoch
+    # seconds), so jobs orphaned by a restart can be reclaimed
+    worker_id = Column(String, nullable=True)
+    heartbeat = Column(Float, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    results = relationship("PredictionJobResult", back_populates="job", cascade="all, delete-orphan")
+
+
+class PredictionJobResult(Base):
+    __tablename__ = "prediction_job_results"
+    __table_args__ = (
+        UniqueConstraint("job_id", "item_index", name="uq_job_item"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(32), ForeignKey("prediction_jobs.id"), nullable=False, index=True)
+    item_index = Column(Integer, nullable=False)
+    filename = Column(String, nullable=False)
+    success = Column(Boolean, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON prediction or error
+
+    job = relationship("PredictionJob", back_populates="results")
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.sql import func
+from ..db import Base
+
+
+class PrincipalInvalidation(Base):
+    """
+    Append-only log of users whose cached principal went stale (role or
+    active flag changed, or the user was deleted). Each worker reads rows
+    past the last id it has seen and drops those users from its cache.
+    """
+    __tablename__ = "principal_invalidations"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
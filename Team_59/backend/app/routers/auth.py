@@ -1,6 +1,7 @@
 from typing import List, Literal
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
@@ -8,9 +9,9 @@ from pydantic import BaseModel
 from ..db import get_db
 from ..models.user import User
 from ..schemas.user import UserCreate, UserRead
+from ..core.password_pool import get_password_hash_pool
+from ..core.principal_cache import get_principal_cache
 from ..core.security import (
-    hash_password,
-    verify_password,
     create_access_token,
     decode_access_token,
 )
@@ -23,14 +24,37 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 # ---------- Auth & current user ----------
 
+# login and register are async so that while bcrypt runs in the password
+# pool they hold no threadpool thread; only the short queries run there.
+
+def _find_user_by_email(db: Session, email: str):
+    user = db.query(User).filter(User.email == email).first()
+    # Return the connection to the pool before waiting on bcrypt; a burst of
+    # logins would otherwise hold every pooled connection
+    db.close()
+    return user
+
+
+def _add_user(db: Session, user: User) -> User:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def _store_password_hash(db: Session, user_id: int, hashed_password: str):
+    db.query(User).filter(User.id == user_id).update({User.hashed_password: hashed_password})
+    db.commit()
+
+
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def register_user(payload: UserCreate, db: Session = Depends(get_db)):
+async def register_user(payload: UserCreate, db: Session = Depends(get_db)):
     """
     Register a new user account with email, full_name, password, and optional role.
 
     If role is not provided, it defaults to "student".
     """
-    existing = db.query(User).filter(User.email == payload.email).first()
+    existing = await run_in_threadpool(_find_user_by_email, db, payload.email)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -40,18 +64,15 @@ def register_user(payload: UserCreate, db: Session = Depends(get_db)):
     user = User(
         email=payload.email,
         full_name=payload.full_name,
-        hashed_password=hash_password(payload.password),
+        hashed_password=await get_password_hash_pool().hash(payload.password),
         role=payload.role or "student",
         is_active=True,
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return await run_in_threadpool(_add_user, db, user)
 
 
 @router.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
 ):
@@ -61,13 +82,22 @@ def login(
     Frontend should send form data with:
       - username: email
       - password: password
+
+    A stored hash made with a different bcrypt cost than BCRYPT_ROUNDS is
+    replaced on successful login.
     """
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await run_in_threadpool(_find_user_by_email, db, form_data.username)
+    valid, new_hash = (
+        await get_password_hash_pool().verify(form_data.password, user.hashed_password)
+        if user else (False, None)
+    )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
         )
+    if new_hash is not None:
+        await run_in_threadpool(_store_password_hash, db, user.id, new_hash)
 
     access_token = create_access_token({"sub": str(user.id)})
     return {"access_token": access_token, "token_type": "bearer"}
@@ -79,6 +109,9 @@ def get_current_user(
 ) -> User:
     """
     Dependency that returns the currently authenticated user object.
+
+    Recently resolved tokens are served from the principal cache as a
+    detached User; load the row from `db` before modifying it.
     """
     payload = decode_access_token(token)
     if payload is None or "sub" not in payload:
@@ -88,12 +121,19 @@ def get_current_user(
         )
 
     user_id = int(payload["sub"])
+    principal_cache = get_principal_cache()
+    cached = principal_cache.get(db, user_id, token)
+    if cached is not None:
+        return cached
+
+    generation = principal_cache.generation
     user = db.query(User).filter(User.id == user_id).first()
     if not user or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Inactive or non-existent user",
         )
+    principal_cache.put(user, token, payload.get("exp"), generation)
     return user
 
 
@@ -151,6 +191,8 @@ def update_user_role(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
     user.role = payload.role
+    # Committing a role change also drops the user's cached principals, in
+    # every worker (see core/principal_cache.py)
     db.commit()
     db.refresh(user)
     return user
@@ -1,6 +1,10 @@
-from typing import List
+import os
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.db import get_db
@@ -10,9 +14,31 @@ from app.models.user import User
 from app.schemas.course import CourseCreate, CourseRead, CourseWithEnrollment
 from app.schemas.enrollment import EnrollmentRead
 from app.routers.auth import get_current_user
+from app.services.catalog_cache import (
+    CoursePage,
+    catalog_version,
+    course_version,
+    enrollment_overlay,
+    etag_matches,
+    get_catalog_cache,
+    make_etag,
+    record_course_change,
+)
+from app.services.course_counters import increment_enrollment_count
 
 router = APIRouter()
 
+COURSE_PAGE_SIZE = int(os.getenv("COURSE_PAGE_SIZE", "100"))
+COURSE_PAGE_MAX = int(os.getenv("COURSE_PAGE_MAX", "500"))
+# Set on a full page; pass it back as ?cursor= for the next one. Paging
+# is opt-in: without limit or cursor the routes return every row, as the
+# frontend (which never reads this header) expects.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Exactly the CourseRead fields, selected as columns so rows serialise
+# straight to JSON without building ORM objects or pydantic models
+_COURSE_COLUMNS = [getattr(Course, field) for field in CourseRead.model_fields]
+
 
 def _ensure_instructor_or_admin(user: User) -> None:
     if user.role not in ("instructor", "admin"):
@@ -22,65 +48,149 @@ def _ensure_instructor_or_admin(user: User) -> None:
         )
 
 
+def _page_params(
+    limit: Optional[int] = Query(None, ge=1, le=COURSE_PAGE_MAX, description=f"Page size; {COURSE_PAGE_SIZE} when only cursor is given"),
+    cursor: Optional[int] = Query(None, description=f"Course id from the previous page's {NEXT_CURSOR_HEADER} header"),
+) -> dict:
+    if limit is None and cursor is not None:
+        limit = COURSE_PAGE_SIZE
+    return {"limit": limit, "cursor": cursor}
+
+
+def _course_filters(
+    category: Optional[str] = None,
+    level: Optional[str] = None,
+    has_ar: Optional[bool] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+) -> list:
+    conditions = []
+    if category is not None:
+        conditions.append(Course.category == category)
+    if level is not None:
+        conditions.append(Course.level == level)
+    if has_ar is not None:
+        conditions.append(Course.has_ar == has_ar)
+    if min_price is not None:
+        conditions.append(Course.price >= min_price)
+    if max_price is not None:
+        conditions.append(Course.price <= max_price)
+    return conditions
+
+
+def _fetch_page(db: Session, stmt, key, limit: Optional[int], cursor: Optional[int]) -> tuple:
+    """
+    Run one keyset page of a course query
+
+    Args:
+        stmt: Select whose columns match the route's response model
+        key: Column equal to Course.id that the page is ordered by
+        limit: Page size, or None for every remaining row
+        cursor: Last course id of the previous page
+
+    Returns:
+        tuple: (rows, last course id if more pages follow, else None)
+    """
+    if cursor is not None:
+        stmt = stmt.where(key > cursor)
+    if limit is None:
+        return db.execute(stmt.order_by(key)).mappings().all(), None
+    # One extra row tells whether another page exists
+    rows = db.execute(stmt.order_by(key).limit(limit + 1)).mappings().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1]["id"]
+    return rows, None
+
+
+def _course_page(db: Session, stmt, key, limit: Optional[int], cursor: Optional[int]) -> JSONResponse:
+    """Uncached keyset page as JSON, with NEXT_CURSOR_HEADER if more follow"""
+    rows, next_cursor = _fetch_page(db, stmt, key, limit, cursor)
+    headers = {}
+    if next_cursor is not None:
+        headers[NEXT_CURSOR_HEADER] = str(next_cursor)
+    return JSONResponse([dict(row) for row in rows], headers=headers)
+
+
+def _cached_course_response(
+    db: Session,
+    user: User,
+    if_none_match: Optional[str],
+    version: str,
+    key: tuple,
+    load,
+    single: bool = False,
+) -> Response:
+    """
+    Serve course rows from the catalog cache with the caller's enrollments merged in
+
+    Args:
+        version: Catalog (or course) version, read before any course rows
+        key: Route, filters and page the rows depend on
+        load: Builds the CoursePage on a cache miss; None means not found
+        single: Return the one course as an object instead of a list
+
+    Returns:
+        Response: 304 when If-None-Match matches, else the JSON body with its ETag
+    """
+    cache = get_catalog_cache()
+    page = cache.get_or_load(version, key, load)
+    if page is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found",
+        )
+
+    overlay = enrollment_overlay(db, user.id, page.course_ids)
+    # The body is per user, so shared caches must not store it and
+    # browsers must revalidate; a match costs two indexed lookups
+    headers = {
+        "ETag": make_etag(version, key, overlay),
+        "Cache-Control": "private, no-cache",
+    }
+    if page.next_cursor is not None:
+        headers[NEXT_CURSOR_HEADER] = str(page.next_cursor)
+    if etag_matches(if_none_match, headers["ETag"]):
+        cache.count_not_modified()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    rendered = page.render(overlay)
+    body = rendered[0] if single else b"[" + b",".join(rendered) + b"]"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/courses", response_model=List[CourseWithEnrollment])
 def list_courses(
+    page: dict = Depends(_page_params),
+    filters: list = Depends(_course_filters),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    courses = db.query(Course).all()
+    def load() -> CoursePage:
+        stmt = select(*_COURSE_COLUMNS).where(*filters)
+        return CoursePage(*_fetch_page(db, stmt, Course.id, **page))
 
-    enrollments = (
-        db.query(Enrollment)
-        .filter(Enrollment.user_id == current_user.id)
-        .all()
-    )
-    enrollment_by_course = {e.course_id: e for e in enrollments}
-
-    result: List[CourseWithEnrollment] = []
-    for course in courses:
-        enrolled = course.id in enrollment_by_course
-        progress = (
-            float(enrollment_by_course[course.id].progress)
-            if enrolled
-            else 0.0
-        )
-        result.append(
-            CourseWithEnrollment(
-                **CourseRead.model_validate(course).model_dump(),
-                is_enrolled=enrolled,
-                progress=progress,
-            )
-        )
-    return result
+    # The compiled filters, values included, identify the query
+    filter_key = tuple(str(condition.compile(compile_kwargs={"literal_binds": True})) for condition in filters)
+    key = ("list", filter_key, page["limit"], page["cursor"])
+    return _cached_course_response(db, current_user, if_none_match, catalog_version(db), key, load)
 
 
 @router.get("/courses/{course_id}", response_model=CourseWithEnrollment)
 def get_course(
     course_id: int,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    course = db.query(Course).filter(Course.id == course_id).first()
-    if not course:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Course not found",
-        )
+    def load() -> Optional[CoursePage]:
+        row = db.execute(select(*_COURSE_COLUMNS).where(Course.id == course_id)).mappings().first()
+        return CoursePage([row]) if row is not None else None
 
-    enrollment = (
-        db.query(Enrollment)
-        .filter(
-            Enrollment.user_id == current_user.id,
-            Enrollment.course_id == course_id,
-        )
-        .first()
-    )
-
-    base = CourseRead.model_validate(course)
-    return CourseWithEnrollment(
-        **base.model_dump(),
-        is_enrolled=enrollment is not None,
-        progress=float(enrollment.progress) if enrollment else 0.0,
+    key = ("detail", course_id)
+    return _cached_course_response(
+        db, current_user, if_none_match, course_version(db, course_id), key, load, single=True,
     )
 
 
@@ -109,6 +219,8 @@ def create_course(
         instructor_id=current_user.id,
     )
     db.add(course)
+    db.flush()
+    record_course_change(db, course.id)
     db.commit()
     db.refresh(course)
     return course
@@ -124,15 +236,19 @@ def enroll_in_course(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    course = db.query(Course).filter(Course.id == course_id).first()
-    if not course:
+    course_exists = db.query(Course.id).filter(Course.id == course_id).first()
+    if not course_exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Course not found",
         )
 
+    already_enrolled = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Already enrolled in this course",
+    )
     existing = (
-        db.query(Enrollment)
+        db.query(Enrollment.id)
         .filter(
             Enrollment.user_id == current_user.id,
             Enrollment.course_id == course_id,
@@ -140,10 +256,7 @@ def enroll_in_course(
         .first()
     )
     if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Already enrolled in this course",
-        )
+        raise already_enrolled
 
     enrollment = Enrollment(
         user_id=current_user.id,
@@ -152,10 +265,16 @@ def enroll_in_course(
         completed=0,
     )
     db.add(enrollment)
-
-    course.enrollment_count += 1
-    db.add(course)
-
+    try:
+        db.flush()
+    except IntegrityError:
+        # A concurrent request enrolled the same user first (uq_user_course)
+        db.rollback()
+        raise already_enrolled
+
+    # Counted in SQL, last, so concurrent enrollments neither lose updates
+    # nor hold the course row lock for longer than the commit
+    increment_enrollment_count(db, course_id)
     db.commit()
     db.refresh(enrollment)
     return enrollment
@@ -163,35 +282,23 @@ def enroll_in_course(
 
 @router.get("/me/courses", response_model=List[CourseWithEnrollment])
 def my_courses(
+    page: dict = Depends(_page_params),
+    filters: list = Depends(_course_filters),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    enrollments = (
-        db.query(Enrollment)
-        .filter(Enrollment.user_id == current_user.id)
-        .all()
-    )
-    course_ids = [e.course_id for e in enrollments]
-
-    courses = (
-        db.query(Course)
-        .filter(Course.id.in_(course_ids))
-        .all()
-    )
-
-    enrollment_by_course = {e.course_id: e for e in enrollments}
-    result: List[CourseWithEnrollment] = []
-    for course in courses:
-        e = enrollment_by_course.get(course.id)
-        base = CourseRead.model_validate(course)
-        result.append(
-            CourseWithEnrollment(
-                **base.model_dump(),
-                is_enrolled=True,
-                progress=float(e.progress) if e else 0.0,
-            )
+    stmt = (
+        select(
+            *_COURSE_COLUMNS,
+            Enrollment.id.is_not(None).label("is_enrolled"),
+            func.coalesce(Enrollment.progress, 0.0).label("progress"),
         )
-    return result
+        .select_from(Enrollment)
+        .join(Course, Course.id == Enrollment.course_id)
+        .where(Enrollment.user_id == current_user.id, *filters)
+    )
+    # Ordered on the enrollment side so uq_user_course serves the page
+    return _course_page(db, stmt, Enrollment.course_id, **page)
 
 
 # ---------- NEW INSTRUCTOR ENDPOINTS ----------
@@ -199,17 +306,15 @@ def my_courses(
 
 @router.get("/instructor/courses", response_model=List[CourseRead])
 def instructor_courses(
+    page: dict = Depends(_page_params),
+    filters: list = Depends(_course_filters),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     _ensure_instructor_or_admin(current_user)
 
-    courses = (
-        db.query(Course)
-        .filter(Course.instructor_id == current_user.id)
-        .all()
-    )
-    return [CourseRead.model_validate(c) for c in courses]
+    stmt = select(*_COURSE_COLUMNS).where(Course.instructor_id == current_user.id, *filters)
+    return _course_page(db, stmt, Course.id, **page)
 
 
 @router.get(
@@ -0,0 +1,152 @@
+"""
+Dynamic micro-batching for model inference
+Collects concurrent single-image requests into one stacked forward pass
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import torch
+
+from .inference_executor import InferenceExecutor, get_inference_executor
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+
+
+class InferenceBatcher:
+    """
+    Gathers requests that arrive within a short window into one batch.
+
+    Each caller submits a [1, C, H, W] tensor and receives its own slice of
+    the batched outputs. A batch is dispatched as soon as it reaches
+    ``max_batch_size`` or the oldest request has waited ``max_wait_ms``.
+    """
+
+    def __init__(
+        self,
+        forward_fn: Callable[[torch.Tensor], Tuple[torch.Tensor, Optional[torch.Tensor]]],
+        name: str = "default",
+        max_batch_size: int = INFERENCE_MAX_BATCH_SIZE,
+        max_wait_ms: float = INFERENCE_MAX_WAIT_MS,
+        executor: Optional[InferenceExecutor] = None,
+    ):
+        """
+        Args:
+            forward_fn: Blocking callable mapping a [B, C, H, W] batch to
+                (logits, attention_weights_or_None), both with batch dim B
+            name: Label used in logs and stats
+            max_batch_size: Upper bound on images per forward pass
+            max_wait_ms: Longest time the first request in a batch may wait
+            executor: Pool that runs the forward pass, defaults to the shared one
+        """
+        self.forward_fn = forward_fn
+        self.name = name
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.executor = executor or get_inference_executor()
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self._batches = 0
+        self._images = 0
+        self._batch_size_counts: Counter = Counter()
+        self._last_batch_ms = 0.0
+
+        logger.info(
+            f"InferenceBatcher[{name}] initialized - max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={max_wait_ms}"
+        )
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, image_tensor: torch.Tensor) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+        """
+        Queue one image for batched inference
+
+        Args:
+            image_tensor: Preprocessed tensor [1, C, H, W]
+
+        Returns:
+            tuple: (logits [1, num_classes], attention_weights [1, ...] or None)
+        """
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image_tensor, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[torch.Tensor, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Drain whatever is already waiting before considering the clock
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # Callers that disconnected while queued no longer need a result
+            batch = [(tensor, future) for tensor, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                stacked = torch.cat([tensor for tensor, _ in batch], dim=0)
+                logits, attention_weights = await self.executor.run(self.forward_fn, stacked)
+            except Exception as e:
+                logger.error(f"Batched inference [{self.name}] failed for {len(batch)} images: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for i, (_, future) in enumerate(batch):
+                if future.done():
+                    continue
+                future.set_result((
+                    logits[i:i + 1],
+                    attention_weights[i:i + 1] if attention_weights is not None else None,
+                ))
+
+            self._batches += 1
+            self._images += len(batch)
+            self._batch_size_counts[len(batch)] += 1
+            self._last_batch_ms = (time.perf_counter() - start) * 1000
+            logger.debug(f"Batch [{self.name}] of {len(batch)} images in {self._last_batch_ms:.1f} ms")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and batch-size statistics"""
+        return {
+            'model_type': self.name,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'batches': self._batches,
+            'images': self._images,
+            'avg_batch_size': round(self._images / self._batches, 2) if self._batches else 0.0,
+            'batch_size_histogram': {str(k): v for k, v in sorted(self._batch_size_counts.items())},
+            'last_batch_ms': round(self._last_batch_ms, 2),
+        }
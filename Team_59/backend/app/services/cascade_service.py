@@ -0,0 +1,177 @@
+"""
+Confidence-gated model cascade
+Answers with MobileNetV2 when it is confident and escalates hard cases
+to the hybrid CNN-ViT
+"""
+
+import logging
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.uploads import ImageSource
+from .gradcam_service import ExplanationOptions
+from .inference_executor import get_inference_executor
+from .prediction_service import PredictionService, get_prediction_service
+
+logger = logging.getLogger(__name__)
+
+CASCADE = "cascade"
+CASCADE_FIRST_STAGE = "mobilenetv2"
+CASCADE_SECOND_STAGE = "hybrid_cnn_vit"
+
+# Escalate when the first stage's top-class confidence is below this
+CASCADE_CONFIDENCE_THRESHOLD = float(os.getenv("CASCADE_CONFIDENCE_THRESHOLD", "0.9"))
+# Also escalate when P(Pneumonia) falls inside "low,high"; empty disables the band
+CASCADE_UNCERTAINTY_BAND = os.getenv("CASCADE_UNCERTAINTY_BAND", "")
+CASCADE_BAND_CLASS = os.getenv("CASCADE_BAND_CLASS", "Pneumonia")
+
+LOW_CONFIDENCE = "low_confidence"
+UNCERTAINTY_BAND = "uncertainty_band"
+
+
+def _parse_band(band: str) -> Optional[Tuple[float, float]]:
+    if not band.strip():
+        return None
+    low, high = (float(v) for v in band.split(","))
+    if not 0.0 <= low <= high <= 1.0:
+        raise ValueError(f"Invalid CASCADE_UNCERTAINTY_BAND '{band}', expected 'low,high' within [0, 1]")
+    return low, high
+
+
+class CascadePredictionService:
+    """
+    Two-stage classifier: MobileNetV2 first, the hybrid only when needed.
+
+    Both stages share one admission slot and one decoded tensor. The
+    response is the deciding stage's prediction plus a ``cascade`` block
+    naming that stage and why it was (or was not) escalated.
+    """
+
+    def __init__(
+        self,
+        threshold: float = CASCADE_CONFIDENCE_THRESHOLD,
+        uncertainty_band: Optional[Tuple[float, float]] = None,
+        band_class: str = CASCADE_BAND_CLASS,
+    ):
+        """
+        Args:
+            threshold: Escalate below this first-stage confidence
+            uncertainty_band: (low, high) on P(band_class) that also
+                escalates, defaults to CASCADE_UNCERTAINTY_BAND
+            band_class: Class whose probability the band applies to
+        """
+        self.threshold = threshold
+        self.uncertainty_band = uncertainty_band or _parse_band(CASCADE_UNCERTAINTY_BAND)
+        self.band_class = band_class
+        self.first: PredictionService = get_prediction_service(CASCADE_FIRST_STAGE)
+        self.second: PredictionService = get_prediction_service(CASCADE_SECOND_STAGE)
+        self.executor = get_inference_executor()
+
+        self._requests = 0
+        self._escalations: Counter = Counter()
+        self._latency_ms = {CASCADE_FIRST_STAGE: 0.0, CASCADE_SECOND_STAGE: 0.0}
+        self._decided = Counter()
+        logger.info(
+            f"CascadePredictionService initialized - threshold={threshold}, "
+            f"band={self.uncertainty_band} on {band_class}"
+        )
+
+    def escalation_reason(self, prediction: Dict[str, Any], threshold: Optional[float] = None) -> Optional[str]:
+        """Why a first-stage prediction needs the second stage, or None"""
+        threshold = self.threshold if threshold is None else threshold
+        if prediction['confidence'] < threshold:
+            return LOW_CONFIDENCE
+        if self.uncertainty_band is not None:
+            low, high = self.uncertainty_band
+            if low <= prediction['probabilities'].get(self.band_class, 0.0) <= high:
+                return UNCERTAINTY_BAND
+        return None
+
+    async def predict_from_bytes(
+        self,
+        image_bytes: ImageSource,
+        generate_explanation: bool = True,
+        defer_explanation: bool = False,
+        explanation_options: Optional[ExplanationOptions] = None,
+        threshold: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Classify one image through the cascade
+
+        Args:
+            image_bytes: Raw upload, or the spooled file of a large one
+            generate_explanation: Explain escalated predictions (MobileNetV2
+                has no GradCAM support)
+            defer_explanation: See PredictionService.predict_from_bytes
+            explanation_options: Heatmap encoding
+            threshold: Per-request override of the confidence threshold
+
+        Returns:
+            dict: Deciding stage's prediction with a ``cascade`` block
+        """
+        async with self.executor.admit():
+            start_time = time.time()
+            prepared: List[Any] = []  # decoded once, reused by the second stage
+
+            first = await self.first._predict(image_bytes, False, prepared=prepared)
+            reason = self.escalation_reason(first, threshold)
+
+            if reason is None:
+                response = first
+                decided_by = CASCADE_FIRST_STAGE
+            else:
+                response = await self.second._predict(
+                    image_bytes, generate_explanation, defer_explanation, explanation_options, prepared=prepared
+                )
+                decided_by = CASCADE_SECOND_STAGE
+
+            total_time = (time.time() - start_time) * 1000
+            response['cascade'] = {
+                'decided_by': decided_by,
+                'escalated': reason is not None,
+                'escalation_reason': reason,
+                'threshold': self.threshold if threshold is None else threshold,
+                'stage_confidences': {
+                    CASCADE_FIRST_STAGE: first['confidence'],
+                    **({CASCADE_SECOND_STAGE: response['confidence']} if reason else {}),
+                },
+            }
+            response['inference_time_ms'] = round(total_time, 2)
+
+        self._requests += 1
+        self._decided[decided_by] += 1
+        self._latency_ms[decided_by] += total_time
+        if reason is not None:
+            self._escalations[reason] += 1
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Escalation rate and per-path latency"""
+        escalated = sum(self._escalations.values())
+        return {
+            'requests': self._requests,
+            'escalations': escalated,
+            'escalation_rate': round(escalated / self._requests, 4) if self._requests else 0.0,
+            'escalation_reasons': dict(self._escalations),
+            'decided_by': dict(self._decided),
+            'avg_latency_ms': round(sum(self._latency_ms.values()) / self._requests, 2) if self._requests else 0.0,
+            'avg_latency_ms_by_stage': {
+                stage: round(total / self._decided[stage], 2) if self._decided[stage] else 0.0
+                for stage, total in self._latency_ms.items()
+            },
+            'threshold': self.threshold,
+            'uncertainty_band': list(self.uncertainty_band) if self.uncertainty_band else None,
+        }
+
+
+# Global cascade instance
+_cascade_service = None
+
+def get_cascade_service() -> CascadePredictionService:
+    """Get singleton cascade service"""
+    global _cascade_service
+    if _cascade_service is None:
+        _cascade_service = CascadePredictionService()
+    return _cascade_service
@@ -0,0 +1,200 @@
+"""
+Course catalog cache
+Keeps the course-level part of catalog pages and course details as
+pre-serialised JSON, keyed by the catalog version, so a reload only runs
+the version lookup and the caller's enrollment overlay.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from ..models.catalog_change import CatalogChange
+from ..models.enrollment import Enrollment
+
+logger = logging.getLogger(__name__)
+
+# Cached pages and course details per worker; 0 disables the cache
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "512"))
+
+_NOT_ENROLLED = b',"is_enrolled":false,"progress":0.0}'
+
+
+def _dumps(value: Any) -> bytes:
+    # Same encoding as JSONResponse
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class CoursePage:
+    """
+    Course rows of one catalog page or course detail, serialised once
+
+    Each fragment is a course's JSON object without its closing brace, so
+    the per-user fields can be appended without re-encoding the course.
+    """
+
+    __slots__ = ("course_ids", "fragments", "next_cursor")
+
+    def __init__(self, rows: List[Mapping[str, Any]], next_cursor: Optional[int] = None):
+        self.course_ids = [row["id"] for row in rows]
+        self.fragments = [_dumps(dict(row))[:-1] for row in rows]
+        self.next_cursor = next_cursor
+
+    def render(self, overlay: Dict[int, float]) -> List[bytes]:
+        """Course objects completed with is_enrolled and progress from overlay"""
+        rendered = []
+        for course_id, fragment in zip(self.course_ids, self.fragments):
+            progress = overlay.get(course_id)
+            if progress is None:
+                rendered.append(fragment + _NOT_ENROLLED)
+            else:
+                rendered.append(fragment + b',"is_enrolled":true,"progress":' + _dumps(float(progress)) + b"}")
+        return rendered
+
+
+def record_course_change(db: Session, course_id: int):
+    """
+    Mark a course as changed, moving its version and the catalog's
+
+    Runs inside the caller's transaction, so the new version becomes
+    visible exactly when the change commits. The course's older rows are
+    deleted, keeping the table at about one row per course; rows from
+    concurrent uncommitted changes survive until the next one.
+    """
+    change_id = db.execute(insert(CatalogChange).values(course_id=course_id)).inserted_primary_key[0]
+    db.execute(delete(CatalogChange).where(CatalogChange.course_id == course_id, CatalogChange.id < change_id))
+
+
+def _version(db: Session, *conditions) -> str:
+    # Every committed change adds one id and removes only smaller ones, so
+    # count and sum together move on each commit. max(id) would not: on
+    # Postgres a lower id can commit after a higher one.
+    count, total = db.execute(
+        select(func.count(), func.coalesce(func.sum(CatalogChange.id), 0)).where(*conditions)
+    ).one()
+    return f"{count}.{total}"
+
+
+def catalog_version(db: Session) -> str:
+    return _version(db)
+
+
+def course_version(db: Session, course_id: int) -> str:
+    return _version(db, CatalogChange.course_id == course_id)
+
+
+def enrollment_overlay(db: Session, user_id: int, course_ids: List[int]) -> Dict[int, float]:
+    """
+    The user's progress in the given courses, keyed by course id
+
+    Pages are in course id order, so one range on uq_user_course covers them.
+    """
+    if not course_ids:
+        return {}
+    rows = db.execute(
+        select(Enrollment.course_id, func.coalesce(Enrollment.progress, 0.0))
+        .where(
+            Enrollment.user_id == user_id,
+            Enrollment.course_id >= min(course_ids),
+            Enrollment.course_id <= max(course_ids),
+        )
+    ).all()
+    wanted = set(course_ids)
+    return {course_id: progress for course_id, progress in rows if course_id in wanted}
+
+
+def make_etag(version: str, key: Hashable, overlay: Dict[int, float]) -> str:
+    """Strong ETag over everything the response body depends on"""
+    digest = hashlib.sha256(repr((key, sorted(overlay.items()))).encode()).hexdigest()[:20]
+    return f'"{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison, so a W/ prefix still matches"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+class CatalogCache:
+    """
+    Thread-safe LRU of CoursePages keyed by version and query.
+
+    Entries are never updated in place: a write records a catalog change,
+    the version moves on and later lookups miss, so every worker sees the
+    write on its next request. Superseded entries age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = CATALOG_CACHE_SIZE):
+        self.max_entries = max(0, max_entries)
+        self._entries: "OrderedDict[tuple, CoursePage]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'not_modified': 0}
+        logger.info(f"CatalogCache initialized - {max_entries} entries")
+
+    def get_or_load(self, version: str, key: Hashable, load: Callable[[], Optional[CoursePage]]) -> Optional[CoursePage]:
+        """
+        Cached page for this version and query, loading it on a miss
+
+        Args:
+            version: Catalog or course version read before load() runs
+            key: Everything else the course rows depend on (route, filters, page)
+            load: Runs the query; returning None caches nothing
+
+        Returns:
+            CoursePage: The page, or None when load() found nothing
+        """
+        cache_key = (version, key)
+        with self._lock:
+            page = self._entries.get(cache_key)
+            if page is not None:
+                self._entries.move_to_end(cache_key)
+                self._stats['hits'] += 1
+                return page
+            self._stats['misses'] += 1
+
+        page = load()
+        if page is None or self.max_entries == 0:
+            return page
+        with self._lock:
+            self._entries[cache_key] = page
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return page
+
+    def count_not_modified(self):
+        with self._lock:
+            self._stats['not_modified'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._stats['hits'] + self._stats['misses']
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            **self._stats,
+            'hit_rate': round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Global cache instance
+_catalog_cache = None
+
+def get_catalog_cache() -> CatalogCache:
+    """Get singleton catalog cache"""
+    global _catalog_cache
+    if _catalog_cache is None:
+        _catalog_cache = CatalogCache()
+    return _catalog_cache
@@ -0,0 +1,42 @@
+"""
+Course counters
+Updates the denormalised counters on courses with single UPDATE
+statements, so the database does the arithmetic on the current row and
+concurrent writers never overwrite each other's increments.
+"""
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from ..models.course import Course
+from .catalog_cache import record_course_change
+
+
+def increment_enrollment_count(db: Session, course_id: int, delta: int = 1) -> bool:
+    """
+    Atomically add delta to a course's enrollment_count
+
+    Runs inside the caller's transaction, so the count commits or rolls
+    back together with the enrollment row. Issue it as the last statement
+    before commit: on Postgres the row lock it takes is held until then.
+    Also records a catalog change so cached catalog pages are replaced.
+
+    Args:
+        db: Session of the enclosing transaction
+        course_id: Course to update
+        delta: Change in enrollments (negative on unenroll)
+
+    Returns:
+        bool: False if the course does not exist
+    """
+    result = db.execute(
+        update(Course)
+        .where(Course.id == course_id)
+        .values(enrollment_count=func.coalesce(Course.enrollment_count, 0) + delta)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    record_course_change(db, course_id)
+    return True
+
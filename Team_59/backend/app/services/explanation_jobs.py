@@ -0,0 +1,152 @@
+"""
+Deferred explanation jobs
+Computes GradCAM explanations in the background so predictions can return first
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .inference_executor import InferenceQueueFullError
+
+logger = logging.getLogger(__name__)
+
+EXPLANATION_WORKERS = int(os.getenv("EXPLANATION_WORKERS", "1"))
+EXPLANATION_MAX_PENDING = int(os.getenv("EXPLANATION_MAX_PENDING", "64"))
+# How long a finished explanation stays available for polling
+EXPLANATION_RESULT_TTL_SECONDS = float(os.getenv("EXPLANATION_RESULT_TTL_SECONDS", "600"))
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+# Reported on a prediction whose deferred explanation could not be queued;
+# no job is created for it
+REJECTED = "rejected"
+
+
+class ExplanationJobManager:
+    """
+    Background worker pool for explanations with pollable job state.
+
+    Jobs move from ``pending`` to ``ready`` (or ``failed``). Finished jobs
+    are dropped ``ttl_seconds`` after completion; unknown or expired ids
+    look the same to callers.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = EXPLANATION_WORKERS,
+        max_pending: int = EXPLANATION_MAX_PENDING,
+        ttl_seconds: float = EXPLANATION_RESULT_TTL_SECONDS,
+    ):
+        self.max_pending = max(1, max_pending)
+        self.ttl_seconds = ttl_seconds
+        self.max_workers = max(1, max_workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="explain")
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._completed = 0
+        self._failed = 0
+        logger.info(f"ExplanationJobManager initialized - workers={max(1, max_workers)}, ttl={ttl_seconds}s")
+
+    def submit(self, fn: Callable[..., Dict[str, Any]], *args) -> str:
+        """
+        Queue an explanation computation
+
+        Args:
+            fn: Blocking callable returning the explanation payload
+            *args: Arguments for fn
+
+        Returns:
+            str: Job id to poll
+
+        Raises:
+            InferenceQueueFullError: If too many explanations are pending
+        """
+        with self._lock:
+            self._purge_expired()
+            pending = sum(1 for job in self._jobs.values() if job['status'] == PENDING)
+            if pending >= self.max_pending:
+                raise InferenceQueueFullError()
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'status': PENDING,
+                'created_at': time.time(),
+                'finished_at': None,
+                'result': None,
+                'error': None,
+            }
+
+        self._pool.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def _run(self, job_id: str, fn: Callable[..., Dict[str, Any]], args: tuple):
+        try:
+            result = fn(*args)
+            update = {'status': READY, 'result': result}
+            self._completed += 1
+        except Exception as e:
+            logger.error(f"Explanation job {job_id} failed: {e}")
+            update = {'status': FAILED, 'error': str(e)}
+            self._failed += 1
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(update, finished_at=time.time())
+
+    def _purge_expired(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job['finished_at'] is not None and now - job['finished_at'] > self.ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current job state, or None if the id is unknown or expired"""
+        with self._lock:
+            self._purge_expired()
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if job['status'] == PENDING)
+            return {
+                'pending': pending,
+                'retained': len(self._jobs),
+                'completed': self._completed,
+                'failed': self._failed,
+            }
+
+    def shutdown(self):
+        """
+        Stop the workers and fail the jobs they will not run
+
+        Left usable with a fresh pool, like InferenceExecutor.shutdown().
+        """
+        pool = self._pool
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="explain")
+        pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            for job in self._jobs.values():
+                if job['status'] == PENDING:
+                    job.update(status=FAILED, error="Server shut down", finished_at=time.time())
+
+
+# Global job manager instance
+_explanation_jobs = None
+
+def get_explanation_jobs() -> ExplanationJobManager:
+    """Get singleton explanation job manager"""
+    global _explanation_jobs
+    if _explanation_jobs is None:
+        _explanation_jobs = ExplanationJobManager()
+    return _explanation_jobs
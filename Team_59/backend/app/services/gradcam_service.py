@@ -4,39 +4,122 @@ from PIL import Image
 import cv2
 import io
 import base64
-from typing import Tuple, Optional
+from typing import Callable, Tuple, Optional
 import logging
+import os
+import threading
 
 from ..models.gradcam import GradCAM
+from ..models.attention_rollout import AttentionRollout
+from ..models.model_loader import ModelLoader
 
 logger = logging.getLogger(__name__)
 
+# Backpropagate only through the CNN branch that feeds the CAM target
+GRADCAM_CNN_ONLY = os.getenv("GRADCAM_CNN_ONLY", "1").lower() not in ("0", "false", "no")
+
+EXPLANATION_FORMATS = ("png", "webp", "jpeg", "cam_uint8", "cam_array")
+GRADCAM = "gradcam"
+ATTENTION_ROLLOUT = "attention_rollout"
+# attention_rollout needs no backward pass; see benchmarks/explanation_methods.py
+EXPLANATION_METHODS = (GRADCAM, ATTENTION_ROLLOUT)
+DEFAULT_IMAGE_QUALITY = 85
+DEFAULT_CAM_ARRAY_SIZE = 56
+
+
+class ExplanationOptions:
+    """
+    How an explanation is computed and delivered
+
+    png/webp/jpeg return colored heatmap and overlay images as data URLs;
+    cam_uint8 and cam_array return the raw CAM for client-side coloring.
+    method picks GradCAM or gradient-free attention rollout.
+    """
+
+    def __init__(
+        self,
+        format: str = "png",
+        quality: int = DEFAULT_IMAGE_QUALITY,
+        cam_size: int = DEFAULT_CAM_ARRAY_SIZE,
+        method: str = GRADCAM
+    ):
+        if format not in EXPLANATION_FORMATS:
+            raise ValueError(f"Unsupported explanation format: {format}")
+        if method not in EXPLANATION_METHODS:
+            raise ValueError(f"Unsupported explanation method: {method}")
+        self.format = format
+        self.method = method
+        self.quality = min(max(int(quality), 1), 100)
+        self.cam_size = min(max(int(cam_size), 8), 224)
+
+    @property
+    def is_raw_cam(self) -> bool:
+        return self.format in ("cam_uint8", "cam_array")
+
+    @property
+    def cache_variant(self) -> str:
+        """Suffix that keeps differently computed or encoded explanations apart in the cache"""
+        if self.format in ("webp", "jpeg"):
+            variant = f"{self.format}{self.quality}"
+        elif self.format == "cam_array":
+            variant = f"{self.format}{self.cam_size}"
+        else:
+            variant = self.format
+        return variant if self.method == GRADCAM else f"{self.method}-{variant}"
+
+
 class GradCAMService:
-    """Service for generating GradCAM visualizations"""
+    """Service for generating GradCAM and attention-rollout visualizations"""
 
-    def __init__(self, model: torch.nn.Module):
+    def __init__(
+        self,
+        model: torch.nn.Module,
+        input_transform: Optional[Callable[[torch.Tensor], torch.Tensor]] = None,
+        cnn_only: bool = GRADCAM_CNN_ONLY
+    ):
         """
         Initialize GradCAM service
         Args:
             model: Trained model
+            input_transform: Casts float32 inputs to the model's precision
+            cnn_only: Keep the ViT branch out of the backward pass
         """
         self.gradcam = GradCAM(model)
+        self.rollout = AttentionRollout(model)
+        self.input_transform = input_transform or (lambda x: x)
+        self.cnn_only = cnn_only
+        # GradCAM keeps hook state on the instance, so one explanation at a time;
+        # attention rollout is stateless and runs without the lock
+        self._lock = threading.Lock()
         logger.info("GradCAMService initialized")
 
+    def _compute(
+        self,
+        image_tensor: torch.Tensor,
+        target_class: Optional[int] = None,
+        method: str = GRADCAM
+    ) -> Tuple[torch.Tensor, torch.Tensor, np.ndarray]:
+        x = self.input_transform(image_tensor)
+        if method == ATTENTION_ROLLOUT:
+            # Rollout is class-agnostic, so target_class does not apply
+            return self.rollout.generate_with_outputs(x)
+        with self._lock:
+            return self.gradcam.generate_cam_with_outputs(x, target_class, cnn_only=self.cnn_only)
+
     def generate_heatmap(
         self,
         image_tensor: torch.Tensor,
-        target_class: Optional[int] = None
+        target_class: Optional[int] = None,
+        method: str = GRADCAM
     ) -> np.ndarray:
         """
-        Generate GradCAM heatmap
+        Generate GradCAM (or attention rollout) heatmap
         """
         try:
-            heatmap = self.gradcam.generate_cam(image_tensor, target_class)
+            _, _, heatmap = self._compute(image_tensor, target_class, method)
             # Normalize heatmap to [0,1] for full contrast
             heatmap = cv2.normalize(heatmap, None, 0, 1, cv2.NORM_MINMAX)
             logger.info(f"Generated and normalized heatmap for class {target_class}")
-            print("DEBUG heatmap shape:", heatmap.shape, "min/max:", heatmap.min(), heatmap.max())
             return heatmap
         except Exception as e:
             logger.error(f"Heatmap generation failed: {e}")
@@ -54,9 +137,11 @@ class GradCAMService:
         """
         try:
             # Resize original image to 224x224 with bilinear interpolation
-            img_resized = original_image.resize((224, 224), Image.BILINEAR)
+            if original_image.size == (224, 224) and original_image.mode == 'RGB':
+                img_resized = original_image  # already the preprocessing preview
+            else:
+                img_resized = original_image.convert('RGB').resize((224, 224), Image.BILINEAR)
             img_array = np.array(img_resized)
-            print("DEBUG img_array shape:", img_array.shape, "dtype:", img_array.dtype, "min/max:", img_array.min(), img_array.max())
 
             # Convert normalized heatmap to [0,255] uint8
             heatmap_uint8 = np.uint8(255 * heatmap)
@@ -72,79 +157,147 @@ class GradCAMService:
             heatmap_img = Image.fromarray(heatmap_colored)
             superimposed_img = Image.fromarray(superimposed)
 
-            # Save images for manual debug (delete later in prod)
-            heatmap_img.save("debug_heatmap.png")
-            superimposed_img.save("debug_superimposed.png")
-            print("Saved debug PNGs. Image sizes:", heatmap_img.size, superimposed_img.size)
-
-            logger.info("Overlay created successfully")
+            logger.debug("Overlay created successfully")
 
             return heatmap_img, superimposed_img
         except Exception as e:
             logger.error(f"Overlay creation failed: {e}")
             raise
 
-    def image_to_base64(self, image: Image.Image) -> str:
+    def image_to_base64(
+        self,
+        image: Image.Image,
+        image_format: str = "png",
+        quality: int = DEFAULT_IMAGE_QUALITY
+    ) -> str:
         """
-        Convert PIL image to base64 string
+        Convert PIL image to a base64 data URL in PNG, WebP or JPEG
         """
         try:
             buffer = io.BytesIO()
-            image.save(buffer, format='PNG')
-            img_bytes = buffer.getvalue()
-            print("DEBUG encoded PNG size:", len(img_bytes), "First bytes:", img_bytes[:20])
-            base64_str = base64.b64encode(img_bytes).decode('utf-8')
-            return f"data:image/png;base64,{base64_str}"
+            if image_format == "png":
+                image.save(buffer, format='PNG')
+            else:
+                image.save(buffer, format=image_format.upper(), quality=quality)
+            base64_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
+            return f"data:image/{image_format};base64,{base64_str}"
         except Exception as e:
             logger.error(f"Base64 encoding failed: {e}")
             raise
 
+    def encode_cam(self, heatmap: np.ndarray, options: "ExplanationOptions") -> dict:
+        """
+        Encode the raw CAM for clients that colour it themselves
+
+        cam_uint8 carries the full-resolution map as base64 of row-major
+        uint8 bytes; cam_array is a nested list at reduced resolution.
+        """
+        if options.format == "cam_array":
+            size = options.cam_size
+            cam = cv2.resize(heatmap, (size, size), interpolation=cv2.INTER_AREA)
+            cam_uint8 = np.uint8(np.clip(cam, 0, 1) * 255)
+            return {'encoding': 'array', 'width': size, 'height': size, 'data': cam_uint8.tolist()}
+
+        cam_uint8 = np.uint8(np.clip(heatmap, 0, 1) * 255)
+        height, width = cam_uint8.shape
+        return {
+            'encoding': 'uint8',
+            'width': width,
+            'height': height,
+            'data': base64.b64encode(cam_uint8.tobytes()).decode('ascii'),
+        }
+
     def generate_explanation(
         self,
         original_image: Image.Image,
         image_tensor: torch.Tensor,
         predicted_class: int,
         confidence: float,
-        class_names: list
+        class_names: list,
+        options: Optional["ExplanationOptions"] = None
     ) -> dict:
         """
         Generate complete explanation package
         """
         try:
             # Generate normalized heatmap
-            heatmap = self.generate_heatmap(image_tensor, predicted_class)
+            method = options.method if options is not None else GRADCAM
+            heatmap = self.generate_heatmap(image_tensor, predicted_class, method)
 
-            # Create overlays
-            heatmap_img, superimposed_img = self.create_overlay(
+            return self.build_explanation(
                 original_image,
-                heatmap
+                heatmap,
+                predicted_class,
+                confidence,
+                class_names,
+                options
             )
+        except Exception as e:
+            logger.error(f"Explanation generation failed: {e}")
+            raise
 
-            # Convert both images to base64
-            heatmap_b64 = self.image_to_base64(heatmap_img)
-            superimposed_b64 = self.image_to_base64(superimposed_img)
+    def predict_with_explanation(
+        self,
+        image_tensor: torch.Tensor,
+        method: str = GRADCAM
+    ) -> Tuple[torch.Tensor, torch.Tensor, np.ndarray]:
+        """
+        Classify and compute the heatmap from one forward pass
+
+        GradCAM needs a grad-enabled pass; attention rollout runs under no_grad.
+
+        Returns:
+            tuple: (logits, attention_weights, normalized heatmap) for the
+                predicted class
+        """
+        try:
+            logits, attention_weights, heatmap = self._compute(image_tensor, method=method)
+            heatmap = cv2.normalize(heatmap, None, 0, 1, cv2.NORM_MINMAX)
+            return logits.float(), attention_weights.float(), heatmap
+        except Exception as e:
+            logger.error(f"Single-pass prediction with heatmap failed: {e}")
+            raise
+
+    def build_explanation(
+        self,
+        original_image: Image.Image,
+        heatmap: np.ndarray,
+        predicted_class: int,
+        confidence: float,
+        class_names: list,
+        options: Optional["ExplanationOptions"] = None
+    ) -> dict:
+        """
+        Package an already computed heatmap into the explanation payload
+        """
+        options = options or ExplanationOptions()
 
-            # Generate textual explanation
-            explanation_text = self._generate_explanation_text(
+        explanation_data = {
+            'explanation': self._generate_explanation_text(
                 predicted_class,
                 confidence,
                 class_names
-            )
+            ),
+            'confidence': confidence,
+            'predicted_class': class_names[predicted_class],
+            'explanation_format': options.format,
+            'explanation_method': options.method
+        }
 
-            explanation_data = {
-                'heatmap': heatmap_b64,
-                'superimposed': superimposed_b64,
-                'explanation': explanation_text,
-                'confidence': confidence,
-                'predicted_class': class_names[predicted_class]
-            }
+        if options.is_raw_cam:
+            # Client renders the colormap itself; skip overlays and image encoding
+            explanation_data['cam'] = self.encode_cam(heatmap, options)
+        else:
+            heatmap_img, superimposed_img = self.create_overlay(
+                original_image,
+                heatmap
+            )
+            explanation_data['heatmap'] = self.image_to_base64(heatmap_img, options.format, options.quality)
+            explanation_data['superimposed'] = self.image_to_base64(superimposed_img, options.format, options.quality)
 
-            logger.info("Complete explanation generated")
+        logger.info("Complete explanation generated")
 
-            return explanation_data
-        except Exception as e:
-            logger.error(f"Explanation generation failed: {e}")
-            raise
+        return explanation_data
 
     def _generate_explanation_text(
         self,
@@ -177,12 +330,21 @@ class GradCAMService:
         return explanation
 
 
-# Global service instance
-_gradcam_service = None
+_gradcam_service_lock = threading.Lock()
+
+def get_gradcam_service(model_loader: ModelLoader) -> GradCAMService:
+    """
+    Get or create the GradCAM service for a resident model
 
-def get_gradcam_service(model: torch.nn.Module) -> GradCAMService:
-    """Get or create GradCAM service"""
-    global _gradcam_service
-    if _gradcam_service is None:
-        _gradcam_service = GradCAMService(model)
-    return _gradcam_service
+    The service is stored on the loader, so it is released together with
+    the model when the registry evicts it.
+    """
+    with _gradcam_service_lock:
+        if model_loader.explainer is None:
+            model_loader.explainer = GradCAMService(
+                model_loader.get_model(),
+                input_transform=model_loader.prepare_input,
+                # Quantized ViT layers have no backward pass
+                cnn_only=GRADCAM_CNN_ONLY or model_loader.precision == "int8-dynamic",
+            )
+        return model_loader.explainer
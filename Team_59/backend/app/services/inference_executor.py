@@ -0,0 +1,139 @@
+"""
+Dedicated executor for CPU-bound inference work
+Keeps decoding, forward passes and GradCAM off the FastAPI event loop
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Concurrent inference jobs; independent of uvicorn workers and FastAPI's threadpool
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "2"))
+# Intra-op threads used by torch inside each job (0 keeps torch's default)
+INFERENCE_TORCH_THREADS = int(os.getenv("INFERENCE_TORCH_THREADS", "0"))
+# Requests admitted at once (running + waiting) before answering 503
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "32"))
+INFERENCE_RETRY_AFTER_SECONDS = int(os.getenv("INFERENCE_RETRY_AFTER_SECONDS", "2"))
+
+
+class InferenceQueueFullError(Exception):
+    """Raised when the inference queue cannot admit another request"""
+
+    def __init__(self, retry_after: int = INFERENCE_RETRY_AFTER_SECONDS):
+        self.retry_after = retry_after
+        super().__init__("Inference queue is full, retry later")
+
+
+class InferenceExecutor:
+    """
+    Bounded thread pool for model inference with explicit backpressure.
+
+    Requests must be admitted before they queue work; once
+    ``max_pending`` requests are in flight, new ones are rejected
+    instead of piling up behind the classifier.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = INFERENCE_THREADS,
+        max_pending: int = INFERENCE_MAX_PENDING,
+        torch_threads: int = INFERENCE_TORCH_THREADS,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._pending = 0
+        self._admitted = 0
+        self._rejected = 0
+
+        if torch_threads > 0:
+            torch.set_num_threads(torch_threads)
+
+        logger.info(
+            f"InferenceExecutor initialized - workers={self.max_workers}, "
+            f"max_pending={self.max_pending}, torch_threads={torch.get_num_threads()}"
+        )
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Reserve a slot for one request
+
+        Raises:
+            InferenceQueueFullError: If ``max_pending`` requests are already in flight
+        """
+        # Only touched from the event loop, so no lock is needed
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise InferenceQueueFullError()
+        self._pending += 1
+        self._admitted += 1
+        try:
+            yield
+        finally:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking callable on the inference pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+
+    def set_torch_threads(self, torch_threads: int):
+        """
+        Change torch's intra-op thread count for the caller and every pool thread
+
+        Torch applies the setting per thread once that thread has run an op,
+        so each pool thread sets it itself; the barrier makes every worker
+        take exactly one of the tasks.
+        """
+        torch.set_num_threads(torch_threads)
+        barrier = threading.Barrier(self.max_workers)
+
+        def apply():
+            torch.set_num_threads(torch_threads)
+            barrier.wait(timeout=30)
+
+        for future in [self._pool.submit(apply) for _ in range(self.max_workers)]:
+            future.result()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.max_workers,
+            'torch_threads': torch.get_num_threads(),
+            'in_flight': self._pending,
+            'max_pending': self.max_pending,
+            'admitted': self._admitted,
+            'rejected': self._rejected,
+        }
+
+    def shutdown(self):
+        """
+        Stop the pool's threads
+
+        Services keep a reference to this executor, so it is left usable
+        with a fresh pool (threads start on first use) for a lifespan that
+        starts again in the same process.
+        """
+        pool = self._pool
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Global executor instance
+_inference_executor = None
+
+def get_inference_executor() -> InferenceExecutor:
+    """Get singleton inference executor"""
+    global _inference_executor
+    if _inference_executor is None:
+        _inference_executor = InferenceExecutor()
+    return _inference_executor
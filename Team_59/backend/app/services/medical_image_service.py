@@ -8,8 +8,10 @@ from typing import Dict, Any, Optional
 from fastapi import UploadFile
 import asyncio
 
-from .prediction_service import get_prediction_service
+from ..core.uploads import MAX_IMAGE_UPLOAD_MB, read_image_upload
+from .prediction_service import get_prediction_service, MAX_BATCH_FILES, BATCH_MEMORY_BUDGET_MB
 from .preprocessing_service import get_preprocessing_service
+from .gradcam_service import EXPLANATION_METHODS
 
 logger = logging.getLogger(__name__)
 
@@ -44,10 +46,11 @@ class MedicalImageService:
             dict: Complete analysis results
         """
         try:
-            # Read file
-            image_bytes = await file.read()
+            # Validate and read within the upload limit
+            image_bytes = await read_image_upload(file)
+            file_size = len(image_bytes) if isinstance(image_bytes, bytes) else file.size
             
-            logger.info(f"Processing file: {file.filename} ({len(image_bytes)} bytes)")
+            logger.info(f"Processing file: {file.filename} ({file_size} bytes)")
             
             # Optional enhancement
             if enhance_image:
@@ -62,7 +65,7 @@ class MedicalImageService:
             
             # Add metadata
             result['filename'] = file.filename
-            result['file_size_bytes'] = len(image_bytes)
+            result['file_size_bytes'] = file_size
             
             logger.info(f"Analysis completed for {file.filename}")
             
@@ -129,10 +132,14 @@ class MedicalImageService:
         """Get service capabilities"""
         return {
             'supported_formats': self.get_supported_formats(),
-            'max_image_size_mb': 10,
+            'max_image_size_mb': MAX_IMAGE_UPLOAD_MB,
+            'max_batch_files': MAX_BATCH_FILES,
+            'batch_memory_budget_mb': BATCH_MEMORY_BUDGET_MB,
+            'explanation_methods': list(EXPLANATION_METHODS),
             'features': [
                 'medical_image_classification',
                 'explainable_ai_gradcam',
+                'explainable_ai_attention_rollout',
                 'confidence_scoring',
                 'batch_processing',
                 'real_time_inference'
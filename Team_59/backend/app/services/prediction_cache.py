@@ -0,0 +1,235 @@
+"""
+Content-addressed prediction cache
+Reuses predictions and explanations for images that were already classified
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from ..core.uploads import ImageSource
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "1024"))
+EXPLANATION_CACHE_SIZE = int(os.getenv("EXPLANATION_CACHE_SIZE", "64"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "86400"))
+# Leave empty to keep the cache in memory only
+PREDICTION_CACHE_DIR = os.getenv("PREDICTION_CACHE_DIR", "")
+
+PREDICTIONS = "predictions"
+EXPLANATIONS = "explanations"
+
+
+class _LRUTier:
+    """Thread-safe in-memory LRU with per-entry expiry"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Dict[str, Any]):
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PredictionCache:
+    """
+    Two-tier cache keyed by image content hash, model type and checkpoint.
+
+    Predictions and explanations live in separate namespaces so a cached
+    prediction can be served immediately and still get an explanation
+    computed (and cached) later. Concurrent requests for the same key
+    share a single in-flight computation.
+    """
+
+    def __init__(
+        self,
+        prediction_entries: int = PREDICTION_CACHE_SIZE,
+        explanation_entries: int = EXPLANATION_CACHE_SIZE,
+        ttl_seconds: float = PREDICTION_CACHE_TTL_SECONDS,
+        cache_dir: Optional[str] = PREDICTION_CACHE_DIR or None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self._memory = {
+            PREDICTIONS: _LRUTier(prediction_entries, ttl_seconds),
+            EXPLANATIONS: _LRUTier(explanation_entries, ttl_seconds),
+        }
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir is not None:
+            for namespace in self._memory:
+                (self.cache_dir / namespace).mkdir(parents=True, exist_ok=True)
+
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'inflight_joins': 0}
+        logger.info(
+            f"PredictionCache initialized - {prediction_entries} predictions, "
+            f"{explanation_entries} explanations, disk tier: {self.cache_dir or 'disabled'}"
+        )
+
+    @staticmethod
+    def make_key(image_bytes: ImageSource, model_type: str, model_fingerprint: str) -> str:
+        """Cache key from image content, model type and checkpoint fingerprint"""
+        if isinstance(image_bytes, (bytes, bytearray)):
+            content_hash = hashlib.sha256(image_bytes).hexdigest()
+        else:
+            # Spooled upload: hash it in blocks and rewind for the decoder
+            image_bytes.seek(0)
+            content_hash = hashlib.file_digest(image_bytes, "sha256").hexdigest()
+            image_bytes.seek(0)
+        return f"{model_type}-{model_fingerprint}-{content_hash}"
+
+    def _disk_path(self, namespace: str, key: str) -> Path:
+        return self.cache_dir / namespace / f"{key}.json"
+
+    def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached value in memory, then on disk"""
+        value = self._memory[namespace].get(key)
+        if value is not None:
+            self._stats['hits'] += 1
+            return value
+
+        if self.cache_dir is not None:
+            path = self._disk_path(namespace, key)
+            try:
+                if time.time() - path.stat().st_mtime <= self.ttl_seconds:
+                    value = json.loads(path.read_text())
+                    self._memory[namespace].put(key, value)
+                    self._stats['disk_hits'] += 1
+                    return value
+                path.unlink(missing_ok=True)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+
+        self._stats['misses'] += 1
+        return None
+
+    def put(self, namespace: str, key: str, value: Dict[str, Any]):
+        """Store a value in memory and, if enabled, on disk"""
+        self._memory[namespace].put(key, value)
+
+        if self.cache_dir is not None:
+            path = self._disk_path(namespace, key)
+            try:
+                # Write-then-rename so readers never see a partial file
+                fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(value, f)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Failed to write cache entry {path}: {e}")
+
+    async def _run_io(self, fn: Callable[..., Any], *args) -> Any:
+        # Memory-only lookups are cheap; only the disk tier needs a thread
+        if self.cache_dir is None:
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    async def store(self, namespace: str, key: str, value: Dict[str, Any]):
+        """put() without blocking the event loop on the disk tier"""
+        await self._run_io(self.put, namespace, key, value)
+
+    async def get_or_compute(
+        self,
+        namespace: str,
+        key: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Return a cached value or compute it once for all concurrent callers
+
+        Args:
+            namespace: PREDICTIONS or EXPLANATIONS
+            key: Key from make_key (plus any variant suffix)
+            compute: Coroutine factory producing the value on a miss
+
+        Returns:
+            tuple: (value, served_from_cache)
+        """
+        value = await self._run_io(self.get, namespace, key)
+        if value is not None:
+            return value, True
+
+        flight_key = f"{namespace}:{key}"
+        pending = self._inflight.get(flight_key)
+        if pending is not None:
+            self._stats['inflight_joins'] += 1
+            try:
+                return await asyncio.shield(pending), True
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The leading request went away; compute on our own behalf
+                return await self.get_or_compute(namespace, key, compute)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark failures as retrieved even when nobody joined the flight
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[flight_key] = future
+        try:
+            value = await compute()
+            await self._run_io(self.put, namespace, key, value)
+            future.set_result(value)
+            return value, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._inflight[flight_key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._stats['hits'] + self._stats['disk_hits'] + self._stats['misses']
+        return {
+            **self._stats,
+            'hit_rate': round((self._stats['hits'] + self._stats['disk_hits']) / lookups, 4) if lookups else 0.0,
+            'prediction_entries': len(self._memory[PREDICTIONS]),
+            'explanation_entries': len(self._memory[EXPLANATIONS]),
+            'inflight': len(self._inflight),
+            'disk_tier': str(self.cache_dir) if self.cache_dir else None,
+        }
+
+
+# Global cache instance
+_prediction_cache = None
+
+def get_prediction_cache() -> PredictionCache:
+    """Get singleton prediction cache"""
+    global _prediction_cache
+    if _prediction_cache is None:
+        _prediction_cache = PredictionCache()
+    return _prediction_cache
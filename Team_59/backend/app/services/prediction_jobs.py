@@ -0,0 +1,745 @@
+"""
+Large-batch prediction jobs
+Spools uploaded datasets to disk and classifies them in the background,
+persisting progress and results in the database so jobs survive restarts
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+import zipfile
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import and_, delete, func, or_, select, update
+
+from ..core.uploads import MAX_IMAGE_UPLOAD_MB, ZIP_SIGNATURES, sniff_image_type
+from ..db import SessionLocal
+from ..models.prediction_job import PredictionJob, PredictionJobResult
+from .inference_executor import InferenceQueueFullError
+from .prediction_service import PredictionService, get_prediction_service
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_JOB_DIR = os.getenv("PREDICTION_JOB_DIR", "prediction_jobs")
+PREDICTION_JOB_WORKERS = int(os.getenv("PREDICTION_JOB_WORKERS", "1"))
+# Images per batch_predict call; each call is one admission slot and is
+# split into BATCH_CHUNK_SIZE forward passes
+PREDICTION_JOB_CHUNK_SIZE = int(os.getenv("PREDICTION_JOB_CHUNK_SIZE", "32"))
+PREDICTION_JOB_MAX_ITEMS = int(os.getenv("PREDICTION_JOB_MAX_ITEMS", "50000"))
+PREDICTION_JOB_MAX_UPLOAD_MB = float(os.getenv("PREDICTION_JOB_MAX_UPLOAD_MB", "2048"))
+PREDICTION_JOB_MAX_IMAGE_MB = float(os.getenv("PREDICTION_JOB_MAX_IMAGE_MB", str(MAX_IMAGE_UPLOAD_MB)))
+# A running job whose heartbeat is older than this is assumed orphaned
+PREDICTION_JOB_STALE_SECONDS = float(os.getenv("PREDICTION_JOB_STALE_SECONDS", "120"))
+# How often idle workers look for claimable jobs (other processes may queue them)
+PREDICTION_JOB_POLL_SECONDS = float(os.getenv("PREDICTION_JOB_POLL_SECONDS", "5"))
+PREDICTION_JOB_STREAM_POLL_SECONDS = float(os.getenv("PREDICTION_JOB_STREAM_POLL_SECONDS", "0.5"))
+# A job never started is dropped, uploads included, this long after creation
+PREDICTION_JOB_UPLOAD_TTL_SECONDS = float(os.getenv("PREDICTION_JOB_UPLOAD_TTL_SECONDS", "86400"))
+# How long a finished, failed or cancelled job's results stay readable
+PREDICTION_JOB_RESULT_TTL_SECONDS = float(os.getenv("PREDICTION_JOB_RESULT_TTL_SECONDS", "604800"))
+# How often workers look for expired jobs
+PREDICTION_JOB_PURGE_SECONDS = float(os.getenv("PREDICTION_JOB_PURGE_SECONDS", "300"))
+
+UPLOADING = "uploading"
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERMINAL_STATUSES = (COMPLETED, FAILED, CANCELLED)
+# Not stored: what a worker sees when another process took its job over
+RECLAIMED = "reclaimed"
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+MANIFEST = "manifest.jsonl"
+_COPY_BUFFER = 1024 * 1024
+_RESULT_PAGE = 256
+_PURGE_BATCH = 100
+
+
+class PredictionJobError(Exception):
+    """A job request that cannot be honoured, with the HTTP status to report"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class PredictionJobManager:
+    """
+    Database-backed prediction jobs processed by a pool of asyncio workers.
+
+    A job is created in ``uploading`` state and accepts any number of
+    uploads, each either a zip of images or a single image. Uploads are
+    copied to the job's spool directory and indexed into a manifest; zip
+    members are read in place when their chunk is processed. Starting the
+    job moves it to ``queued``.
+
+    Workers claim queued jobs with a conditional UPDATE, so several server
+    processes can share one database. Each chunk's results, the resume
+    cursor and the heartbeat are committed in one transaction. A job
+    whose owner stops heartbeating (crash, restart) is claimed again and
+    resumes at its cursor; a graceful shutdown hands jobs back at once.
+
+    Jobs left in ``uploading`` expire ``upload_ttl_seconds`` after
+    creation, finished ones ``result_ttl_seconds`` after finishing; both
+    are deleted with their results and spool directory, after which the
+    id is unknown.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        job_dir: str = PREDICTION_JOB_DIR,
+        workers: int = PREDICTION_JOB_WORKERS,
+        chunk_size: int = PREDICTION_JOB_CHUNK_SIZE,
+        stale_seconds: float = PREDICTION_JOB_STALE_SECONDS,
+        poll_seconds: float = PREDICTION_JOB_POLL_SECONDS,
+        upload_ttl_seconds: float = PREDICTION_JOB_UPLOAD_TTL_SECONDS,
+        result_ttl_seconds: float = PREDICTION_JOB_RESULT_TTL_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.job_dir = os.path.abspath(job_dir)
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.stale_seconds = stale_seconds
+        self.poll_seconds = poll_seconds
+        self.upload_ttl_seconds = upload_ttl_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self.max_upload_bytes = int(PREDICTION_JOB_MAX_UPLOAD_MB * 1024 * 1024)
+        self.max_image_bytes = int(PREDICTION_JOB_MAX_IMAGE_MB * 1024 * 1024)
+        # Unique per process lifetime, so a restarted container (same pid) never
+        # mistakes the previous run's jobs for its own
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # One lock per job in ``uploading`` state, so a slow upload only
+        # holds up uploads to and start of its own job
+        self._upload_locks: Dict[str, threading.Lock] = {}
+        self._upload_locks_guard = threading.Lock()
+        self._processed = 0
+        self._next_purge = 0.0
+        self._active: Dict[str, int] = {}
+        logger.info(
+            f"PredictionJobManager initialized - workers={self.workers}, "
+            f"chunk={self.chunk_size}, dir={self.job_dir}"
+        )
+
+    # --- Job lifecycle (blocking; call from a thread) -----------------------
+
+    def create_job(self, model_type: str) -> Dict[str, Any]:
+        """Create an empty job in ``uploading`` state"""
+        job_id = uuid.uuid4().hex
+        spool_dir = os.path.join(self.job_dir, job_id)
+        os.makedirs(spool_dir, exist_ok=True)
+        with self.session_factory() as db:
+            job = PredictionJob(id=job_id, status=UPLOADING, model_type=model_type, spool_dir=spool_dir)
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            return self._describe(job)
+
+    def add_upload(self, job_id: str, filename: str, fileobj: BinaryIO) -> int:
+        """
+        Spool one upload to disk and index the images it contains
+
+        Args:
+            job_id: Job in ``uploading`` state
+            filename: Client file name, used for the item names
+            fileobj: Readable upload; copied in 1 MB blocks
+
+        Returns:
+            int: Number of items added to the job
+
+        Raises:
+            PredictionJobError: Unknown job, wrong state, unsupported file
+                or a size/item limit exceeded
+        """
+        with self._upload_lock(job_id):
+            job = self._require(job_id)
+            if job['status'] != UPLOADING:
+                raise PredictionJobError(f"Job is {job['status']}, uploads are closed", 409)
+
+            spool_dir = job['spool_dir']
+            upload_number = sum(1 for name in os.listdir(spool_dir) if name.startswith("upload-"))
+            suffix = os.path.splitext(filename or "")[1].lower()
+            path = os.path.join(spool_dir, f"upload-{upload_number:05d}{suffix}")
+
+            budget = self.max_upload_bytes - job['upload_bytes']
+            written = self._spool(fileobj, path, budget)
+            try:
+                entries = self._index_upload(path, filename or os.path.basename(path))
+                if job['total_items'] + len(entries) > PREDICTION_JOB_MAX_ITEMS:
+                    raise PredictionJobError(f"Maximum {PREDICTION_JOB_MAX_ITEMS} images allowed per job", 413)
+            except Exception:
+                os.remove(path)
+                raise
+
+            # Manifest lines and total_items must agree, since item indices
+            # are manifest positions; undo the lines if the counters fail
+            manifest_path = os.path.join(spool_dir, MANIFEST)
+            manifest_size = os.path.getsize(manifest_path) if os.path.exists(manifest_path) else 0
+            try:
+                with open(manifest_path, "a") as manifest:
+                    for entry in entries:
+                        manifest.write(json.dumps(entry) + "\n")
+                with self.session_factory() as db:
+                    db.execute(
+                        update(PredictionJob)
+                        .where(PredictionJob.id == job_id)
+                        .values(
+                            total_items=PredictionJob.total_items + len(entries),
+                            upload_bytes=PredictionJob.upload_bytes + written,
+                        )
+                    )
+                    db.commit()
+            except Exception:
+                with open(manifest_path, "a") as manifest:
+                    manifest.truncate(manifest_size)
+                os.remove(path)
+                raise
+
+        logger.info(f"Prediction job {job_id}: spooled {filename} ({written / 1e6:.1f} MB, {len(entries)} images)")
+        return len(entries)
+
+    def _upload_lock(self, job_id: str) -> threading.Lock:
+        with self._upload_locks_guard:
+            return self._upload_locks.setdefault(job_id, threading.Lock())
+
+    def _drop_upload_lock(self, job_id: str):
+        # Callers that still hold the old lock see the job is no longer uploading
+        with self._upload_locks_guard:
+            self._upload_locks.pop(job_id, None)
+
+    def _spool(self, fileobj: BinaryIO, path: str, budget: int) -> int:
+        written = 0
+        with open(path, "wb") as out:
+            while True:
+                block = fileobj.read(_COPY_BUFFER)
+                if not block:
+                    break
+                if not written and block[:4] not in ZIP_SIGNATURES and sniff_image_type(block) is None:
+                    # Checked on the first block, before anything is spooled
+                    out.close()
+                    os.remove(path)
+                    raise PredictionJobError("Upload is neither a zip archive nor a JPEG/PNG image", 415)
+                written += len(block)
+                if written > budget:
+                    out.close()
+                    os.remove(path)
+                    raise PredictionJobError(
+                        f"Job uploads exceed {PREDICTION_JOB_MAX_UPLOAD_MB:.0f} MB", 413
+                    )
+                out.write(block)
+        return written
+
+    def _index_upload(self, path: str, filename: str) -> List[Dict[str, Any]]:
+        upload = os.path.basename(path)
+        with open(path, "rb") as f:
+            is_zip = f.read(4) in ZIP_SIGNATURES
+        if is_zip:
+            if not zipfile.is_zipfile(path):
+                raise PredictionJobError(f"{filename} is not a valid zip archive", 400)
+            entries = []
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    name = info.filename
+                    base = os.path.basename(name)
+                    if info.is_dir() or base.startswith(".") or name.startswith("__MACOSX/"):
+                        continue
+                    if not base.lower().endswith(IMAGE_SUFFIXES):
+                        continue
+                    entry = {'upload': upload, 'member': name, 'name': name}
+                    if info.file_size > self.max_image_bytes:
+                        entry['error'] = f"Image exceeds {PREDICTION_JOB_MAX_IMAGE_MB:.0f} MB"
+                    entries.append(entry)
+            if not entries:
+                raise PredictionJobError(f"{filename} contains no images", 400)
+            return entries
+
+        entry = {'upload': upload, 'member': None, 'name': filename}
+        if os.path.getsize(path) > self.max_image_bytes:
+            entry['error'] = f"Image exceeds {PREDICTION_JOB_MAX_IMAGE_MB:.0f} MB"
+        return [entry]
+
+    def start_job(self, job_id: str) -> Dict[str, Any]:
+        """Close uploads and queue the job for the workers"""
+        with self._upload_lock(job_id):
+            job = self._require(job_id)
+            if job['status'] != UPLOADING:
+                raise PredictionJobError(f"Job is already {job['status']}", 409)
+            if job['total_items'] == 0:
+                raise PredictionJobError("Job has no images", 400)
+
+            with self.session_factory() as db:
+                db.execute(
+                    update(PredictionJob)
+                    .where(PredictionJob.id == job_id, PredictionJob.status == UPLOADING)
+                    .values(status=QUEUED)
+                )
+                db.commit()
+        self._drop_upload_lock(job_id)
+        self._notify()
+        return self.get_job(job_id)
+
+    def cancel_job(self, job_id: str) -> Dict[str, Any]:
+        """Cancel a job; results already committed stay readable"""
+        job = self._require(job_id)
+        if job['status'] in TERMINAL_STATUSES:
+            return self.get_job(job_id)
+
+        with self.session_factory() as db:
+            db.execute(
+                update(PredictionJob)
+                .where(PredictionJob.id == job_id)
+                .values(status=CANCELLED, finished_at=func.now())
+            )
+            db.commit()
+        self._drop_upload_lock(job_id)
+
+        # A live owner notices on its next commit and cleans up itself
+        owner_alive = job['status'] == RUNNING and not self._is_stale(job['heartbeat'])
+        if not owner_alive:
+            shutil.rmtree(job['spool_dir'], ignore_errors=True)
+        logger.info(f"Prediction job {job_id} cancelled at {job['processed_items']}/{job['total_items']}")
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Progress of a job, or None if the id is unknown"""
+        with self.session_factory() as db:
+            job = db.get(PredictionJob, job_id)
+            return self._describe(job) if job is not None else None
+
+    def _require(self, job_id: str) -> Dict[str, Any]:
+        """Job progress plus the worker-side fields clients never see"""
+        with self.session_factory() as db:
+            job = db.get(PredictionJob, job_id)
+            if job is None:
+                raise PredictionJobError("Prediction job not found", 404)
+            return {**self._describe(job), 'spool_dir': job.spool_dir, 'heartbeat': job.heartbeat}
+
+    @staticmethod
+    def _describe(job: PredictionJob) -> Dict[str, Any]:
+        return {
+            'job_id': job.id,
+            'status': job.status,
+            'model_type': job.model_type,
+            'total_items': job.total_items,
+            'processed_items': job.next_item,
+            'failed_items': job.failed_items,
+            'progress': round(job.next_item / job.total_items, 4) if job.total_items else 0.0,
+            'upload_bytes': job.upload_bytes,
+            'error': job.error,
+            'created_at': job.created_at.isoformat() if job.created_at else None,
+            'started_at': job.started_at.isoformat() if job.started_at else None,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        }
+
+    def _is_stale(self, heartbeat: Optional[float]) -> bool:
+        return heartbeat is None or time.time() - heartbeat > self.stale_seconds
+
+    # --- Results ------------------------------------------------------------
+
+    def read_results(self, job_id: str, offset: int = 0, limit: int = _RESULT_PAGE) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Committed results from item ``offset`` on, in item order
+
+        Returns:
+            tuple: (results, job status at the time of the read)
+        """
+        with self.session_factory() as db:
+            status = db.scalar(select(PredictionJob.status).where(PredictionJob.id == job_id))
+            if status is None:
+                raise PredictionJobError("Prediction job not found", 404)
+            rows = db.execute(
+                select(PredictionJobResult.item_index, PredictionJobResult.filename, PredictionJobResult.payload)
+                .where(PredictionJobResult.job_id == job_id, PredictionJobResult.item_index >= offset)
+                .order_by(PredictionJobResult.item_index)
+                .limit(limit)
+            ).all()
+        results = [{'index': index, 'filename': filename, **json.loads(payload)} for index, filename, payload in rows]
+        return results, status
+
+    async def stream_results(self, job_id: str, offset: int = 0, follow: bool = True) -> AsyncIterator[str]:
+        """
+        Results as NDJSON lines, waiting for new ones until the job finishes
+
+        Args:
+            job_id: Job to stream
+            offset: First item index to send; a client that lost its
+                connection resumes with the number of lines it received
+            follow: Keep the stream open until the job is finished
+
+        Yields:
+            str: One JSON object per line
+        """
+        while True:
+            results, status = await asyncio.to_thread(self.read_results, job_id, offset)
+            for result in results:
+                yield json.dumps(result) + "\n"
+            offset += len(results)
+
+            if len(results) == _RESULT_PAGE:
+                continue
+            # The status is read before the rows, so a finished job has
+            # nothing left to send
+            if not follow or status in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(PREDICTION_JOB_STREAM_POLL_SECONDS)
+
+    # --- Workers ------------------------------------------------------------
+
+    async def start(self):
+        """Start the worker tasks; they pick up queued and orphaned jobs"""
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers and hand their running jobs back to the queue"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+        try:
+            released = await asyncio.to_thread(self._release_owned)
+            if released:
+                logger.info(f"Released {released} running prediction job(s) for resumption")
+        except Exception as e:
+            logger.error(f"Failed to release prediction jobs: {e}")
+
+    def _notify(self):
+        # start_job runs in a worker thread, so wake the loop thread-safely
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _worker(self, number: int):
+        while True:
+            self._wakeup.clear()
+            await self._maybe_purge()
+            try:
+                job_id = await asyncio.to_thread(self._claim_next)
+            except Exception as e:
+                logger.error(f"Prediction job worker {number} failed to claim a job: {e}")
+                job_id = None
+
+            if job_id is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._process(job_id)
+            except Exception as e:
+                # Keep the worker alive; a job left running is reclaimed once stale
+                logger.error(f"Prediction job worker {number} failed on job {job_id}: {e}")
+
+    async def _maybe_purge(self):
+        # Shared by the workers; whichever reaches it first after the interval runs it
+        if time.monotonic() < self._next_purge:
+            return
+        self._next_purge = time.monotonic() + PREDICTION_JOB_PURGE_SECONDS
+        try:
+            purged = await asyncio.to_thread(self._purge_expired)
+            if purged:
+                logger.info(f"Purged {purged} expired prediction job(s)")
+        except Exception as e:
+            logger.error(f"Failed to purge expired prediction jobs: {e}")
+
+    def _purge_expired(self) -> int:
+        """Delete expired jobs with their results and spool directories; returns how many"""
+        now = datetime.now(timezone.utc)
+        with self.session_factory() as db:
+            expired = db.execute(
+                select(PredictionJob.id, PredictionJob.status, PredictionJob.spool_dir)
+                .where(or_(
+                    and_(
+                        PredictionJob.status == UPLOADING,
+                        PredictionJob.created_at < now - timedelta(seconds=self.upload_ttl_seconds),
+                    ),
+                    and_(
+                        PredictionJob.status.in_(TERMINAL_STATUSES),
+                        PredictionJob.finished_at < now - timedelta(seconds=self.result_ttl_seconds),
+                    ),
+                ))
+                .limit(_PURGE_BATCH)
+            ).all()
+
+        purged = 0
+        for job_id, status, spool_dir in expired:
+            lock = self._upload_lock(job_id)
+            if not lock.acquire(blocking=False):
+                continue  # an upload is being copied; try again next time
+            try:
+                with self.session_factory() as db:
+                    db.execute(delete(PredictionJobResult).where(PredictionJobResult.job_id == job_id))
+                    # Conditional on the status read above, so a job started meanwhile survives
+                    deleted = db.execute(
+                        delete(PredictionJob).where(PredictionJob.id == job_id, PredictionJob.status == status)
+                    ).rowcount
+                    if deleted:
+                        db.commit()
+                    else:
+                        db.rollback()
+            finally:
+                lock.release()
+                self._drop_upload_lock(job_id)
+            if deleted:
+                shutil.rmtree(spool_dir, ignore_errors=True)
+                purged += 1
+        return purged
+
+    def _claimable(self):
+        stale_before = time.time() - self.stale_seconds
+        return or_(
+            PredictionJob.status == QUEUED,
+            and_(
+                PredictionJob.status == RUNNING,
+                or_(PredictionJob.heartbeat.is_(None), PredictionJob.heartbeat < stale_before),
+            ),
+        )
+
+    def _claim_next(self) -> Optional[str]:
+        with self.session_factory() as db:
+            candidates = db.scalars(
+                select(PredictionJob.id)
+                .where(self._claimable())
+                .order_by(PredictionJob.created_at)
+                .limit(8)
+            ).all()
+            for job_id in candidates:
+                # Conditional on still being claimable, so only one worker wins
+                claimed = db.execute(
+                    update(PredictionJob)
+                    .where(PredictionJob.id == job_id, self._claimable())
+                    .values(
+                        status=RUNNING,
+                        worker_id=self.worker_id,
+                        heartbeat=time.time(),
+                        started_at=func.coalesce(PredictionJob.started_at, func.now()),
+                    )
+                ).rowcount
+                db.commit()
+                if claimed:
+                    return job_id
+        return None
+
+    def _release_owned(self) -> int:
+        with self.session_factory() as db:
+            released = db.execute(
+                update(PredictionJob)
+                .where(PredictionJob.worker_id == self.worker_id, PredictionJob.status == RUNNING)
+                .values(status=QUEUED, worker_id=None, heartbeat=None)
+            ).rowcount
+            db.commit()
+        return released
+
+    def _touch(self, job_id: str):
+        with self.session_factory() as db:
+            db.execute(
+                update(PredictionJob)
+                .where(PredictionJob.id == job_id, PredictionJob.worker_id == self.worker_id)
+                .values(heartbeat=time.time())
+            )
+            db.commit()
+
+    async def _process(self, job_id: str):
+        cursor = 0
+        spool_dir = None
+        try:
+            job = await asyncio.to_thread(self._require, job_id)
+            cursor = job['processed_items']
+            spool_dir = job['spool_dir']
+            self._active[job_id] = cursor
+            if cursor:
+                logger.info(f"Resuming prediction job {job_id} at item {cursor}/{job['total_items']}")
+            else:
+                logger.info(f"Starting prediction job {job_id}: {job['total_items']} images on {job['model_type']}")
+
+            entries = await asyncio.to_thread(self._read_manifest, spool_dir)
+            entries = entries[:job['total_items']]
+            service = get_prediction_service(job['model_type'])
+            started = time.time()
+
+            while cursor < len(entries):
+                chunk = entries[cursor:cursor + self.chunk_size]
+                images = await asyncio.to_thread(self._read_items, spool_dir, chunk)
+                results = await self._predict_chunk(job_id, service, images)
+
+                status = await asyncio.to_thread(self._commit_chunk, job_id, cursor, chunk, results)
+                if status != RUNNING:
+                    logger.info(f"Prediction job {job_id} is {status}, stopping at item {cursor}")
+                    if status == CANCELLED:
+                        shutil.rmtree(spool_dir, ignore_errors=True)
+                    return
+                cursor += len(chunk)
+                self._active[job_id] = cursor
+                self._processed += len(chunk)
+
+            await asyncio.to_thread(self._finish, job_id, spool_dir, COMPLETED)
+            elapsed = time.time() - started
+            logger.info(
+                f"Prediction job {job_id} completed: {len(entries)} images "
+                f"in {elapsed:.1f}s ({len(entries) / max(elapsed, 1e-6):.1f} images/s)"
+            )
+        except Exception as e:
+            logger.error(f"Prediction job {job_id} failed at item {cursor}: {e}")
+            try:
+                await asyncio.to_thread(self._finish, job_id, spool_dir, FAILED, str(e))
+            except Exception as finish_error:
+                # Often the same outage; the job stays running and is reclaimed once stale
+                logger.error(f"Prediction job {job_id}: could not record the failure: {finish_error}")
+        finally:
+            self._active.pop(job_id, None)
+
+    @staticmethod
+    def _read_manifest(spool_dir: str) -> List[Dict[str, Any]]:
+        with open(os.path.join(spool_dir, MANIFEST)) as manifest:
+            return [json.loads(line) for line in manifest if line.strip()]
+
+    def _read_items(self, spool_dir: str, chunk: List[Dict[str, Any]]) -> List[Union[bytes, Exception]]:
+        """Raw bytes of each item, or the reason it cannot be read"""
+        images: List[Union[bytes, Exception]] = []
+        archives: Dict[str, zipfile.ZipFile] = {}
+        try:
+            for entry in chunk:
+                if entry.get('error'):
+                    images.append(ValueError(entry['error']))
+                    continue
+                path = os.path.join(spool_dir, entry['upload'])
+                try:
+                    if entry['member'] is None:
+                        with open(path, "rb") as f:
+                            images.append(f.read())
+                        continue
+                    if path not in archives:
+                        archives[path] = zipfile.ZipFile(path)
+                    # The declared size was checked at indexing; enforce it on
+                    # the actual stream too, in case the header lies
+                    with archives[path].open(entry['member']) as member:
+                        data = member.read(self.max_image_bytes + 1)
+                    if len(data) > self.max_image_bytes:
+                        raise ValueError(f"Image exceeds {PREDICTION_JOB_MAX_IMAGE_MB:.0f} MB")
+                    images.append(data)
+                except Exception as e:
+                    images.append(e)
+        finally:
+            for archive in archives.values():
+                archive.close()
+        return images
+
+    async def _predict_chunk(
+        self,
+        job_id: str,
+        service: PredictionService,
+        images: List[Union[bytes, Exception]],
+    ) -> List[Dict[str, Any]]:
+        readable = [i for i, image in enumerate(images) if isinstance(image, bytes)]
+        results: List[Dict[str, Any]] = [
+            {'success': False, 'error': str(image)} for image in images
+        ]
+        if not readable:
+            return results
+
+        while True:
+            try:
+                predictions = await service.batch_predict([images[i] for i in readable], False)
+                break
+            except InferenceQueueFullError as e:
+                # Interactive traffic has priority; back off without losing the job
+                await asyncio.to_thread(self._touch, job_id)
+                await asyncio.sleep(e.retry_after)
+
+        for i, prediction in zip(readable, predictions):
+            results[i] = prediction
+        return results
+
+    def _commit_chunk(
+        self,
+        job_id: str,
+        cursor: int,
+        chunk: List[Dict[str, Any]],
+        results: List[Dict[str, Any]],
+    ) -> str:
+        """Store a chunk's results and advance the cursor; returns the job status"""
+        with self.session_factory() as db:
+            job = db.get(PredictionJob, job_id)
+            if job is None:
+                return CANCELLED
+            if job.status != RUNNING or job.worker_id != self.worker_id or job.next_item != cursor:
+                # Cancelled, or reclaimed by another worker after we went stale
+                return job.status if job.worker_id == self.worker_id else RECLAIMED
+
+            db.add_all(
+                PredictionJobResult(
+                    job_id=job_id,
+                    item_index=cursor + offset,
+                    filename=entry['name'],
+                    success=bool(result.get('success')),
+                    payload=json.dumps(result),
+                )
+                for offset, (entry, result) in enumerate(zip(chunk, results))
+            )
+            job.next_item = cursor + len(chunk)
+            job.failed_items += sum(1 for result in results if not result.get('success'))
+            job.heartbeat = time.time()
+            db.commit()
+            return RUNNING
+
+    def _finish(self, job_id: str, spool_dir: Optional[str], status: str, error: Optional[str] = None):
+        with self.session_factory() as db:
+            finished = db.execute(
+                update(PredictionJob)
+                .where(
+                    PredictionJob.id == job_id,
+                    PredictionJob.worker_id == self.worker_id,
+                    PredictionJob.status == RUNNING,
+                )
+                .values(status=status, error=error, finished_at=func.now(), heartbeat=time.time())
+            ).rowcount
+            db.commit()
+        if finished != 1:
+            # Reclaimed after we went stale, so the spool belongs to the new
+            # owner; a cancelled job's spool goes when the job expires
+            logger.info(f"Prediction job {job_id} is no longer ours, leaving its spool")
+            return
+        if spool_dir is not None:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.session_factory() as db:
+            counts = dict(
+                db.execute(select(PredictionJob.status, func.count()).group_by(PredictionJob.status)).all()
+            )
+        return {
+            'worker_id': self.worker_id,
+            'workers': self.workers,
+            'chunk_size': self.chunk_size,
+            'active_jobs': dict(self._active),
+            'images_processed': self._processed,
+            'jobs_by_status': counts,
+        }
+
+
+# Global job manager instance
+_prediction_jobs = None
+
+def get_prediction_jobs() -> PredictionJobManager:
+    """Get singleton prediction job manager"""
+    global _prediction_jobs
+    if _prediction_jobs is None:
+        _prediction_jobs = PredictionJobManager()
+    return _prediction_jobs
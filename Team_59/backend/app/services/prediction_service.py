@@ -1,16 +1,41 @@
+import asyncio
+import copy
 import torch
 import torch.nn.functional as F
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
 import logging
+import os
 from PIL import Image
 import time
 
-from ..models.model_loader import get_model_loader
+from ..core.telemetry import ENCODE, FORWARD, FORWARD_BATCH_SIZE, observe_stage, stage_timer
+from ..core.uploads import MAX_IMAGE_UPLOAD_MB, ImageSource
+from ..models.model_loader import ModelLoader
+from ..models.model_registry import get_model_registry
 from .preprocessing_service import get_preprocessing_service
-from .gradcam_service import get_gradcam_service
+from .gradcam_service import GRADCAM, ExplanationOptions, get_gradcam_service
+from .batching_service import InferenceBatcher
+from .inference_executor import InferenceQueueFullError, get_inference_executor
+from .prediction_cache import PredictionCache, PREDICTIONS, EXPLANATIONS, get_prediction_cache
+from .explanation_jobs import PENDING, REJECTED, get_explanation_jobs
 
 logger = logging.getLogger(__name__)
 
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "8"))
+BATCH_MEMORY_BUDGET_MB = float(os.getenv("BATCH_MEMORY_BUDGET_MB", "1024"))
+
+# Rough per-image working set used to size batches against the budget
+DECODED_MB_PER_IMAGE = 12.0  # decoded full-resolution RGB X-ray kept for overlays
+TENSOR_MB_PER_IMAGE = 0.6  # float32 [3, 224, 224]
+ACTIVATION_MB_PER_IMAGE = {'mobilenetv2': 25.0, 'hybrid_cnn_vit': 60.0}
+
+# Defaults to the most max-size uploads that fit the budget on the heaviest
+# model, so any batch within the file and size limits passes the estimate
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "0")) or max(1, int(
+    (BATCH_MEMORY_BUDGET_MB - BATCH_CHUNK_SIZE * max(ACTIVATION_MB_PER_IMAGE.values()))
+    // (MAX_IMAGE_UPLOAD_MB + DECODED_MB_PER_IMAGE + TENSOR_MB_PER_IMAGE)
+))
+
 class PredictionService:
     def __init__(self, model_type: str = "mobilenetv2"):
         """
@@ -22,57 +47,70 @@ class PredictionService:
         self.model_type = model_type.lower()
         self.class_names = ['Normal', 'Pneumonia']  # Update if your classes differ
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        self.model_loader = None
-        self.model = None
-        self.gradcam_service = None
         self.preprocessing_service = get_preprocessing_service()
+        self.executor = get_inference_executor()
+        self.cache = get_prediction_cache()
+        self.explanation_jobs = get_explanation_jobs()
+        self.batcher = InferenceBatcher(self._forward, name=self.model_type, executor=self.executor)
         logger.info(f"PredictionService initialized on {self.device} with model type {self.model_type}")
 
-    def load_model(self):
-        if self.model_loader is None or self.model_loader.model_type != self.model_type:
-            # Define appropriate checkpoint path per model type
-            if self.model_type == "hybrid_cnn_vit":
-                checkpoint_path = "trained_models/enhanced_hybrid_model.pth"
-            elif self.model_type == "mobilenetv2":
-                checkpoint_path = "trained_models/mobilenetv2_small_model.pth"
-            else:
-                raise ValueError(f"Unsupported model type: {self.model_type}")
+    def load_model(self) -> ModelLoader:
+        """
+        Get the resident loader for this model type from the registry.
 
-            self.model_loader = get_model_loader(
-                model_path=checkpoint_path,
-                device=str(self.device),
-                model_type=self.model_type
-            )
-            self.model = self.model_loader.get_model()
-            if self.model_type == "hybrid_cnn_vit":
-                self.gradcam_service = get_gradcam_service(self.model)
-            else:
-                self.gradcam_service = None  # Not implemented for MobileNetV2 yet
-            logger.info("Model and auxiliary services loaded")
+        Callers keep the returned loader for the duration of one request
+        instead of storing it, so evicted models can be released.
+        """
+        return get_model_registry(device=str(self.device)).get(self.model_type)
 
-    async def predict_from_bytes(self, image_bytes: bytes, generate_explanation: bool = True) -> Dict[str, Any]:
-        start_time = time.time()
-        self.load_model()
+    @property
+    def model(self) -> Optional[torch.nn.Module]:
+        """Currently resident model, without triggering a load"""
+        loader = get_model_registry(device=str(self.device)).peek(self.model_type)
+        return loader.model if loader is not None else None
 
-        if not self.preprocessing_service.validate_image(image_bytes):
-            raise ValueError("Invalid image format or content")
+    @property
+    def supports_explanations(self) -> bool:
+        return self.model_type == "hybrid_cnn_vit"  # Not implemented for MobileNetV2 yet
 
-        original_image, resized_image = self.preprocessing_service.load_image_from_bytes(image_bytes)
-        image_tensor = self.preprocessing_service.preprocess_for_model(resized_image)
-        image_tensor = image_tensor.to(self.device)
+    def _forward(self, batch: torch.Tensor) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+        """Run one no-grad forward pass over a [B, 3, 224, 224] batch"""
+        loader = self.load_model()
+        with stage_timer(self.model_type, FORWARD):
+            outputs = loader.forward(loader.prepare_input(batch))
+        FORWARD_BATCH_SIZE.labels(self.model_type).observe(batch.shape[0])
+        if self.model_type == "hybrid_cnn_vit":
+            logits, attention_weights, _ = outputs
+            attention_weights = attention_weights.float()
+        else:  # MobileNetV2 returns only logits
+            logits = outputs
+            attention_weights = None
+        return logits.float(), attention_weights
 
-        with torch.no_grad():
-            if self.model_type == "hybrid_cnn_vit":
-                logits, attention_weights, _ = self.model(image_tensor)
-            else:  # MobileNetV2 returns only logits
-                logits = self.model(image_tensor)
-                attention_weights = None
+    def _prepare_image(
+        self,
+        image_bytes: ImageSource,
+        out: Optional[torch.Tensor] = None
+    ) -> Tuple[Image.Image, torch.Tensor]:
+        """
+        Decode and preprocess one upload in a single pass
+
+        Returns:
+            tuple: (224x224 RGB preview for overlays, tensor [1, 3, 224, 224])
+        """
+        timings: Dict[str, float] = {}
+        image_tensor, preview = self.preprocessing_service.prepare(image_bytes, out=out, timings=timings)
+        for stage, seconds in timings.items():
+            observe_stage(self.model_type, stage, seconds)
+        return preview, image_tensor.to(self.device)
 
-            probabilities = F.softmax(logits, dim=1)
-            predicted_class = torch.argmax(probabilities, dim=1).item()
-            confidence = probabilities[0, predicted_class].item()
+    def _format_prediction(self, logits: torch.Tensor) -> Dict[str, Any]:
+        """Turn one row of logits [1, num_classes] into the response payload"""
+        probabilities = F.softmax(logits.float(), dim=1)
+        predicted_class = torch.argmax(probabilities, dim=1).item()
+        confidence = probabilities[0, predicted_class].item()
 
-        response = {
+        return {
             'success': True,
             'prediction': int(predicted_class),
             'class_name': self.class_names[predicted_class],
@@ -81,25 +119,184 @@ class PredictionService:
             'inference_time_ms': 0
         }
 
-        if generate_explanation and self.gradcam_service and attention_weights is not None:
-            explanation_data = self.gradcam_service.generate_explanation(
+    def _explain(
+        self,
+        original_image: Image.Image,
+        image_tensor: torch.Tensor,
+        response: Dict[str, Any],
+        options: Optional[ExplanationOptions] = None
+    ) -> Dict[str, Any]:
+        gradcam_service = get_gradcam_service(self.load_model())
+        method = options.method if options is not None else GRADCAM
+        with stage_timer(self.model_type, method):
+            heatmap = gradcam_service.generate_heatmap(image_tensor, response['prediction'], method)
+        with stage_timer(self.model_type, ENCODE):
+            return gradcam_service.build_explanation(
                 original_image,
-                image_tensor,
-                predicted_class,
-                confidence,
-                self.class_names
+                heatmap,
+                response['prediction'],
+                response['confidence'],
+                self.class_names,
+                options
             )
-            response.update(explanation_data)
+
+    def _predict_and_explain(
+        self,
+        original_image: Image.Image,
+        image_tensor: torch.Tensor,
+        options: Optional[ExplanationOptions] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Prediction and GradCAM explanation from a single forward pass"""
+        gradcam_service = get_gradcam_service(self.load_model())
+        method = options.method if options is not None else GRADCAM
+        with stage_timer(self.model_type, method):
+            logits, _, heatmap = gradcam_service.predict_with_explanation(image_tensor, method)
+        response = self._format_prediction(logits)
+        with stage_timer(self.model_type, ENCODE):
+            explanation = gradcam_service.build_explanation(
+                original_image,
+                heatmap,
+                response['prediction'],
+                response['confidence'],
+                self.class_names,
+                options
+            )
+        return response, explanation
+
+    def _explain_deferred(
+        self,
+        explanation_key: str,
+        image_bytes: ImageSource,
+        prepared: Optional[Tuple[Image.Image, torch.Tensor]],
+        prediction: Dict[str, Any],
+        options: ExplanationOptions
+    ) -> Dict[str, Any]:
+        """Background explanation job; reuses the decoded image when available"""
+        explanation = self.cache.get(EXPLANATIONS, explanation_key)
+        if explanation is None:
+            original_image, image_tensor = prepared or self._prepare_image(image_bytes)
+            explanation = self._explain(original_image, image_tensor, prediction, options)
+            self.cache.put(EXPLANATIONS, explanation_key, explanation)
+        return explanation
+
+    async def predict_from_bytes(
+        self,
+        image_bytes: ImageSource,
+        generate_explanation: bool = True,
+        defer_explanation: bool = False,
+        explanation_options: Optional[ExplanationOptions] = None
+    ) -> Dict[str, Any]:
+        """
+        Classify one image, optionally with a GradCAM explanation
+
+        Args:
+            image_bytes: Raw upload, or the spooled file of a large one
+            generate_explanation: Include a heatmap explanation
+            defer_explanation: Return the classification immediately with an
+                explanation_id to poll instead of waiting for the heatmap
+            explanation_options: Heatmap encoding, defaults to PNG data URLs
+
+        Returns:
+            dict: Prediction payload
+        """
+        async with self.executor.admit():
+            return await self._predict(image_bytes, generate_explanation, defer_explanation, explanation_options)
+
+    async def _predict(
+        self,
+        image_bytes: ImageSource,
+        generate_explanation: bool = True,
+        defer_explanation: bool = False,
+        explanation_options: Optional[ExplanationOptions] = None,
+        prepared: Optional[List[Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        predict_from_bytes() for a request that has already been admitted
+
+        Args:
+            prepared: Shared [preview, tensor] holder; filled on first decode
+                so another model can reuse it (see CascadePredictionService)
+        """
+        start_time = time.time()
+        loader = await self.executor.run(self.load_model)
+        if isinstance(image_bytes, bytes):
+            cache_key = PredictionCache.make_key(image_bytes, self.model_type, loader.fingerprint)
+        else:
+            cache_key = await self.executor.run(PredictionCache.make_key, image_bytes, self.model_type, loader.fingerprint)
+        explanation_options = explanation_options or ExplanationOptions()
+        explanation_key = f"{cache_key}-{explanation_options.cache_variant}"
+
+        # Decoded image is kept so a fresh prediction can be explained without decoding again
+        prepared = prepared if prepared is not None else []
+
+        async def prepare() -> Tuple[Image.Image, torch.Tensor]:
+            if not prepared:
+                prepared.extend(await self.executor.run(self._prepare_image, image_bytes))
+            return prepared[0], prepared[1]
+
+        explain_requested = generate_explanation and self.supports_explanations
+        explain_inline = explain_requested and not defer_explanation
+        single_pass: Dict[str, Dict[str, Any]] = {}
+
+        async def predict() -> Dict[str, Any]:
+            original_image, image_tensor = await prepare()
+            if explain_inline:
+                # One grad-enabled pass yields both logits and the CAM
+                prediction, single_pass['explanation'] = await self.executor.run(
+                    self._predict_and_explain, original_image, image_tensor, explanation_options
+                )
+                return prediction
+            # Concurrent requests share one stacked forward pass
+            logits, _ = await self.batcher.submit(image_tensor)
+            return self._format_prediction(logits)
+
+        cached, cache_hit = await self.cache.get_or_compute(PREDICTIONS, cache_key, predict)
+        response = copy.deepcopy(cached)
+
+        if explain_inline:
+            async def explain() -> Dict[str, Any]:
+                if 'explanation' in single_pass:
+                    return single_pass['explanation']
+                original_image, image_tensor = await prepare()
+                return await self.executor.run(
+                    self._explain, original_image, image_tensor, response, explanation_options
+                )
+
+            explanation, _ = await self.cache.get_or_compute(EXPLANATIONS, explanation_key, explain)
+            response.update(explanation)
+        elif explain_requested:
+            if not isinstance(image_bytes, bytes):
+                # A spooled upload is closed with the request, so decode it now
+                await prepare()
+            try:
+                response['explanation_id'] = self.explanation_jobs.submit(
+                    self._explain_deferred,
+                    explanation_key,
+                    image_bytes,
+                    tuple(prepared) or None,
+                    copy.deepcopy(cached),
+                    explanation_options
+                )
+                response['explanation_status'] = PENDING
+            except InferenceQueueFullError as e:
+                # The prediction is done and cached; return it without the heatmap
+                # rather than failing the request
+                response['explanation_status'] = REJECTED
+                response['explanation_retry_after'] = e.retry_after
 
         total_time = (time.time() - start_time) * 1000
         response['inference_time_ms'] = round(total_time, 2)
+        response['cached'] = cache_hit
 
-        logger.info(f"Prediction: {response['class_name']} ({confidence*100:.1f}%) in {total_time:.0f} ms")
+        logger.info(
+            f"Prediction [{self.model_type}]: {response['class_name']} ({response['confidence']*100:.1f}%) "
+            f"in {total_time:.0f} ms{' (cached)' if cache_hit else ''}"
+        )
         return response
 
     def get_model_info(self) -> Dict[str, Any]:
-        self.load_model()
-        model_info = self.model_loader.get_model_info()
+        loader = self.load_model()
+        model_info = loader.get_model_info()
 
         if self.model_type == "hybrid_cnn_vit":
             architecture = {
@@ -116,26 +313,191 @@ class PredictionService:
             'architecture': architecture,
             'training_info': model_info,
             'classes': self.class_names,
-            'device': str(self.device)
+            'device': str(self.device),
+            'precision': loader.precision,
+            'backend': loader.backend,
+            'checkpoint': {
+                'hash': loader.checkpoint_hash,
+                'file': model_info['checkpoint_file'],
+                'loaded_at': loader.loaded_at,
+                'load_ms': loader.load_timings_ms.get('total'),
+                'load_timings_ms': loader.load_timings_ms,
+            },
+            'registry': get_model_registry(device=str(self.device)).get_stats()
         }
 
-    def batch_predict(self, image_bytes_list: List[bytes], generate_explanations: bool = False) -> List[Dict[str, Any]]:
-        results = []
-        for i, image_bytes in enumerate(image_bytes_list):
+    def check_batch_budget(self, num_files: int, total_bytes: int) -> Optional[str]:
+        """
+        Check a batch request against the file cap and memory budget
+
+        Args:
+            num_files: Number of uploads in the request
+            total_bytes: Combined size of the raw uploads
+
+        Returns:
+            str: Reason the batch is rejected, or None if it fits
+        """
+        if num_files > MAX_BATCH_FILES:
+            return f"Maximum {MAX_BATCH_FILES} files allowed per batch"
+
+        activation_mb = ACTIVATION_MB_PER_IMAGE.get(self.model_type, max(ACTIVATION_MB_PER_IMAGE.values()))
+        estimated_mb = (
+            total_bytes / (1024 * 1024)
+            + num_files * (DECODED_MB_PER_IMAGE + TENSOR_MB_PER_IMAGE)
+            + min(num_files, BATCH_CHUNK_SIZE) * activation_mb
+        )
+        if estimated_mb > BATCH_MEMORY_BUDGET_MB:
+            return (
+                f"Batch needs an estimated {estimated_mb:.0f} MB, "
+                f"above the {BATCH_MEMORY_BUDGET_MB:.0f} MB budget"
+            )
+        return None
+
+    async def batch_predict(
+        self,
+        image_bytes_list: Sequence[ImageSource],
+        generate_explanations: Union[bool, Sequence[bool]] = False,
+        explanation_options: Optional[ExplanationOptions] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Classify several images with one forward pass per chunk
+
+        Args:
+            image_bytes_list: Raw uploads or spooled upload files
+            generate_explanations: One flag for all images, or one flag per image
+            explanation_options: Heatmap encoding, defaults to PNG data URLs
+
+        Returns:
+            list: One result per upload, in order; failures are reported inline
+        """
+        async with self.executor.admit():
+            return await self._batch_predict(
+                image_bytes_list,
+                generate_explanations,
+                explanation_options or ExplanationOptions()
+            )
+
+    def _lookup_cached(self, keys: List[str], explain_flags: List[bool], variant: str) -> Tuple[list, list]:
+        predictions = [self.cache.get(PREDICTIONS, key) for key in keys]
+        explanations = [
+            self.cache.get(EXPLANATIONS, f"{key}-{variant}") if explain_flags[i] and self.supports_explanations else None
+            for i, key in enumerate(keys)
+        ]
+        return predictions, explanations
+
+    async def _batch_predict(
+        self,
+        image_bytes_list: Sequence[ImageSource],
+        generate_explanations: Union[bool, Sequence[bool]],
+        explanation_options: ExplanationOptions
+    ) -> List[Dict[str, Any]]:
+        start_time = time.time()
+        loader = await self.executor.run(self.load_model)
+
+        if isinstance(generate_explanations, bool):
+            explain_flags = [generate_explanations] * len(image_bytes_list)
+        else:
+            explain_flags = list(generate_explanations)
+
+        keys = await self.executor.run(
+            lambda: [PredictionCache.make_key(b, self.model_type, loader.fingerprint) for b in image_bytes_list]
+        )
+        cached_predictions, cached_explanations = await self.executor.run(
+            self._lookup_cached, keys, explain_flags, explanation_options.cache_variant
+        )
+
+        results: List[Optional[Dict[str, Any]]] = [
+            copy.deepcopy(cached) if cached is not None else None for cached in cached_predictions
+        ]
+        wants_explanation = [
+            explain_flags[i] and self.supports_explanations and cached_explanations[i] is None
+            for i in range(len(image_bytes_list))
+        ]
+        to_decode = [i for i in range(len(image_bytes_list)) if results[i] is None or wants_explanation[i]]
+
+        # Decode and preprocess every upload that still needs work, in parallel,
+        # writing each image straight into its row of one batch buffer
+        inputs = torch.empty((len(to_decode), 3, 224, 224), dtype=torch.float32)
+        row_of = {i: row for row, i in enumerate(to_decode)}
+        decoded = await asyncio.gather(
+            *(
+                self.executor.run(self._prepare_image, image_bytes_list[i], inputs[row_of[i]:row_of[i] + 1])
+                for i in to_decode
+            ),
+            return_exceptions=True
+        )
+        prepared: Dict[int, Tuple[Image.Image, torch.Tensor]] = {}
+        for i, item in zip(to_decode, decoded):
+            if isinstance(item, Exception):
+                logger.error(f"Batch prediction {i+1} failed: {item}")
+                results[i] = {'success': False, 'error': str(item)}
+            else:
+                prepared[i] = item
+
+        pending = [i for i in sorted(prepared) if results[i] is None]
+        for chunk_start in range(0, len(pending), BATCH_CHUNK_SIZE):
+            chunk = pending[chunk_start:chunk_start + BATCH_CHUNK_SIZE]
+            rows = [row_of[i] for i in chunk]
+            if rows == list(range(rows[0], rows[-1] + 1)):
+                batch = inputs[rows[0]:rows[-1] + 1].to(self.device)  # contiguous rows: no copy on CPU
+            else:
+                batch = inputs[rows].to(self.device)
+            try:
+                logits, attention_weights = await self.executor.run(self._forward, batch)
+            except Exception as e:
+                logger.error(f"Batch forward pass failed for {len(chunk)} images: {e}")
+                for i in chunk:
+                    results[i] = {'success': False, 'error': str(e)}
+                continue
+
+            for row, i in enumerate(chunk):
+                results[i] = self._format_prediction(logits[row:row + 1])
+                await self.cache.store(PREDICTIONS, keys[i], copy.deepcopy(results[i]))
+
+        for i, explanation in enumerate(cached_explanations):
+            if explanation is not None and results[i]['success']:
+                results[i].update(explanation)
+
+        # GradCAM only for the images that asked for it
+        explain = [
+            i for i in sorted(prepared)
+            if wants_explanation[i] and results[i]['success']
+        ]
+        for i in explain:
+            original_image, image_tensor = prepared[i]
             try:
-                result = torch.run(self.predict_from_bytes(image_bytes, generate_explanations))
-                results.append(result)
-                logger.info(f"Batch prediction {i+1}/{len(image_bytes_list)} completed")
+                explanation = await self.executor.run(
+                    self._explain, original_image, image_tensor, results[i], explanation_options
+                )
+                await self.cache.store(EXPLANATIONS, f"{keys[i]}-{explanation_options.cache_variant}", explanation)
+                results[i].update(explanation)
             except Exception as e:
-                logger.error(f"Batch prediction {i+1} failed: {e}")
-                results.append({'success': False, 'error': str(e)})
+                logger.error(f"Batch explanation {i+1} failed: {e}")
+                results[i]['explanation_error'] = str(e)
+
+        total_time = (time.time() - start_time) * 1000
+        for i, result in enumerate(results):
+            if result.get('success'):
+                result['inference_time_ms'] = round(total_time, 2)
+                result['cached'] = cached_predictions[i] is not None
+
+        logger.info(
+            f"Batch prediction of {len(image_bytes_list)} images "
+            f"({len(pending)} computed, {len(prepared)} decoded) in {total_time:.0f} ms"
+        )
         return results
 
 
-_prediction_service = None
+# One service per model type so each keeps its own batching queue
+_prediction_services: Dict[str, PredictionService] = {}
 
 def get_prediction_service(model_type: str = "mobilenetv2") -> PredictionService:
-    global _prediction_service
-    if _prediction_service is None or _prediction_service.model_type != model_type:
-        _prediction_service = PredictionService(model_type=model_type)
-    return _prediction_service
+    model_type = model_type.lower()
+    if model_type not in _prediction_services:
+        _prediction_services[model_type] = PredictionService(model_type=model_type)
+    return _prediction_services[model_type]
+
+
+def get_batching_stats() -> List[Dict[str, Any]]:
+    """Batching queue stats for every model type that has served a request"""
+    return [service.batcher.get_stats() for service in _prediction_services.values()]
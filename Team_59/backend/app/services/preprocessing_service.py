@@ -8,12 +8,20 @@ import numpy as np
 from PIL import Image
 import io
 import cv2
+import threading
+import time
 from torchvision import transforms
-from typing import Union, Tuple, Optional
+from typing import BinaryIO, Dict, Union, Tuple, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+MODEL_INPUT_SIZE = (224, 224)
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+SUPPORTED_FORMATS = ('JPEG', 'PNG')
+MIN_IMAGE_SIDE = 50
+
 class ImagePreprocessingService:
     """Handles preprocessing of medical images for model inference"""
     
@@ -35,8 +43,86 @@ class ImagePreprocessingService:
             transforms.ToTensor()
         ])
         
+        # ToTensor + Normalize folded into one multiply-add per channel
+        self._scale = (1.0 / (255.0 * IMAGENET_STD)).astype(np.float32)
+        self._shift = (-IMAGENET_MEAN / IMAGENET_STD).astype(np.float32)
+        # Per-thread HWC float scratch buffer reused across requests
+        self._scratch = threading.local()
+        
         logger.info("ImagePreprocessingService initialized")
     
+    def prepare(
+        self,
+        source: Union[bytes, BinaryIO],
+        out: Optional[torch.Tensor] = None,
+        timings: Optional[Dict[str, float]] = None
+    ) -> Tuple[torch.Tensor, Image.Image]:
+        """
+        Validate, decode, resize and normalize an image in a single pass
+        
+        The image is decoded once; large JPEGs are downscaled by the decoder
+        (draft mode) before the single resize to the model input size.
+        
+        Args:
+            source: Raw image bytes or a readable binary file object
+            out: Optional [1, 3, 224, 224] float32 tensor (e.g. a row of a
+                batch buffer) to write the result into
+            timings: Optional dict that receives the seconds spent in the
+                validate, decode and preprocess stages
+            
+        Returns:
+            tuple: (tensor [1, 3, 224, 224], 224x224 RGB preview for overlays)
+        """
+        started = time.perf_counter()
+        try:
+            # Opening only parses the header
+            stream = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+            img = Image.open(stream)
+            
+            if img.format not in SUPPORTED_FORMATS:
+                raise ValueError(f"Unsupported format: {img.format}")
+            if img.size[0] < MIN_IMAGE_SIDE or img.size[1] < MIN_IMAGE_SIDE:
+                raise ValueError(f"Image too small: {img.size}")
+            validated = time.perf_counter()
+            
+            if img.format == 'JPEG':
+                # Let libjpeg decode at 1/2, 1/4 or 1/8 scale while staying >= 224
+                img.draft(img.mode, MODEL_INPUT_SIZE)
+            img.load()
+            decoded = time.perf_counter()
+            
+            # X-rays are usually single-channel: resize before expanding to RGB
+            if img.mode not in ('L', 'RGB'):
+                img = img.convert('RGB')
+            resized = img.resize(MODEL_INPUT_SIZE, Image.BILINEAR)
+            preview = resized if resized.mode == 'RGB' else resized.convert('RGB')
+        except ValueError:
+            raise
+        except Exception as e:
+            # Truncated or corrupt data surfaces during the decode above
+            raise ValueError(f"Invalid image data: {e}")
+        
+        pixels = np.asarray(resized, dtype=np.uint8)
+        if pixels.ndim == 2:
+            pixels = pixels[:, :, None]  # broadcast the gray channel to RGB
+        
+        scratch = getattr(self._scratch, 'buffer', None)
+        if scratch is None:
+            scratch = np.empty((*MODEL_INPUT_SIZE, 3), dtype=np.float32)
+            self._scratch.buffer = scratch
+        np.multiply(pixels, self._scale, out=scratch, casting='unsafe')
+        np.add(scratch, self._shift, out=scratch)
+        
+        if out is None:
+            out = torch.empty((1, 3, *MODEL_INPUT_SIZE), dtype=torch.float32)
+        out[0].copy_(torch.from_numpy(scratch).permute(2, 0, 1))
+        
+        if timings is not None:
+            timings['validate'] = validated - started
+            timings['decode'] = decoded - validated
+            timings['preprocess'] = time.perf_counter() - decoded
+        return out, preview
+    
     def validate_image(self, image_bytes: bytes) -> bool:
         """
         Validate image format and content
@@ -0,0 +1,4 @@
+"""
+Offline benchmarks and parity checks for the Team_59 backend
+Run modules from the backend directory, e.g. python -m benchmarks.export_backends
+"""
@@ -0,0 +1,99 @@
+"""
+Latency and peak memory of GradCAM vs attention rollout on the hybrid
+
+    python -m benchmarks.explanation_methods --repeats 20
+
+Each method runs in a fresh process, so peak RSS growth over a plain
+no-grad prediction is attributable to that method alone.
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+import torch
+
+from app.models.model_registry import MODEL_CHECKPOINTS
+from app.services.gradcam_service import EXPLANATION_METHODS
+
+MODEL_TYPE = "hybrid_cnn_vit"
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kB on Linux
+
+
+def _run_method(method: str, model_path: str, repeats: int, seed: int) -> Dict[str, Any]:
+    from app.models.model_loader import ModelLoader
+    from app.services.gradcam_service import GradCAMService
+
+    loader = ModelLoader(model_path, device="cpu", model_type=MODEL_TYPE)
+    loader.load_model()
+    service = GradCAMService(loader.model, input_transform=loader.prepare_input)
+    images = torch.randn(repeats, 1, 3, 224, 224, generator=torch.Generator().manual_seed(seed))
+
+    # Baseline: the same process after an ordinary no-grad prediction
+    loader.forward(loader.prepare_input(images[0]))
+    baseline_mb = _peak_rss_mb()
+    service.predict_with_explanation(images[0], method)  # warm-up
+
+    timings = []
+    for image in images:
+        start = time.perf_counter()
+        service.predict_with_explanation(image, method)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+
+    return {
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        'mean_ms': round(statistics.fmean(timings), 2),
+        'peak_rss_over_prediction_mb': round(_peak_rss_mb() - baseline_mb, 1),
+    }
+
+
+def compare_methods(
+    model_path: str = None,
+    methods: List[str] = EXPLANATION_METHODS,
+    repeats: int = 20,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Benchmark each explanation method in its own process
+
+    Args:
+        model_path: Hybrid checkpoint, defaults to the registry path
+        methods: Methods to compare
+        repeats: Timed explanations per method
+        seed: Seed for the random input images
+
+    Returns:
+        dict: Per-method latency percentiles and peak memory growth
+    """
+    model_path = model_path or MODEL_CHECKPOINTS[MODEL_TYPE]
+    context = multiprocessing.get_context("spawn")
+    report = {'model_type': MODEL_TYPE, 'torch_threads': torch.get_num_threads(), 'repeats': repeats}
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        for method in methods:
+            report[method] = pool.apply(_run_method, (method, model_path, repeats, seed))
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="GradCAM vs attention rollout latency and memory")
+    parser.add_argument("--model-path", default=None)
+    parser.add_argument("--methods", nargs="+", default=list(EXPLANATION_METHODS), choices=EXPLANATION_METHODS)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    print(json.dumps(compare_methods(args.model_path, args.methods, args.repeats), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Parity and latency of exported-graph backends against eager PyTorch
+
+    python -m benchmarks.export_backends --model-type hybrid_cnn_vit --batch-sizes 1 8
+
+Exits non-zero if any backend disagrees with eager beyond --atol or on
+the predicted class, so it can gate a deployment that sets
+INFERENCE_BACKEND.
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+import torch
+
+from app.models.model_loader import ModelLoader
+from app.models.model_registry import MODEL_CHECKPOINTS
+
+logger = logging.getLogger(__name__)
+
+
+def _logits(outputs) -> torch.Tensor:
+    return (outputs[0] if isinstance(outputs, tuple) else outputs).float()
+
+
+def _latency_ms(loader: ModelLoader, batch: torch.Tensor, repeats: int) -> Dict[str, float]:
+    loader.forward(batch)  # warm-up: lazy init, allocator, ORT graph optimisation
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        loader.forward(batch)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        'ms_per_image': round(statistics.median(timings) / len(batch), 2),
+    }
+
+
+def compare_backends(
+    model_type: str,
+    backends: List[str],
+    model_path: str = None,
+    batch_sizes: List[int] = (1, 8),
+    repeats: int = 20,
+    atol: float = 1e-3,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Run eager and each exported backend on the same random batches
+
+    Args:
+        model_type: "mobilenetv2" or "hybrid_cnn_vit"
+        backends: Exported backends to compare ("torchscript", "onnx")
+        model_path: Checkpoint, defaults to the registry path for model_type
+        batch_sizes: Batch sizes to time
+        repeats: Timed iterations per batch size
+        atol: Largest allowed absolute logit difference
+        seed: Seed for the input batches
+
+    Returns:
+        dict: Per-backend parity and latency, plus an overall "passed" flag
+    """
+    model_path = model_path or MODEL_CHECKPOINTS[model_type]
+    generator = torch.Generator().manual_seed(seed)
+    batches = {bs: torch.randn(bs, 3, 224, 224, generator=generator) for bs in batch_sizes}
+
+    eager = ModelLoader(model_path, device="cpu", model_type=model_type, precision="fp32", backend="eager")
+    eager.load_model()
+    reference = {bs: _logits(eager.forward(batch)) for bs, batch in batches.items()}
+
+    report = {
+        'model_type': model_type,
+        'torch_threads': torch.get_num_threads(),
+        'eager': {str(bs): _latency_ms(eager, batch, repeats) for bs, batch in batches.items()},
+    }
+    passed = True
+
+    for backend in backends:
+        loader = ModelLoader(model_path, device="cpu", model_type=model_type, precision="fp32", backend=backend)
+        start = time.perf_counter()
+        loader.load_model()
+        load_s = time.perf_counter() - start
+        if loader.backend != backend:
+            report[backend] = {'error': f"export or load failed, fell back to {loader.backend}"}
+            passed = False
+            continue
+
+        max_diff, agreement = 0.0, True
+        for bs, batch in batches.items():
+            logits = _logits(loader.forward(batch))
+            max_diff = max(max_diff, float((logits - reference[bs]).abs().max()))
+            agreement &= bool(torch.equal(logits.argmax(1), reference[bs].argmax(1)))
+
+        ok = agreement and max_diff <= atol
+        passed &= ok
+        report[backend] = {
+            'parity_ok': ok,
+            'max_abs_logit_diff': max_diff,
+            'top1_agreement': agreement,
+            'load_s': round(load_s, 2),
+            'artifact': str(loader.exported.path),
+            'latency': {str(bs): _latency_ms(loader, batch, repeats) for bs, batch in batches.items()},
+        }
+
+    report['passed'] = passed
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Exported backend parity and latency against eager")
+    parser.add_argument("--model-type", required=True, choices=sorted(MODEL_CHECKPOINTS))
+    parser.add_argument("--backends", nargs="+", default=["torchscript", "onnx"], choices=["torchscript", "onnx"])
+    parser.add_argument("--model-path", default=None)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--atol", type=float, default=1e-3)
+    args = parser.parse_args(argv)
+
+    report = compare_backends(
+        args.model_type, args.backends, args.model_path, args.batch_sizes, args.repeats, args.atol
+    )
+    print(json.dumps(report, indent=2))
+    return 0 if report['passed'] else 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,424 @@
+"""
+Latency, throughput and memory of inference under load
+
+    python -m benchmarks.inference_load --mode inprocess --resolutions 512 1024 \
+        --batch-sizes 1 8 --concurrency 1 4 --torch-threads 1 4 --explain off on
+    python -m benchmarks.inference_load --mode http --output run.json --baseline benchmarks/baselines/cpu.json
+
+Every combination of model type, resolution, batch size, concurrency,
+torch thread count and explanation on/off is one run of --requests
+requests on synthetic chest X-rays (batch size 1 uses the single-image
+path, larger sizes the batch path). "inprocess" calls PredictionService
+directly; "http" starts a local uvicorn server per thread count and drives
+it with httpx. Each run reports p50/p95/p99 request latency, images/sec
+and the peak RSS of the process doing inference.
+
+Runs offline on CPU: a model whose checkpoint is missing gets seeded
+random weights, which cost the same to run as trained ones. The
+prediction cache is disabled so every request does the full work.
+
+With --baseline, exits non-zero if any run's p95 latency or throughput
+is worse than the baseline run of the same name by more than --tolerance;
+--save-baseline writes this report there instead.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence
+
+import torch
+
+from app.core.memory import process_memory
+from benchmarks.synthetic_xray import synthetic_xrays
+
+logger = logging.getLogger(__name__)
+
+MODEL_TYPES = ["mobilenetv2", "hybrid_cnn_vit"]
+# Every request does the full decode / forward / explain
+_BENCHMARK_ENV = {'PREDICTION_CACHE_SIZE': "0", 'EXPLANATION_CACHE_SIZE': "0", 'PREDICTION_CACHE_DIR': ""}
+_SERVER_START_TIMEOUT = 180.0
+
+
+class _PeakRss:
+    """Samples a process's RSS on a background thread while the block runs"""
+
+    def __init__(self, pid: Optional[int] = None, interval: float = 0.05):
+        self.pid = pid or os.getpid()
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        self.peak_mb = max(self.peak_mb, process_memory(self.pid)['rss_mb'])
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "_PeakRss":
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def prepare_weights(model_types: Sequence[str], weights_dir: Path, seed: int = 0) -> Dict[str, str]:
+    """
+    Point models without a checkpoint at seeded random weights
+
+    Args:
+        model_types: Models the benchmark will run
+        weights_dir: Where random checkpoints are written
+        seed: Seed for the random initialisation
+
+    Returns:
+        dict: model type -> "checkpoint" or "random"
+    """
+    from app.models.model_loader import ModelLoader
+    from app.models.model_registry import MODEL_CHECKPOINTS
+
+    sources = {}
+    for model_type in model_types:
+        if Path(MODEL_CHECKPOINTS[model_type]).exists():
+            sources[model_type] = "checkpoint"
+            continue
+        path = weights_dir / Path(MODEL_CHECKPOINTS[model_type]).name
+        torch.manual_seed(seed)
+        model = ModelLoader(str(path), device="cpu", model_type=model_type)._model_class()(num_classes=2)
+        torch.save(model.state_dict(), path)
+        logger.warning(f"No checkpoint for {model_type}, benchmarking random weights from {path}")
+        sources[model_type] = "random"
+    use_weights(weights_dir)
+    return sources
+
+
+def use_weights(weights_dir: Path):
+    """Serve checkpoints found in weights_dir instead of the registry defaults"""
+    from app.models.model_registry import MODEL_CHECKPOINTS
+
+    for model_type, default_path in MODEL_CHECKPOINTS.items():
+        candidate = weights_dir / Path(default_path).name
+        if candidate.exists():
+            MODEL_CHECKPOINTS[model_type] = str(candidate)
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _summarise(latencies_ms: List[float], wall_seconds: float, images: int, errors: int) -> Dict[str, Any]:
+    ordered = sorted(latencies_ms) or [float('nan')]
+    return {
+        'requests': len(latencies_ms),
+        'errors': errors,
+        'p50_ms': round(_percentile(ordered, 0.50), 2),
+        'p95_ms': round(_percentile(ordered, 0.95), 2),
+        'p99_ms': round(_percentile(ordered, 0.99), 2),
+        'mean_ms': round(statistics.fmean(ordered), 2),
+        'images_per_sec': round(images / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+    }
+
+
+async def _drive(
+    call: Callable[[List[bytes]], Awaitable[Any]],
+    payloads: List[List[bytes]],
+    concurrency: int,
+    requests: int,
+) -> Dict[str, Any]:
+    """Issue requests from `concurrency` closed-loop clients and time each one"""
+    latencies: List[float] = []
+    errors = 0
+    indices = iter(range(requests))  # shared, so clients split the requests between them
+
+    async def client():
+        nonlocal errors
+        for index in indices:
+            start = time.perf_counter()
+            try:
+                await call(payloads[index % len(payloads)])
+            except Exception as e:
+                errors += 1
+                logger.debug(f"Request failed: {e}")
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall_seconds = time.perf_counter() - start
+    images = len(latencies) * len(payloads[0])
+    return _summarise(latencies, wall_seconds, images, errors)
+
+
+def _payloads(resolution: int, batch_size: int, concurrency: int, seed: int) -> List[List[bytes]]:
+    # Requests in flight at the same time never carry the same image, so
+    # in-flight deduplication cannot merge them
+    count = max(concurrency, 2)
+    images = synthetic_xrays(count * batch_size, size=resolution, seed=seed)
+    return [images[i * batch_size:(i + 1) * batch_size] for i in range(count)]
+
+
+def _sweep(args) -> Iterator[Dict[str, Any]]:
+    for model_type, resolution, batch_size, concurrency, explain in itertools.product(
+        args.model_types, args.resolutions, args.batch_sizes, args.concurrency, args.explain
+    ):
+        yield {
+            'model_type': model_type,
+            'resolution': resolution,
+            'batch_size': batch_size,
+            'concurrency': concurrency,
+            'explain': explain == "on",
+        }
+
+
+def _run_name(mode: str, case: Dict[str, Any]) -> str:
+    return (
+        f"{mode}/{case['model_type']}/{case['resolution']}px/batch{case['batch_size']}"
+        f"/conc{case['concurrency']}/threads{case['torch_threads']}/{'explain' if case['explain'] else 'predict'}"
+    )
+
+
+async def _run_inprocess(args) -> List[Dict[str, Any]]:
+    from app.services.inference_executor import get_inference_executor
+    from app.services.prediction_service import get_prediction_service
+
+    executor = get_inference_executor()
+    results = []
+    for torch_threads in args.torch_threads:
+        if torch_threads > 0:
+            executor.set_torch_threads(torch_threads)
+        for case in _sweep(args):
+            case['torch_threads'] = torch.get_num_threads()
+            service = get_prediction_service(case['model_type'])
+
+            async def call(images: List[bytes], explain=case['explain'], service=service):
+                if len(images) == 1:
+                    return await service.predict_from_bytes(images[0], generate_explanation=explain)
+                return await service.batch_predict(images, generate_explanations=explain)
+
+            payloads = _payloads(case['resolution'], case['batch_size'], case['concurrency'], args.seed)
+            await _drive(call, payloads, 1, args.warmup)
+            with _PeakRss() as rss:
+                stats = await _drive(call, payloads, case['concurrency'], args.requests)
+            results.append({'name': _run_name("inprocess", case), 'mode': "inprocess", **case, **stats,
+                            'peak_rss_mb': rss.peak_mb})
+            logger.info(f"{results[-1]['name']}: p95 {stats['p95_ms']} ms, {stats['images_per_sec']} img/s")
+    return results
+
+
+@contextmanager
+def _server(port: int, torch_threads: int, weights_dir: Path) -> Iterator[subprocess.Popen]:
+    """uvicorn serving the app in a separate process, so the load generator does not share its GIL"""
+    import httpx
+
+    env = {**os.environ, **_BENCHMARK_ENV}
+    if torch_threads > 0:
+        env['INFERENCE_TORCH_THREADS'] = str(torch_threads)
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.inference_load", "--serve", str(port), "--weights-dir", str(weights_dir)],
+        env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    try:
+        deadline = time.monotonic() + _SERVER_START_TIMEOUT
+        while True:
+            if process.poll() is not None:
+                log.seek(0)
+                raise RuntimeError(f"Benchmark server exited with {process.returncode}:\n{log.read().decode()[-4000:]}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Benchmark server did not start within {_SERVER_START_TIMEOUT:.0f}s")
+            time.sleep(0.2)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log.close()
+
+
+async def _run_http(args, weights_dir: Path) -> List[Dict[str, Any]]:
+    import httpx
+
+    results = []
+    for torch_threads in args.torch_threads:
+        with _server(args.port, torch_threads, weights_dir) as server:
+            base_url = f"http://127.0.0.1:{args.port}"
+            async with httpx.AsyncClient(base_url=base_url, timeout=300.0) as client:
+                stats = (await client.get("/api/medical/batching-stats")).json()
+                server_threads = stats.get('executor', {}).get('torch_threads', torch_threads)
+                for case in _sweep(args):
+                    case['torch_threads'] = server_threads
+
+                    async def call(images: List[bytes], case=case):
+                        params = {'model_type': case['model_type']}
+                        if len(images) == 1:
+                            path = "/api/medical/predict"
+                            params['generate_explanation'] = str(case['explain']).lower()
+                            files = [("file", ("xray.jpg", images[0], "image/jpeg"))]
+                        else:
+                            path = "/api/medical/batch-predict"
+                            params['generate_explanations'] = str(case['explain']).lower()
+                            files = [("files", (f"xray{i}.jpg", image, "image/jpeg")) for i, image in enumerate(images)]
+                        response = await client.post(path, params=params, files=files)
+                        response.raise_for_status()
+
+                    payloads = _payloads(case['resolution'], case['batch_size'], case['concurrency'], args.seed)
+                    await _drive(call, payloads, 1, args.warmup)
+                    with _PeakRss(server.pid) as rss:
+                        run_stats = await _drive(call, payloads, case['concurrency'], args.requests)
+                    results.append({'name': _run_name("http", case), 'mode': "http", **case, **run_stats,
+                                    'peak_rss_mb': rss.peak_mb})
+                    logger.info(f"{results[-1]['name']}: p95 {run_stats['p95_ms']} ms, {run_stats['images_per_sec']} img/s")
+    return results
+
+
+def compare_to_baseline(runs: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> Dict[str, Any]:
+    """
+    Match runs to the baseline by name and flag regressions
+
+    Args:
+        runs: Runs from this benchmark
+        baseline: A report previously written by this benchmark
+        tolerance: Allowed fractional increase in p95 latency or drop in images/sec
+
+    Returns:
+        dict: Per-run changes, names of regressed and unmatched runs, and "passed"
+    """
+    previous = {run['name']: run for run in baseline.get('runs', [])}
+    changes, regressions, unmatched = [], [], []
+    for run in runs:
+        old = previous.get(run['name'])
+        if old is None or not old['p95_ms'] or not old['images_per_sec']:
+            unmatched.append(run['name'])
+            continue
+        latency_change = run['p95_ms'] / old['p95_ms'] - 1
+        throughput_change = run['images_per_sec'] / old['images_per_sec'] - 1
+        regressed = latency_change > tolerance or throughput_change < -tolerance
+        changes.append({
+            'name': run['name'],
+            'p95_change': round(latency_change, 3),
+            'images_per_sec_change': round(throughput_change, 3),
+            'peak_rss_mb_change': round(run['peak_rss_mb'] - old['peak_rss_mb'], 1),
+            'regressed': regressed,
+        })
+        if regressed:
+            regressions.append(run['name'])
+    return {
+        'tolerance': tolerance,
+        'runs': changes,
+        'regressions': regressions,
+        'not_in_baseline': unmatched,
+        'passed': not regressions,
+    }
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    """Run the sweep in each requested mode and build the report"""
+    os.environ.update(_BENCHMARK_ENV)
+    weights_dir = Path(tempfile.mkdtemp(prefix="inference-bench-"))
+    try:
+        weights = prepare_weights(args.model_types, weights_dir, args.seed)
+        runs = []
+        if args.mode in ("inprocess", "both"):
+            runs += asyncio.run(_run_inprocess(args))
+        if args.mode in ("http", "both"):
+            runs += asyncio.run(_run_http(args, weights_dir))
+    finally:
+        shutil.rmtree(weights_dir, ignore_errors=True)
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'torch': torch.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'weights': weights,
+        },
+        'settings': {'requests': args.requests, 'warmup': args.warmup, 'seed': args.seed},
+        'runs': runs,
+    }
+
+
+def _serve(port: int, weights_dir: Optional[str]):
+    import uvicorn
+
+    if weights_dir:
+        use_weights(Path(weights_dir))
+    from app.main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Latency and throughput of the inference API")
+    parser.add_argument("--mode", default="inprocess", choices=["inprocess", "http", "both"])
+    parser.add_argument("--model-types", nargs="+", default=MODEL_TYPES, choices=MODEL_TYPES)
+    parser.add_argument("--resolutions", nargs="+", type=int, default=[512, 1024])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--torch-threads", nargs="+", type=int, default=[0], help="0 keeps the default")
+    parser.add_argument("--explain", nargs="+", default=["off"], choices=["off", "on"])
+    parser.add_argument("--requests", type=int, default=32, help="Timed requests per run")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed requests before each run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", default=None, help="Also write the report to this file")
+    parser.add_argument("--baseline", default=None, help="Report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--save-baseline", action="store_true", help="Write this report to --baseline")
+    parser.add_argument("--serve", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--weights-dir", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve is not None:
+        _serve(args.serve, args.weights_dir)
+        return 0
+    if args.save_baseline and not args.baseline:
+        parser.error("--save-baseline needs --baseline")
+
+    report = run_benchmark(args)
+    passed = True
+    if args.baseline and not args.save_baseline:
+        if Path(args.baseline).exists():
+            report['comparison'] = compare_to_baseline(report['runs'], json.loads(Path(args.baseline).read_text()), args.tolerance)
+            passed = report['comparison']['passed']
+        else:
+            logger.warning(f"Baseline {args.baseline} not found, skipping the comparison")
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    for path in filter(None, [args.output, args.baseline if args.save_baseline else None]):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(text + "\n")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    sys.exit(main())
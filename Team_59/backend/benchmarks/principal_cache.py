@@ -0,0 +1,128 @@
+"""
+Database queries per authenticated request, with and without the principal cache
+
+    python -m benchmarks.principal_cache --requests 200
+
+Runs the LMS routers against a throwaway SQLite database and counts the
+SQL statements each request issues. Also checks that a role change is
+visible on the very next request despite the cache.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+_ENDPOINTS = ["/api/auth/me", "/api/me/courses", "/api/courses?limit=20"]
+_PASSWORD = "benchmark-password"
+
+
+def _measure(client, headers: Dict[str, str], statements: List[str], path: str, requests: int) -> Dict[str, Any]:
+    client.get(path, headers=headers)  # warm-up, fills the cache when enabled
+    statements.clear()
+    start = time.perf_counter()
+    for _ in range(requests):
+        assert client.get(path, headers=headers).status_code == 200
+    elapsed = time.perf_counter() - start
+    return {
+        'queries_per_request': round(len(statements) / requests, 3),
+        'ms_per_request': round(elapsed * 1000 / requests, 3),
+    }
+
+
+def measure_principal_cache(requests: int = 200, courses: int = 50) -> Dict[str, Any]:
+    """
+    Per-endpoint query counts with the cache disabled and enabled
+
+    Args:
+        requests: Timed requests per endpoint and setting
+        courses: Catalog size to seed
+
+    Returns:
+        dict: Per-endpoint results, cache stats and the role-change check
+    """
+    database = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    database.close()
+    os.environ["DATABASE_URL"] = f"sqlite:///{database.name}"
+
+    # Imported after DATABASE_URL is set, since app.db reads it at import
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from app.core.principal_cache import get_principal_cache
+    from app.core.security import hash_password
+    from app.db import Base, SessionLocal, engine
+    from app.models import Course, Enrollment, User
+    from app.routers import auth, courses as course_routes
+
+    Base.metadata.create_all(bind=engine)
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/api/auth")
+    app.include_router(course_routes.router, prefix="/api")
+
+    db = SessionLocal()
+    hashed = hash_password(_PASSWORD)
+    admin = User(email="admin@example.com", hashed_password=hashed, role="admin")
+    student = User(email="student@example.com", hashed_password=hashed, role="student")
+    db.add_all([admin, student])
+    db.commit()
+    db.add_all([
+        Course(title=f"Course {i}", short_description="s", description="d", instructor_id=admin.id)
+        for i in range(courses)
+    ])
+    db.commit()
+    db.add_all([Enrollment(user_id=student.id, course_id=cid) for cid in range(1, courses + 1, 5)])
+    db.commit()
+    student_id = student.id
+    db.close()
+
+    statements: List[str] = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+    cache = get_principal_cache()
+    ttl_seconds = cache.ttl_seconds
+    report: Dict[str, Any] = {'requests': requests, 'endpoints': {}}
+    try:
+        with TestClient(app) as client:
+            def login(email: str) -> Dict[str, str]:
+                token = client.post("/api/auth/login", data={"username": email, "password": _PASSWORD}).json()
+                return {"Authorization": f"Bearer {token['access_token']}"}
+
+            student_headers, admin_headers = login("student@example.com"), login("admin@example.com")
+            for path in _ENDPOINTS:
+                cache.ttl_seconds = 0
+                without = _measure(client, student_headers, statements, path, requests)
+                cache.ttl_seconds = ttl_seconds
+                with_cache = _measure(client, student_headers, statements, path, requests)
+                report['endpoints'][path] = {'without_cache': without, 'with_cache': with_cache}
+
+            # A role change must not wait for the TTL
+            client.get("/api/auth/me", headers=student_headers)
+            client.patch(f"/api/auth/users/{student_id}/role", json={"role": "instructor"}, headers=admin_headers)
+            role_after = client.get("/api/auth/me", headers=student_headers).json()['role']
+            report['role_change_visible_immediately'] = role_after == "instructor"
+            report['principal_cache'] = cache.get_stats()
+    finally:
+        cache.ttl_seconds = ttl_seconds
+        engine.dispose()
+        os.unlink(database.name)
+    return report
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Queries per authenticated request with the principal cache")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--courses", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    report = measure_principal_cache(args.requests, args.courses)
+    print(json.dumps(report, indent=2))
+    return 0 if report['role_change_visible_immediately'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
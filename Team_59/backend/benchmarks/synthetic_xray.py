@@ -0,0 +1,65 @@
+"""
+Synthetic chest X-rays for benchmarks
+Deterministic frontal-view images with a thorax, lung fields, mediastinum,
+ribs and film noise, so decode and preprocessing cost matches real uploads
+(a flat or pure-noise image compresses very differently as JPEG).
+"""
+
+import io
+from typing import List
+
+import numpy as np
+from PIL import Image
+
+
+def _ellipse(x: np.ndarray, y: np.ndarray, cx: float, cy: float, rx: float, ry: float, power: int = 2) -> np.ndarray:
+    """Soft-edged ellipse mask in [0, 1]"""
+    distance = np.abs((x - cx) / rx) ** power + np.abs((y - cy) / ry) ** power
+    return np.clip(1.5 - distance, 0.0, 1.0) ** 2
+
+
+def synthetic_xray(size: int = 1024, seed: int = 0, image_format: str = "JPEG", quality: int = 90) -> bytes:
+    """
+    Encode one synthetic grayscale chest X-ray
+
+    Args:
+        size: Width and height in pixels
+        seed: Varies anatomy placement, rib phase, opacities and noise
+        image_format: "JPEG" or "PNG"
+        quality: JPEG quality
+
+    Returns:
+        bytes: Encoded image
+    """
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[-1:1:size * 1j, -1:1:size * 1j].astype(np.float32)
+    x = x + rng.uniform(-0.03, 0.03)
+    y = y + rng.uniform(-0.03, 0.03)
+
+    image = 0.08 + 0.47 * _ellipse(x, y, 0.0, 0.1, 0.92, 1.05, power=4)  # soft tissue
+    lungs = _ellipse(x, y, -0.38, -0.05, 0.27, 0.58) + _ellipse(x, y, 0.38, -0.05, 0.29, 0.6)
+    image -= 0.3 * np.clip(lungs, 0.0, 1.0)
+    image += 0.3 * _ellipse(x, y, 0.05, 0.05, 0.14, 0.75) * (1 - 0.5 * np.clip(lungs, 0.0, 1.0))  # mediastinum
+    image += 0.12 * _ellipse(x, y, 0.0, 0.0, 0.05, 1.1, power=4)  # spine
+
+    # Ribs: bright arcs across the lung fields
+    arc = np.sin(np.pi * 9 * (y + 0.35 * x ** 2) + rng.uniform(0, 2 * np.pi))
+    image += 0.1 * np.clip(arc - 0.4, 0.0, 1.0) * np.clip(lungs + 0.3, 0.0, 1.0)
+
+    # Patchy opacities, as in consolidation
+    for _ in range(rng.integers(0, 4)):
+        cx, cy = rng.choice([-0.38, 0.38]) + rng.uniform(-0.1, 0.1), rng.uniform(-0.4, 0.4)
+        image += rng.uniform(0.05, 0.15) * _ellipse(x, y, cx, cy, rng.uniform(0.05, 0.15), rng.uniform(0.05, 0.15))
+
+    image += rng.normal(0.0, 0.025, image.shape).astype(np.float32)
+    pixels = (np.clip(image, 0.0, 1.0) * 255).astype(np.uint8)
+
+    buffer = io.BytesIO()
+    options = {'quality': quality} if image_format.upper() == "JPEG" else {}
+    Image.fromarray(pixels, mode="L").save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def synthetic_xrays(count: int, size: int = 1024, seed: int = 0, image_format: str = "JPEG") -> List[bytes]:
+    """count distinct images; image i uses seed + i"""
+    return [synthetic_xray(size, seed + i, image_format) for i in range(count)]
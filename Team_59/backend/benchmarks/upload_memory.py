@@ -0,0 +1,141 @@
+"""
+Peak Python memory of the upload path for small, large and rejected images
+
+    python -m benchmarks.upload_memory --model-type mobilenetv2
+
+Requests are driven straight through the ASGI app with the body delivered
+in 64 kB messages, as a server would, so the client never holds a second
+copy. tracemalloc peaks cover Python allocations (upload buffers, reads,
+hashing); decoder and tensor memory lives outside it and is the same
+whichever way the upload arrives.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import sys
+import tracemalloc
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from app.core.uploads import MAX_IMAGE_UPLOAD_BYTES
+
+_MESSAGE_BYTES = 64 * 1024
+
+
+def _png(side: int, seed: int) -> bytes:
+    """Uncompressed noise PNG, roughly side * side * 3 bytes"""
+    pixels = np.random.default_rng(seed).integers(0, 256, (side, side, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG", compress_level=0)
+    return buffer.getvalue()
+
+
+def _multipart(filename: str, payload: bytes) -> tuple:
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: image/png\r\n\r\n"
+    ).encode()
+    return boundary, head + payload + f"\r\n--{boundary}--\r\n".encode()
+
+
+async def _request(app, path: str, query: str, boundary: str, body: bytes, send_length: bool = True) -> int:
+    headers = [(b"content-type", f"multipart/form-data; boundary={boundary}".encode())]
+    if send_length:
+        headers.append((b"content-length", str(len(body)).encode()))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": headers, "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 8000),
+    }
+    view = memoryview(body)
+    offset = 0
+    status: Dict[str, int] = {}
+
+    async def receive():
+        nonlocal offset
+        chunk = bytes(view[offset:offset + _MESSAGE_BYTES])
+        offset += len(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": offset < len(body)}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await app(scope, receive, send)
+    return status.get("code", 0)
+
+
+async def _measure(model_type: str, repeats: int) -> List[Dict[str, Any]]:
+    from app.main import app
+
+    def side(fraction_of_limit: float) -> int:
+        return int((MAX_IMAGE_UPLOAD_BYTES * fraction_of_limit / 3) ** 0.5)
+
+    cases = [
+        ("small_png", _png(512, 0), True),
+        ("large_png", _png(side(0.8), 1), True),
+        ("oversized_png", _png(side(1.5), 2), True),
+        ("oversized_png_chunked", _png(side(1.5), 3), False),
+        ("not_an_image", b"MZ" + bytes(2 * 1024 * 1024), True),
+    ]
+    path = "/api/medical/predict"
+    query = f"model_type={model_type}&generate_explanation=false"
+    report = []
+    async with app.router.lifespan_context(app):
+        # Warm-up so model loading is not attributed to the first case
+        boundary, body = _multipart("warm.png", cases[0][1])
+        await _request(app, path, query, boundary, body)
+
+        tracemalloc.start()
+        for name, payload, send_length in cases:
+            boundary, body = _multipart(f"{name}.png", payload)
+            peaks = []
+            for _ in range(repeats):
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                status = await _request(app, path, query, boundary, body, send_length)
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            report.append({
+                'case': name,
+                'upload_mb': round(len(payload) / (1024 * 1024), 2),
+                'content_length_sent': send_length,
+                'status': status,
+                'peak_traced_mb': round(max(peaks) / (1024 * 1024), 2),
+            })
+        tracemalloc.stop()
+    return [{'limit_mb': MAX_IMAGE_UPLOAD_BYTES / (1024 * 1024), 'model_type': model_type}] + report
+
+
+def measure_upload_memory(model_type: str = "mobilenetv2", repeats: int = 3) -> List[Dict[str, Any]]:
+    """
+    Peak traced memory per request for each upload case
+
+    Args:
+        model_type: Classifier behind /api/medical/predict
+        repeats: Requests per case; the largest peak is reported
+
+    Returns:
+        list: Settings, then one entry per case with status and peak MB
+    """
+    return asyncio.run(_measure(model_type, repeats))
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Peak memory of the image upload path")
+    parser.add_argument("--model-type", default="mobilenetv2", choices=["mobilenetv2", "hybrid_cnn_vit"])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(json.dumps(measure_upload_memory(args.model_type, args.repeats), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+Per-worker memory of a multi-process server
+
+    python -m benchmarks.worker_memory --pid <gunicorn master pid>
+
+Reports RSS, PSS and unique (USS) memory for the master and each worker.
+With preloaded models, worker USS should stay well below the model size
+because the weights are counted as shared pages.
+"""
+
+import argparse
+import json
+import sys
+
+from app.core.memory import child_pids, process_memory
+
+
+def worker_memory_report(master_pid: int) -> dict:
+    master = process_memory(master_pid)
+    workers = [process_memory(pid) for pid in child_pids(master_pid)]
+    return {
+        'master': master,
+        'workers': workers,
+        'total_pss_mb': round(master['pss_mb'] + sum(w['pss_mb'] for w in workers), 1),
+        'max_worker_uss_mb': max((w['uss_mb'] for w in workers), default=0.0),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Unique vs shared memory per worker process")
+    parser.add_argument("--pid", type=int, required=True, help="PID of the gunicorn master")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(worker_memory_report(args.pid), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+Gunicorn settings for serving with several worker processes
+
+    PRELOAD_MODELS=mobilenetv2,hybrid_cnn_vit gunicorn -c gunicorn.conf.py app.main:app
+
+Models listed in PRELOAD_MODELS are loaded once in the master before the
+workers fork, so every worker serves from the same physical copy of the
+weights (MODEL_SHARE_MODE=cow or shm, see app.models.model_registry).
+Inspect per-worker memory with: python -m benchmarks.worker_memory --pid <master pid>
+
+Set PROMETHEUS_MULTIPROC_DIR to an empty directory so /metrics sums the
+histograms and counters of every worker.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# Import the app in the master so preloaded models are inherited by fork()
+preload_app = True
+
+
+def on_starting(server):
+    from app.models.model_registry import PRELOAD_MODELS, get_model_registry
+
+    if PRELOAD_MODELS:
+        get_model_registry().preload(PRELOAD_MODELS)
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)